@@ -0,0 +1,832 @@
+"""
+Codecs
+======
+Registries of the functions :class:`~rejected.consumer.SmartConsumer` uses to
+deserialize and serialize message bodies by ``content_type`` and to decode and
+encode them by ``content_encoding``.
+
+The codecs for a content type or encoding are found with a single dict lookup.
+When installed, the faster C implementations of JSON (``orjson`` or
+``ujson``) and MessagePack (``msgpack``) are used in place of the pure Python
+implementations. Consumers can register their own codecs, or replace the
+built-in ones, with :func:`register_content_type` and
+:func:`register_content_encoding`:
+
+.. code-block:: python
+
+    from rejected import codec
+
+    codec.register_content_type(
+        'application/vnd.example+json', example.loads, example.dumps)
+
+Compressed message bodies can be decompressed incrementally in chunks with
+:func:`iter_decode`, which raises a :exc:`ValueError` once the decompressed
+size exceeds a maximum, keeping the memory used by a message body predictable.
+The built-in content encodings raise a :exc:`ValueError` for values that are
+corrupt or truncated.
+
+Numeric fields of a batch of decoded message bodies can be converted into
+NumPy column arrays, one per field with a validity mask, with
+:func:`to_columns`, allowing vectorized math over the batch.
+
+Small message bodies with repetitive content, such as JSON documents with the
+same keys, compress far better with a trained Zstandard dictionary.
+Dictionaries trained with :command:`rejected-zstd-dictionary` are loaded with
+:func:`load_zstd_dictionary`. The id of the dictionary used to compress a
+message body is stored in the Zstandard frame header, so ``zstd`` encoded
+bodies are decompressed with the matching dictionary automatically.
+
+"""
+import collections
+import contextlib
+import io
+import json
+import logging
+import math
+import sys
+import threading
+import zlib
+
+from rejected import utils
+
+LOGGER = logging.getLogger(__name__)
+
+# Modules that are slow to import are imported the first time they are used
+bz2 = utils.lazy_import('bz2')
+csv = utils.lazy_import('csv')
+pickle = utils.lazy_import('pickle')
+plistlib = utils.lazy_import('plistlib')
+yaml = utils.lazy_import('yaml')
+
+# Optional imports
+bs4 = utils.lazy_import('bs4')
+if bs4 is None:  # pragma: nocover
+    logging.warning('BeautifulSoup not found, disabling html and xml support')
+
+lz4 = utils.lazy_import('lz4.frame')
+msgpack = utils.lazy_import('msgpack')
+numpy = utils.lazy_import('numpy')
+orjson = utils.lazy_import('orjson')
+ujson = utils.lazy_import('ujson')
+umsgpack = utils.lazy_import('umsgpack')
+zstandard = utils.lazy_import('zstandard')
+
+if not msgpack and not umsgpack:  # pragma: nocover
+    logging.warning('umsgpack not found, disabling msgpack support')
+
+BS4_MIME_TYPES = ('text/html', 'text/xml')
+PICKLE_MIME_TYPES = ('application/pickle', 'application/x-pickle',
+                     'application/x-vnd.python.pickle',
+                     'application/vnd.python.pickle')
+YAML_MIME_TYPES = ('text/yaml', 'text/x-yaml')
+
+CHUNK_SIZE = 65536
+
+ZSTD_DICTIONARIES = {}
+"""Zstandard dictionaries loaded with :func:`load_zstd_dictionary`, by id"""
+
+ZSTD_LEVEL = 3
+
+Codec = collections.namedtuple('Codec', ['decode', 'encode', 'iter_decode'])
+"""The functions used to decode and encode a value, and to incrementally
+decode a value in chunks if supported"""
+Codec.__new__.__defaults__ = (None,)
+
+Column = collections.namedtuple('Column', ['values', 'valid'])
+"""A NumPy array of field values and the boolean array that indicates which
+of the values were present and valid"""
+
+_DECOMPRESSION_ERRORS = (EOFError, IOError, OSError, RuntimeError, zlib.error)
+"""The exceptions raised by the ``bz2``, ``lz4.frame`` and ``zlib``
+decompressors for values that are corrupt or truncated"""
+
+_LOCAL = threading.local()
+
+
+class Registry(object):
+    """Maps names, such as content types or content encodings, to the
+    :class:`Codec` used to decode and encode values for them.
+
+    """
+    def __init__(self):
+        self._codecs = {}
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def get(self, name):
+        """Return the codec for the name, ignoring any parameters such as
+        ``charset`` if there is not a codec for the full value.
+
+        :param str name: The content type or content encoding
+        :rtype: rejected.codec.Codec or None
+
+        """
+        value = self._codecs.get(name)
+        if value is None and name and ';' in name:
+            value = self._codecs.get(name.split(';', 1)[0].strip())
+        return value
+
+    def register(self, names, decode, encode, iter_decode=None):
+        """Register the functions used to decode and encode values for one
+        or more names, replacing any existing codec.
+
+        :param names: The content type or content encoding names
+        :type names: str or list(str) or tuple(str)
+        :param callable decode: The function that decodes a value
+        :param callable encode: The function that encodes a value
+        :param callable iter_decode: The optional function that decodes a
+            value incrementally, returning an iterator of chunks
+
+        """
+        if not isinstance(names, (list, tuple)):
+            names = [names]
+        value = Codec(decode, encode, iter_decode)
+        for name in names:
+            self._codecs[name] = value
+
+    def unregister(self, name):
+        """Remove the codec for the name.
+
+        :param str name: The content type or content encoding
+
+        """
+        self._codecs.pop(name, None)
+
+
+CONTENT_ENCODINGS = Registry()
+CONTENT_TYPES = Registry()
+
+
+def register_content_encoding(names, decode, encode, iter_decode=None):
+    """Register the functions used to decode and encode message bodies for
+    one or more ``content_encoding`` values. To be used for compressing
+    published messages with a configured compression level, the encode
+    function must accept the level as an optional second argument.
+
+    If provided, ``iter_decode`` is invoked with the message body and the
+    maximum chunk size, and returns an iterator of decompressed chunks.
+    Otherwise message bodies are decoded with ``decode`` and then split into
+    chunks by :func:`iter_decode`.
+
+    :param names: The content encoding names
+    :type names: str or list(str) or tuple(str)
+    :param callable decode: The function that decodes the message body
+    :param callable encode: The function that encodes the message body
+    :param callable iter_decode: The function that incrementally decodes the
+        message body
+
+    """
+    CONTENT_ENCODINGS.register(names, decode, encode, iter_decode)
+
+
+def register_content_type(names, decode, encode):
+    """Register the functions used to deserialize and serialize message
+    bodies for one or more ``content_type`` values.
+
+    :param names: The content type names
+    :type names: str or list(str) or tuple(str)
+    :param callable decode: The function that deserializes the message body
+    :param callable encode: The function that serializes the message body
+
+    """
+    CONTENT_TYPES.register(names, decode, encode)
+
+
+def iter_decode(content_encoding, value, max_size=0, chunk_size=CHUNK_SIZE):
+    """Return an iterator of the value decoded for the ``content_encoding``
+    in chunks of up to ``chunk_size`` bytes, without decompressing the whole
+    value at once. If the content encoding is not supported, the value is
+    returned as is in chunks.
+
+    :param str content_encoding: The content encoding of the value
+    :param bytes value: The value to decode
+    :param int max_size: The maximum decoded size in bytes or ``0`` for
+        unlimited
+    :param int chunk_size: The maximum size of each chunk in bytes
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    entry = CONTENT_ENCODINGS.get(content_encoding)
+    if entry is None:
+        chunks, max_size = _iter_chunks(value, chunk_size), 0
+    elif entry.iter_decode:
+        chunks = entry.iter_decode(value, chunk_size)
+    else:
+        chunks = _iter_chunks(entry.decode(value), chunk_size)
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if max_size and size > max_size:
+            raise ValueError(
+                'Decoded size exceeds the maximum of {} bytes'.format(
+                    max_size))
+        yield chunk
+
+
+def to_columns(values, fields):
+    """Return NumPy column arrays for the numeric fields of decoded values,
+    such as deserialized message bodies, in a single pass over the values.
+    Fields are specified by name, using dots to separate the names of
+    nested fields. Values that are missing, are not numbers, or cannot be
+    represented by the field's data type without overflowing or being
+    truncated are set to ``0`` and marked as not valid. Booleans are not
+    treated as numbers.
+
+    :param values: The decoded values, such as a generator that decodes
+        each value as it is consumed
+    :type values: list or iterator
+    :param fields: The data type by field name, or the field names for
+        ``float64`` fields
+    :type fields: dict or list
+    :rtype: dict(str, rejected.codec.Column)
+
+    """
+    if not isinstance(fields, dict):
+        fields = dict((name, 'float64') for name in fields)
+    paths = [(name, name.split('.'), numpy.dtype(fields[name]))
+             for name in sorted(fields)]
+    columns = dict((name, ([], [])) for name in fields)
+    for value in values:
+        for name, path, dtype in paths:
+            items, valid = columns[name]
+            item = _field_value(value, path)
+            if _is_representable(item, dtype):
+                items.append(item)
+                valid.append(True)
+            else:
+                items.append(0)
+                valid.append(False)
+    return dict((name, Column(numpy.array(items, dtype=fields[name]),
+                              numpy.array(valid, dtype=bool)))
+                for name, (items, valid) in columns.items())
+
+
+def _as_bytes(value):
+    """Return the value as bytes, encoding it as UTF-8 if needed.
+
+    :param str value: The value
+    :rtype: bytes
+
+    """
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    return value
+
+
+def _as_text(value):
+    """Return the value as a string, decoding it as UTF-8 if needed.
+
+    :param bytes value: The value
+    :rtype: str
+
+    """
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    return value
+
+
+@contextlib.contextmanager
+def _decompressing(*errors):
+    """Raise a :exc:`ValueError` for the exceptions that decompressors raise
+    for values that are corrupt or truncated.
+
+    :param errors: Additional exception types to convert
+    :raises: ValueError
+
+    """
+    try:
+        yield
+    except _DECOMPRESSION_ERRORS + errors as error:
+        raise ValueError('Could not decompress value: {}'.format(error))
+
+
+def _field_value(value, path):
+    """Return the value of a possibly nested field of a dict or typed
+    object, or :data:`None` if it is not set.
+
+    :param mixed value: The value to return the field value from
+    :param list path: The names of the nested fields
+    :rtype: mixed
+
+    """
+    for name in path:
+        if isinstance(value, dict):
+            value = value.get(name)
+        else:
+            value = getattr(value, name, None)
+        if value is None:
+            return None
+    return value
+
+
+def _is_representable(item, dtype):
+    """Return :data:`True` if the item is a number that can be stored in an
+    array of the NumPy data type without overflowing or being truncated.
+
+    :param mixed item: The value of the field
+    :param numpy.dtype dtype: The data type of the column
+    :rtype: bool
+
+    """
+    if isinstance(item, bool) or not isinstance(item, (int, float)):
+        return False
+    try:
+        if dtype.kind in 'iu':
+            info = numpy.iinfo(dtype)
+            return ((isinstance(item, int) or item.is_integer()) and
+                    info.min <= item <= info.max)
+        elif dtype.kind == 'f':
+            item = float(item)
+            return (not math.isfinite(item) or
+                    abs(item) <= numpy.finfo(dtype).max)
+        numpy.array(item, dtype=dtype)
+    except (OverflowError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _iter_chunks(value, chunk_size):
+    """Return an iterator of the value in chunks of up to ``chunk_size``.
+
+    :param bytes value: The value to split into chunks
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+
+    """
+    for offset in range(0, len(value), chunk_size):
+        chunk = value[offset:offset + chunk_size]
+        if isinstance(chunk, memoryview):
+            chunk = chunk.tobytes()
+        yield chunk
+
+
+def _iter_decompressed(decompressor, value, chunk_size):
+    """Return an iterator of the value decompressed with a ``bz2`` or
+    ``lz4.frame`` style decompressor that limits the size of its output.
+
+    :param decompressor: The decompressor to use
+    :param bytes value: Compressed value
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    while not decompressor.eof:
+        with _decompressing():
+            chunk = decompressor.decompress(value, chunk_size)
+        value = b''
+        if chunk:
+            yield chunk
+        elif decompressor.needs_input:
+            raise ValueError('Compressed value is incomplete')
+
+
+def _zstd_compressor(level, dictionary=0):
+    """Return the Zstandard compressor for the compression level and
+    dictionary. Compressors are reused per thread as they are not thread-safe,
+    until the dictionary is reloaded.
+
+    :param int level: The compression level
+    :param int dictionary: The id of a loaded dictionary or ``0`` for none
+    :rtype: zstandard.ZstdCompressor
+    :raises: ValueError
+
+    """
+    dict_data = _zstd_dictionary(dictionary)
+    compressors = getattr(_LOCAL, 'zstd_compressors', None)
+    if compressors is None:
+        compressors = _LOCAL.zstd_compressors = {}
+    key = level, dictionary
+    value = compressors.get(key)
+    if value is None or value[0] is not dict_data:
+        value = compressors[key] = dict_data, zstandard.ZstdCompressor(
+            level=level, dict_data=dict_data)
+    return value[1]
+
+
+def _zstd_decompressor(dictionary=0):
+    """Return the Zstandard decompressor for the dictionary in the current
+    thread, reused until the dictionary is reloaded.
+
+    :param int dictionary: The id of a loaded dictionary or ``0`` for none
+    :rtype: zstandard.ZstdDecompressor
+    :raises: ValueError
+
+    """
+    dict_data = _zstd_dictionary(dictionary)
+    decompressors = getattr(_LOCAL, 'zstd_decompressors', None)
+    if decompressors is None:
+        decompressors = _LOCAL.zstd_decompressors = {}
+    value = decompressors.get(dictionary)
+    if value is None or value[0] is not dict_data:
+        value = decompressors[dictionary] = dict_data, \
+            zstandard.ZstdDecompressor(dict_data=dict_data)
+    return value[1]
+
+
+def _zstd_dictionary(dictionary):
+    """Return the loaded Zstandard dictionary for the id.
+
+    :param int dictionary: The id of a loaded dictionary or ``0`` for none
+    :rtype: zstandard.ZstdCompressionDict or None
+    :raises: ValueError
+
+    """
+    if not dictionary:
+        return None
+    try:
+        return ZSTD_DICTIONARIES[dictionary]
+    except KeyError:
+        raise ValueError(
+            'Zstandard dictionary {} is not loaded'.format(dictionary))
+
+
+def load_zstd_dictionary(path):
+    """Load a trained Zstandard dictionary from a file, making it available
+    for compressing and decompressing message bodies.
+
+    :param str path: The path to the dictionary file
+    :return: The dictionary id
+    :rtype: int
+    :raises: IOError
+    :raises: ValueError
+
+    """
+    with open(path, 'rb') as handle:
+        dictionary = zstandard.ZstdCompressionDict(handle.read())
+    dict_id = dictionary.dict_id()
+    if not dict_id:
+        raise ValueError('{} is not a Zstandard dictionary'.format(path))
+    ZSTD_DICTIONARIES[dict_id] = dictionary
+    return dict_id
+
+
+def decode_bz2(value):
+    """Return a bz2 decompressed value
+
+    :param bytes value: Compressed value
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    with _decompressing():
+        return bz2.decompress(value)
+
+
+def decode_gzip(value):
+    """Return a zlib decompressed value
+
+    :param bytes value: Compressed value
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    with _decompressing():
+        return zlib.decompress(value)
+
+
+def decode_lz4(value):
+    """Return a LZ4 frame decompressed value
+
+    :param bytes value: Compressed value
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    with _decompressing():
+        return lz4.frame.decompress(value)
+
+
+def decode_zstd(value):
+    """Return a Zstandard decompressed value, using the dictionary specified
+    in the frame header if it was compressed with one.
+
+    :param bytes value: Compressed value
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    with _decompressing(zstandard.ZstdError):
+        dictionary = zstandard.get_frame_parameters(value).dict_id
+        return _zstd_decompressor(dictionary).decompress(value)
+
+
+def iter_decode_bz2(value, chunk_size=CHUNK_SIZE):
+    """Return an iterator of a bz2 decompressed value in chunks
+
+    :param bytes value: Compressed value
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    return _iter_decompressed(bz2.BZ2Decompressor(), value, chunk_size)
+
+
+def iter_decode_gzip(value, chunk_size=CHUNK_SIZE):
+    """Return an iterator of a zlib decompressed value in chunks
+
+    :param bytes value: Compressed value
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    decompressor = zlib.decompressobj()
+    with _decompressing():
+        chunk = decompressor.decompress(value, chunk_size)
+    while chunk:
+        yield chunk
+        with _decompressing():
+            chunk = decompressor.decompress(
+                decompressor.unconsumed_tail, chunk_size)
+    if not decompressor.eof:
+        raise ValueError('Compressed value is incomplete')
+
+
+def iter_decode_lz4(value, chunk_size=CHUNK_SIZE):
+    """Return an iterator of a LZ4 frame decompressed value in chunks
+
+    :param bytes value: Compressed value
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    return _iter_decompressed(
+        lz4.frame.LZ4FrameDecompressor(), value, chunk_size)
+
+
+def iter_decode_zstd(value, chunk_size=CHUNK_SIZE):
+    """Return an iterator of a Zstandard decompressed value in chunks, using
+    the dictionary specified in the frame header if it was compressed with
+    one.
+
+    :param bytes value: Compressed value
+    :param int chunk_size: The maximum size of each chunk
+    :rtype: iterator(bytes)
+    :raises: ValueError
+
+    """
+    with _decompressing(zstandard.ZstdError):
+        parameters = zstandard.get_frame_parameters(value)
+    size = 0
+    chunks = _zstd_decompressor(parameters.dict_id).read_to_iter(
+        value, write_size=chunk_size)
+    while True:
+        with _decompressing(zstandard.ZstdError):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        size += len(chunk)
+        yield chunk
+    if (parameters.content_size != zstandard.CONTENTSIZE_UNKNOWN and
+            size != parameters.content_size):
+        raise ValueError('Compressed value is incomplete')
+
+
+def encode_bz2(value, level=None):
+    """Return a bzip2 compressed value
+
+    :param str value: Uncompressed value
+    :param int level: The compression level, 1 through 9
+    :rtype: bytes
+
+    """
+    return bz2.compress(_as_bytes(value), level or 9)
+
+
+def encode_gzip(value, level=None):
+    """Return zlib compressed value
+
+    :param str value: Uncompressed value
+    :param int level: The compression level, 0 through 9
+    :rtype: bytes
+
+    """
+    return zlib.compress(_as_bytes(value), -1 if level is None else level)
+
+
+def encode_lz4(value, level=None):
+    """Return a LZ4 frame compressed value
+
+    :param str value: Uncompressed value
+    :param int level: The compression level, 0 through 16
+    :rtype: bytes
+
+    """
+    return lz4.frame.compress(_as_bytes(value), compression_level=level or 0)
+
+
+def encode_zstd(value, level=None, dictionary=None):
+    """Return a Zstandard compressed value
+
+    :param str value: Uncompressed value
+    :param int level: The compression level, 1 through 22
+    :param int dictionary: The id of a loaded dictionary to compress with
+    :rtype: bytes
+    :raises: ValueError
+
+    """
+    return _zstd_compressor(
+        level or ZSTD_LEVEL, dictionary or 0).compress(_as_bytes(value))
+
+
+def dump_bs4(value):
+    """Return a BeautifulSoup object as a string
+
+    :param bs4.BeautifulSoup value: The object to return a string from
+    :rtype: str
+
+    """
+    return str(value)
+
+
+def dump_csv(value):
+    """Take a list of lists and return it as a CSV value
+
+    :param list value: A list of lists to return as a CSV
+    :rtype: str
+
+    """
+    buff = io.StringIO()
+    writer = csv.writer(buff, quotechar='"', quoting=csv.QUOTE_ALL)
+    writer.writerows(value)
+    return buff.getvalue()
+
+
+def dump_json(value):
+    """Serialize a value into JSON
+
+    :param object value: The value to serialize
+    :rtype: bytes
+
+    """
+    if orjson:
+        return orjson.dumps(value)
+    elif ujson:
+        return ujson.dumps(value, ensure_ascii=True).encode('utf-8')
+    return json.dumps(value, ensure_ascii=True).encode('utf-8')
+
+
+def dump_msgpack(value):
+    """Serialize a value into MessagePack
+
+    :param object value: The value to serialize
+    :type value: str or dict or list
+    :rtype: bytes
+
+    """
+    if msgpack:
+        return msgpack.packb(value, use_bin_type=True)
+    return umsgpack.packb(value)
+
+
+def dump_pickle(value):
+    """Serialize a value into the pickle format
+
+    :param object value: The object to pickle
+    :rtype: bytes
+
+    """
+    return pickle.dumps(value)
+
+
+def dump_plist(value):
+    """Create a plist value from a dictionary
+
+    :param dict value: The value to make the plist from
+    :rtype: bytes
+
+    """
+    if hasattr(plistlib, 'dumps'):
+        return plistlib.dumps(value)
+    try:
+        return plistlib.writePlistToString(value).encode('utf-8')
+    except AttributeError:
+        return plistlib.writePlistToBytes(value)
+
+
+def dump_yaml(value):
+    """Dump an object into a YAML string
+
+    :param object value: The value to dump as a YAML string
+    :rtype: str
+
+    """
+    return yaml.dump(value)
+
+
+def load_bs4(value):
+    """Load an HTML or XML string into a BeautifulSoup object.
+
+    :param str value: The HTML or XML string
+    :rtype: bs4.BeautifulSoup
+
+    """
+    return bs4.BeautifulSoup(_as_text(value))
+
+
+def load_csv(value):
+    """Create a csv.DictReader instance for the sniffed dialect for the
+    value passed in.
+
+    :param str value: The CSV value
+    :rtype: csv.DictReader
+
+    """
+    csv_buffer = io.StringIO(_as_text(value))
+    dialect = csv.Sniffer().sniff(csv_buffer.read(1024))
+    csv_buffer.seek(0)
+    return csv.DictReader(csv_buffer, dialect=dialect)
+
+
+def load_json(value):
+    """Deserialize a JSON string returning the native Python data type for
+    the value.
+
+    :param bytes value: The JSON string
+    :rtype: object
+    :raises: ValueError
+
+    """
+    if orjson:
+        return orjson.loads(value)
+    elif ujson:
+        return ujson.loads(_as_text(value))
+    return json.loads(_as_text(value))
+
+
+def load_msgpack(value):
+    """Deserialize a msgpack string returning the native Python data type
+    for the value.
+
+    :param bytes value: The msgpack string
+    :rtype: object
+
+    """
+    if msgpack:
+        return msgpack.unpackb(value, raw=False)
+    return umsgpack.unpackb(value)
+
+
+def load_pickle(value):
+    """Deserialize a pickle string returning the native Python data type
+    for the value.
+
+    :param bytes value: The pickle string
+    :rtype: object
+
+    """
+    return pickle.loads(value)
+
+
+def load_plist(value):
+    """Deserialize a plist string returning the native Python data type
+    for the value.
+
+    :param bytes value: The plist string
+    :rtype: dict
+
+    """
+    if hasattr(plistlib, 'loads'):
+        return plistlib.loads(value)
+    try:
+        return plistlib.readPlistFromString(value)
+    except AttributeError:
+        return plistlib.readPlistFromBytes(value)
+
+
+def load_yaml(value):
+    """Load an YAML string into an dict object.
+
+    :param str value: The YAML string
+    :rtype: any
+
+    """
+    return yaml.load(value)
+
+
+register_content_encoding('gzip', decode_gzip, encode_gzip, iter_decode_gzip)
+if sys.version_info >= (3, 5):  # BZ2Decompressor max_length support
+    register_content_encoding(
+        'bzip2', decode_bz2, encode_bz2, iter_decode_bz2)
+else:  # pragma: nocover
+    register_content_encoding('bzip2', decode_bz2, encode_bz2)
+if lz4:
+    register_content_encoding('lz4', decode_lz4, encode_lz4, iter_decode_lz4)
+if zstandard:
+    register_content_encoding(
+        'zstd', decode_zstd, encode_zstd, iter_decode_zstd)
+
+register_content_type('application/json', load_json, dump_json)
+register_content_type('application/x-plist', load_plist, dump_plist)
+register_content_type('text/csv', load_csv, dump_csv)
+register_content_type(PICKLE_MIME_TYPES, load_pickle, dump_pickle)
+register_content_type(YAML_MIME_TYPES, load_yaml, dump_yaml)
+if bs4:
+    register_content_type(BS4_MIME_TYPES, load_bs4, dump_bs4)
+if msgpack or umsgpack:
+    register_content_type('application/msgpack', load_msgpack, dump_msgpack)
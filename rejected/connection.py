@@ -10,6 +10,7 @@ import os
 
 import pika
 from pika import spec
+from tornado import concurrent, gen, locks
 
 from rejected import errors, log, state, utils
 
@@ -26,6 +27,416 @@ Callbacks = collections.namedtuple(
                   'on_closed', 'on_blocked', 'on_unblocked',
                   'on_confirmation', 'on_delivery'])
 
+# Delivery acknowledgement states used when coalescing acks
+_UNSETTLED = 0
+_ACKED = 1
+_REJECTED = 2
+_REQUEUED = 3
+
+
+class BatchConfirmation(object):
+    """Aggregates the publisher confirmations for messages that were
+    published together into a single future that resolves to a list of
+    delivery results, in the order the messages were published, once all of
+    them have been confirmed.
+
+    :param int count: The number of messages that were published
+
+    """
+    def __init__(self, count):
+        self.future = concurrent.Future()
+        self.remaining = count
+        self.results = [None] * count
+        if not count:
+            self.future.set_result([])
+
+    def entry(self, offset):
+        """Return the object that stands in for the future of a single
+        message when it is tracked by :class:`PublishedMessages`.
+
+        :param int offset: The position of the message in the batch
+        :rtype: rejected.connection.BatchEntry
+
+        """
+        return BatchEntry(self, offset)
+
+
+class BatchEntry(object):
+    """Implements the part of the :class:`~tornado.concurrent.Future`
+    interface used to track a message that belongs to a
+    :class:`BatchConfirmation`, without allocating a future per message.
+
+    """
+    __slots__ = ['batch', 'offset']
+
+    def __init__(self, batch, offset):
+        self.batch = batch
+        self.offset = offset
+
+    def done(self):
+        return (self.batch.future.done() or
+                self.batch.results[self.offset] is not None)
+
+    def set_exception(self, exception):
+        if not self.batch.future.done():
+            self.batch.future.set_exception(exception)
+
+    def set_result(self, result):
+        self.batch.results[self.offset] = result
+        self.batch.remaining -= 1
+        if not self.batch.remaining and not self.batch.future.done():
+            self.batch.future.set_result(self.batch.results)
+
+
+class PublishedMessages(object):
+    """Keeps track of the messages published on a channel with publisher
+    confirmations enabled until RabbitMQ confirms them. Messages are stored
+    in delivery tag order so a ``Basic.Ack`` or ``Basic.Nack`` with the
+    ``multiple`` flag set is resolved by removing messages from the front
+    until the delivery tag is reached. Unconfirmed messages are also indexed
+    by message ID and by exchange and routing key for matching messages that
+    are returned by RabbitMQ.
+
+    """
+    def __init__(self):
+        self._by_message_id = {}
+        self._by_route = {}
+        self._messages = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def add(self, message):
+        """Add a published message that is awaiting confirmation.
+
+        :param rejected.connection.Published message: The published message
+
+        """
+        self._messages[message.delivery_tag] = message
+        if message.message_id is not None:
+            self._index(self._by_message_id, message.message_id, message)
+        self._index(self._by_route,
+                    (message.exchange, message.routing_key), message)
+
+    def clear(self):
+        """Stop tracking all of the published messages."""
+        self._by_message_id.clear()
+        self._by_route.clear()
+        self._messages.clear()
+
+    def confirm(self, delivery_tag, multiple=False):
+        """Remove and return the messages confirmed by delivery tag. If
+        ``multiple`` is ``True``, all messages up to and including the
+        delivery tag are returned.
+
+        :param int delivery_tag: The delivery tag that was confirmed
+        :param bool multiple: Confirm all prior delivery tags as well
+        :rtype: list(rejected.connection.Published)
+
+        """
+        if not multiple:
+            message = self._messages.pop(delivery_tag, None)
+            if message is None:
+                return []
+            self._remove(message)
+            return [message]
+        confirmed = []
+        while self._messages:
+            tag = next(iter(self._messages))
+            if tag > delivery_tag:
+                break
+            confirmed.append(self._messages.pop(tag))
+            self._remove(confirmed[-1])
+        return confirmed
+
+    def match(self, message_id, exchange, routing_key):
+        """Return the unconfirmed message that best matches a message that
+        was returned by RabbitMQ, trying the message ID first, then the
+        exchange and routing key, then falling back to the oldest message.
+
+        :param str message_id: The message ID of the returned message
+        :param str exchange: The exchange of the returned message
+        :param str routing_key: The routing key of the returned message
+        :rtype: rejected.connection.Published or None
+
+        """
+        if message_id in self._by_message_id:
+            message = self._first(self._by_message_id[message_id].values())
+            if message:
+                return message
+        route = (exchange, routing_key)
+        if route in self._by_route:
+            message = self._first(self._by_route[route].values())
+            if message:
+                return message
+        return self.oldest()
+
+    def oldest(self):
+        """Return the oldest message that has yet to be acked, nacked, or
+        returned.
+
+        :rtype: rejected.connection.Published or None
+
+        """
+        return self._first(self._messages.values())
+
+    def pending(self):
+        """Return all published messages that have yet to be acked, nacked,
+        or returned, in delivery tag order.
+
+        :rtype: list(rejected.connection.Published)
+
+        """
+        return [message for message in self._messages.values()
+                if not message.future.done()]
+
+    @staticmethod
+    def _first(messages):
+        """Return the first message with an unresolved future.
+
+        :param messages: The messages to search
+        :type messages: iterable(rejected.connection.Published)
+        :rtype: rejected.connection.Published or None
+
+        """
+        for message in messages:
+            if not message.future.done():
+                return message
+
+    @staticmethod
+    def _index(index, key, message):
+        """Append the message to the index for the key.
+
+        :param dict index: The index to add the message to
+        :param key: The index key
+        :param rejected.connection.Published message: The published message
+
+        """
+        if key not in index:
+            index[key] = collections.OrderedDict()
+        index[key][message.delivery_tag] = message
+
+    def _remove(self, message):
+        """Remove a confirmed message from the indexes.
+
+        :param rejected.connection.Published message: The published message
+
+        """
+        if message.message_id is not None:
+            self._unindex(self._by_message_id, message.message_id, message)
+        self._unindex(self._by_route,
+                      (message.exchange, message.routing_key), message)
+
+    @staticmethod
+    def _unindex(index, key, message):
+        """Remove the message from the index for the key, removing the key
+        once it no longer has any messages.
+
+        :param dict index: The index to remove the message from
+        :param key: The index key
+        :param rejected.connection.Published message: The published message
+
+        """
+        messages = index.get(key)
+        if messages is None:
+            return
+        messages.pop(message.delivery_tag, None)
+        if not messages:
+            del index[key]
+
+
+class PublishingChannel(object):
+    """Publishes messages on a channel and keeps track of the publisher
+    confirmations for them. Each :class:`Connection` has one for the channel
+    it consumes on and, when ``publishing_channels`` is set, one for each of
+    the channels that are dedicated to publishing.
+
+    :param rejected.connection.Connection connection: The connection the
+        channel belongs to
+
+    """
+    def __init__(self, connection):
+        self.channel = None
+        self.connection = connection
+        self.delivery_tag = 0
+        self.logger = connection.logger
+        self.published_messages = PublishedMessages()
+
+    @property
+    def is_open(self):
+        """Returns ``True`` if the channel is open.
+
+        :rtype: bool
+
+        """
+        return self.channel is not None and self.channel.is_open
+
+    def add_confirmation_batch(self, messages):
+        """Invoked by :class:`~rejected.consumer.Consumer` when publisher
+        confirmations are enabled and multiple messages were published in a
+        single pass, returning a future that resolves to the list of delivery
+        results once RabbitMQ has confirmed all of the messages.
+
+        :param list messages: The ``(exchange, routing_key, properties)``
+            tuples of the published messages, in the order they were
+            published
+        :rtype: tornado.concurrent.Future
+
+        """
+        batch = BatchConfirmation(len(messages))
+        for offset, (exchange, routing_key, properties) in \
+                enumerate(messages):
+            self.delivery_tag += 1
+            self.published_messages.add(
+                Published(self.delivery_tag, properties.message_id,
+                          exchange, routing_key, batch.entry(offset)))
+        return batch.future
+
+    def add_confirmation_future(self, exchange, routing_key, properties,
+                                future):
+        """Invoked by :class:`~rejected.consumer.Consumer` when publisher
+        confirmations are enabled, containing a stack of futures to finish,
+        by delivery tag, when RabbitMQ confirms the delivery.
+
+        :param str exchange: The exchange the message was published to
+        :param str routing_key: The routing key that was used
+        :param properties: AMQP message properties of published message
+        :type properties: pika.spec.Basic.Properties
+        :param tornado.concurrent.Future future: The future to resolve
+
+        """
+        self.delivery_tag += 1
+        self.published_messages.add(
+            Published(self.delivery_tag, properties.message_id, exchange,
+                      routing_key, future))
+
+    def confirm_delivery(self, delivery_tag, delivered, multiple=False):
+        """Invoked by RabbitMQ when it is confirming delivery via a Basic.Ack
+
+        :param int delivery_tag: The message # being confirmed
+        :param bool delivered: Was the message delivered
+        :param bool multiple: Confirm all prior delivery tags as well
+
+        """
+        confirmed = self.published_messages.confirm(delivery_tag, multiple)
+        if not confirmed:
+            self.logger.warning(
+                'Attempted to confirm publish without future: %r',
+                delivery_tag)
+        for msg in confirmed:
+            if not msg.future.done():  # Returned messages are already done
+                msg.future.set_result(delivered)
+        if confirmed and self.connection.publish_window:
+            self.connection.publish_window_changed.notify_all()
+
+    def discard(self, error=None):
+        """Stop tracking the published messages awaiting confirmation,
+        resetting the delivery tag and waking anything waiting on the
+        publish window. If an error is passed in, it is set on the pending
+        futures.
+
+        :param Exception error: The error to fail pending messages with
+        :return: The number of pending messages that were discarded
+        :rtype: int
+
+        """
+        pending = self.published_messages.pending()
+        self.published_messages.clear()
+        self.delivery_tag = 0
+        self.connection.publish_window_changed.notify_all()
+        if error is not None:
+            for message in pending:
+                message.future.set_exception(error)
+        return len(pending)
+
+    def on_channel_closed(self, _channel, reply_code, reply_text):
+        """Invoked by pika when a channel that is dedicated to publishing is
+        closed, failing the messages awaiting confirmation and reopening the
+        channel if the connection is still open.
+
+        :param pika.channel.Channel _channel: The AMQP Channel
+        :param int reply_code: The AMQP reply code
+        :param str reply_text: The AMQP reply text
+
+        """
+        self.logger.warning('Publishing channel was closed: (%s) %s',
+                            reply_code, reply_text)
+        self.channel = None
+        self.discard(errors.RabbitMQException(
+            self.connection.name, reply_code, reply_text))
+        if (not self.connection.is_shutting_down and
+                self.connection.handle and self.connection.handle.is_open):
+            self.connection.handle.channel(self.on_channel_open)
+
+    def on_channel_open(self, channel):
+        """Invoked by pika when a channel that is dedicated to publishing has
+        been opened.
+
+        :param pika.channel.Channel channel: The channel object
+
+        """
+        self.logger.debug('Publishing channel opened')
+        self.channel = channel
+        self.channel.add_on_close_callback(self.on_channel_closed)
+        self.setup()
+
+    def on_confirmation(self, frame):
+        """Invoked by pika when RabbitMQ responds to a Basic.Publish RPC
+        command, passing in either a Basic.Ack or Basic.Nack frame with
+        the delivery tag of the message that was published. The delivery tag
+        is an integer counter indicating the message number that was sent
+        on the channel via Basic.Publish.
+
+        :param pika.frame.Method frame: Basic.Ack or Basic.Nack frame
+
+        """
+        delivered = frame.method.NAME.split('.')[1].lower() == 'ack'
+        self.logger.debug('Received publisher confirmation (Delivered: %s)',
+                          delivered)
+        self.confirm_delivery(frame.method.delivery_tag, delivered,
+                              frame.method.multiple)
+
+    def on_return(self, channel, method, properties, body):
+        """Invoked by RabbitMQ when it returns a message that was published.
+
+        :param channel: The channel the message was delivered on
+        :type channel: pika.channel.Channel
+        :param method: The AMQP method frame
+        :type method: pika.frame.Frame
+        :param properties: The AMQP message properties
+        :type properties: pika.spec.Basic.Properties
+        :param bytes body: The message body
+
+        """
+        msg = self.published_messages.match(
+            properties.message_id, method.exchange, method.routing_key)
+        if not msg:  # Exit early if there are no pending messages
+            self.logger.warning('RabbitMQ returned message %s and no pending '
+                                'messages are unconfirmed',
+                                utils.message_info(method.exchange,
+                                                   method.routing_key,
+                                                   properties))
+            return
+
+        self.logger.warning('RabbitMQ returned message %s: (%s) %s',
+                            utils.message_info(method.exchange,
+                                               method.routing_key, properties),
+                            method.reply_code, method.reply_text)
+
+        # The message remains tracked until RabbitMQ confirms its delivery
+        # tag, which follows the Basic.Return
+        msg.future.set_result(False)
+
+    def setup(self):
+        """Enable publisher confirmations on the channel if they are enabled
+        for the connection, restarting the delivery tags.
+
+        """
+        if self.connection.publisher_confirmations:
+            self.delivery_tag = 0
+            self.channel.confirm_delivery(self.on_confirmation)
+            self.channel.add_on_return_callback(self.on_return)
+
 
 class Connection(state.State):
     """Contains the connection to RabbitMQ used by
@@ -39,23 +450,37 @@ class Connection(state.State):
     STATE_CONNECTED = 0x09
 
     def __init__(self, name, config, consumer_name, should_consume,
-                 publisher_confirmations, io_loop, callbacks):
+                 publisher_confirmations, io_loop, callbacks,
+                 ack_batch_size=1, ack_batch_timeout=0, publish_window=0,
+                 publishing_channels=0):
         super(Connection, self).__init__()
+        self.ack_batch_size = ack_batch_size
+        self.ack_batch_timeout = ack_batch_timeout
+        self.ack_timer = None
         self.blocked = False
         self.callbacks = callbacks
         self.channel = None
         self.config = config
         self.correlation_id = None
-        self.delivery_tag = 0
         self.should_consume = should_consume
         self.consumer_tag = '{}-{}-{}'.format(name, consumer_name, os.getpid())
         self.io_loop = io_loop
-        self.last_confirmation = 0
         self.logger = log.CorrelationIDAdapter(LOGGER, {'parent': self})
         self.name = name
-        self.published_messages = []
+        self.no_ack = False
+        self.paused = False
+        self.pausing = False
+        self.pending_acks = 0
+        self.publish_index = 0
+        self.publish_window = publish_window
+        self.publish_window_changed = locks.Condition()
+        self.publisher = PublishingChannel(self)
         self.publisher_confirmations = publisher_confirmations
+        self.publishers = [PublishingChannel(self)
+                           for _offset in range(publishing_channels)]
+        self.queue_name = None
         self.handle = None
+        self.unsettled = collections.OrderedDict()
         self.connect()
 
         # Set specific state values
@@ -80,11 +505,110 @@ class Connection(state.State):
         """
         return self.state in [self.STATE_ACTIVE, self.STATE_CONNECTED]
 
+    @property
+    def is_publish_window_full(self):
+        """Returns ``True`` if a publish window is set and the number of
+        published messages awaiting confirmation has reached it.
+
+        :rtype: bool
+
+        """
+        return bool(self.publish_window and
+                    sum(len(publisher.published_messages)
+                        for publisher in self._publishers) >=
+                    self.publish_window)
+
+    @property
+    def published_messages(self):
+        """Returns the messages published on the consuming channel that are
+        awaiting confirmation.
+
+        :rtype: rejected.connection.PublishedMessages
+
+        """
+        return self.publisher.published_messages
+
+    def ack(self, delivery_tag):
+        """Acknowledge the delivery of a message on the channel. When ack
+        batching is enabled, the acknowledgement is deferred until
+        :meth:`~rejected.connection.Connection.flush_acks` is invoked.
+
+        :param int delivery_tag: The delivery tag of the message
+
+        """
+        if delivery_tag not in self.unsettled:
+            return self.channel.basic_ack(delivery_tag=delivery_tag)
+        self._settle(delivery_tag, _ACKED)
+
+    def nack(self, delivery_tag, requeue=True):
+        """Negatively acknowledge the delivery of a message on the channel.
+        When ack batching is enabled, the negative acknowledgement is deferred
+        until :meth:`~rejected.connection.Connection.flush_acks` is invoked.
+
+        :param int delivery_tag: The delivery tag of the message
+        :param bool requeue: Specify if the message should be re-queued or not
+
+        """
+        if delivery_tag not in self.unsettled:
+            return self.channel.basic_nack(
+                delivery_tag=delivery_tag, requeue=requeue)
+        self._settle(delivery_tag, _REQUEUED if requeue else _REJECTED)
+
+    def flush_acks(self):
+        """Send the deferred acknowledgements to RabbitMQ. Contiguous runs of
+        the same result, starting at the lowest outstanding delivery tag, are
+        sent as a single frame with ``multiple`` set. Results for messages
+        delivered after a message that is still being processed are sent
+        with a frame per delivery tag.
+
+        """
+        if self.ack_timer:
+            self.io_loop.remove_timeout(self.ack_timer)
+            self.ack_timer = None
+        if not self.pending_acks:
+            return
+        elif not self.channel or self.channel.is_closed:
+            self.logger.warning('Discarding %i pending acks, channel closed',
+                                self.pending_acks)
+            return self._discard_acks()
+
+        self.logger.debug('Flushing %i pending acks', self.pending_acks)
+        run_tag, run_result, run_length, blocked = None, None, 0, False
+        for delivery_tag, result in list(self.unsettled.items()):
+            if result == _UNSETTLED:
+                blocked = True
+            elif blocked:
+                self._send_ack(delivery_tag, result)
+            else:
+                if run_result is not None and result != run_result:
+                    self._send_ack(run_tag, run_result, run_length > 1)
+                    run_length = 0
+                run_tag, run_result, run_length = \
+                    delivery_tag, result, run_length + 1
+            if result != _UNSETTLED:
+                del self.unsettled[delivery_tag]
+            if blocked and run_result is not None:
+                self._send_ack(run_tag, run_result, run_length > 1)
+                run_result = None
+        if run_result is not None:
+            self._send_ack(run_tag, run_result, run_length > 1)
+        self.pending_acks = 0
+
+    def add_confirmation_batch(self, messages):
+        """Track the confirmations for messages published in a single pass
+        on the consuming channel.
+
+        :param list messages: The ``(exchange, routing_key, properties)``
+            tuples of the published messages
+        :rtype: tornado.concurrent.Future
+
+        """
+        return self.publisher.add_confirmation_batch(messages)
+
     def add_confirmation_future(self, exchange, routing_key, properties,
                                 future):
-        """Invoked by :class:`~rejected.consumer.Consumer` when publisher
-        confirmations are enabled, containing a stack of futures to finish,
-        by delivery tag, when RabbitMQ confirms the delivery.
+        """Track the confirmation for a message published on the consuming
+        channel.
 
         :param str exchange: The exchange the message was published to
         :param str routing_key: The routing key that was used
@@ -93,17 +617,8 @@ class Connection(state.State):
         :param tornado.concurrent.Future future: The future to resolve
 
         """
-        self.delivery_tag += 1
-        self.published_messages.append(
-            Published(self.delivery_tag, properties.message_id, exchange,
-                      routing_key, future))
-
-    def clear_confirmation_futures(self):
-        """Invoked by :class:`~rejected.consumer.Consumer` when process has
-        finished and publisher confirmations are enabled.
-
-        """
-        self.published_messages = []
+        self.publisher.add_confirmation_future(
+            exchange, routing_key, properties, future)
 
     def connect(self):
         """Create the low-level AMQP connection to RabbitMQ.
@@ -119,13 +634,21 @@ class Connection(state.State):
             stop_ioloop_on_close=False,
             custom_ioloop=self.io_loop)
 
-    def reset(self):
+    def reset(self, error=None):
+        """Reset the connection state once the connection is closed,
+        failing the published messages that are awaiting confirmation with
+        the error if one is passed in.
+
+        :param Exception error: The error to fail pending messages with
+
+        """
+        self._discard_acks()
         self.channel = None
         self.handle = None
         self.correlation_id = None
-        self.published_messages = []
-        self.delivery_tag = 0
-        self.last_confirmation = 0
+        for publisher in self._publishers:
+            publisher.channel = None
+            publisher.discard(error)
         self.set_state(self.STATE_CLOSED)
 
     def shutdown(self):
@@ -139,6 +662,7 @@ class Connection(state.State):
 
         self.set_state(self.STATE_SHUTTING_DOWN)
         self.logger.debug('Shutting down connection')
+        self.flush_acks()
         if not self.is_active:
             return self.channel.close()
         self.logger.debug('Sending a Basic.Cancel to RabbitMQ')
@@ -156,6 +680,8 @@ class Connection(state.State):
         self.handle.add_on_connection_unblocked_callback(self.on_unblocked)
         self.handle.add_on_close_callback(self.on_closed)
         self.handle.channel(self.on_channel_open)
+        for publisher in self.publishers:
+            self.handle.channel(publisher.on_channel_open)
 
     def on_open_error(self, *args, **kwargs):
         self.logger.error('Connection failure %r %r', args, kwargs)
@@ -165,7 +691,7 @@ class Connection(state.State):
     def on_closed(self, _connection, reply_code, reply_text):
         self.set_state(self.STATE_CLOSED)
         self.logger.debug('Connection closed (%s) %s', reply_code, reply_text)
-        self.reset()
+        self.reset(errors.RabbitMQException(self.name, reply_code, reply_text))
         self.callbacks.on_closed(self.name)
 
     def on_blocked(self, frame):
@@ -188,13 +714,13 @@ class Connection(state.State):
         """
         self.logger.debug('Channel opened')
         self.set_state(self.STATE_CONNECTED)
+        self._discard_acks()
+        self.paused, self.pausing = False, False
         self.channel = channel
         self.channel.add_on_close_callback(self.on_channel_closed)
         self.channel.add_on_cancel_callback(self.on_consumer_cancelled)
-        if self.publisher_confirmations:
-            self.delivery_tag = 0
-            self.channel.confirm_delivery(self.on_confirmation)
-            self.channel.add_on_return_callback(self.on_return)
+        self.publisher.channel = channel
+        self.publisher.setup()
         self.callbacks.on_ready(self.name)
 
     def on_channel_closed(self, _channel, reply_code, reply_text):
@@ -211,41 +737,153 @@ class Connection(state.State):
         """
         self.logger.warning('Channel was closed: (%s) %s - %s',
                             reply_code, reply_text, self.state_description)
+        self._discard_acks()
+
+        # Delivery tags restart on a new channel, so the messages published
+        # on the closed channel will never be confirmed
+        error = errors.RabbitMQException(self.name, reply_code, reply_text)
         if not (400 <= reply_code <= 499):
             self.set_state(self.STATE_CLOSED)
+            self.publisher.discard(error)
             return
 
         if self.is_shutting_down:
             self.logger.debug('Closing connection')
+            self.publisher.discard(error)
             self.handle.close()
             return
 
         self.set_state(self.STATE_CONNECTING)
         self.handle.channel(self.on_channel_open)
+        if not self.publisher.discard(error):
+            raise error
 
-        pending = self.pending_confirmations()
-        if not pending:
-            raise errors.RabbitMQException(self.name, reply_code, reply_text)
-        pending[0][1].future.set_exception(
-                errors.RabbitMQException(self.name, reply_code, reply_text))
-
-    def consume(self, queue_name, no_ack, prefetch_count):
+    def consume(self, queue_name, no_ack, prefetch_count, global_qos=False):
         """Consume messages from RabbitMQ, changing the state, QoS and issuing
         the RPC to RabbitMQ to start delivering messages.
 
+        RabbitMQ only applies a per-consumer prefetch count to consumers
+        started after it is set, so ``global_qos`` should be enabled when the
+        prefetch count is going to be changed while consuming.
+
         :param str queue_name: The name of the queue to consume from
         :param False no_ack: Enable no-ack mode
         :param int prefetch_count: The number of messages to prefetch
+        :param bool global_qos: Apply the prefetch count to the channel
 
         """
         if self.state == self.STATE_ACTIVE:
             self.logger.debug('%s already consuming', self.name)
             return
-        self.set_state(self.STATE_ACTIVE)
-        self.channel.basic_qos(self.on_qos_set, 0, prefetch_count, False)
-        self.channel.basic_consume(
-            consumer_callback=self.on_delivery, queue=queue_name,
-            no_ack=no_ack, consumer_tag=self.consumer_tag)
+        self.no_ack = no_ack
+        self.queue_name = queue_name
+        self.channel.basic_qos(
+            self.on_qos_set, 0, prefetch_count, global_qos)
+        self._basic_consume()
+
+    def pause(self):
+        """Stop consuming by sending a ``Basic.Cancel`` to RabbitMQ while
+        keeping the channel open, so that messages that were already
+        delivered can still be acknowledged.
+
+        """
+        if self.paused:
+            return
+        elif self.pausing:
+            self.paused = True
+            return
+        elif not self.is_active:
+            return
+        self.logger.debug('Pausing consuming')
+        self.paused, self.pausing = True, True
+        self.set_state(self.STATE_CONNECTED)
+        self.channel.basic_cancel(self.on_paused, self.consumer_tag)
+
+    def publish(self, exchange, routing_key, properties, body):
+        """Publish a message on behalf of rejected, such as a message that
+        is republished to an error exchange, on the next publishing channel.
+        When publisher confirmations are enabled, the confirmation is
+        tracked so that the delivery tags of the channel remain in sync, and
+        messages that are not delivered are logged.
+
+        :param str exchange: The exchange to publish to
+        :param str routing_key: The routing key to publish with
+        :param properties: The AMQP message properties
+        :type properties: pika.spec.BasicProperties
+        :param bytes body: The message body
+        :rtype: tornado.concurrent.Future or None
+
+        """
+        publisher = self.next_publisher()
+        publisher.channel.basic_publish(
+            exchange=exchange, routing_key=routing_key, body=body,
+            properties=properties, mandatory=self.publisher_confirmations)
+        if not self.publisher_confirmations:
+            return
+        future = concurrent.Future()
+        publisher.add_confirmation_future(
+            exchange, routing_key, properties, future)
+
+        def on_confirmation(confirmation):
+            info = utils.message_info(exchange, routing_key, properties)
+            if confirmation.exception():
+                self.logger.warning('Republished message %s was not '
+                                    'confirmed: %s', info,
+                                    confirmation.exception())
+            elif not confirmation.result():
+                self.logger.warning('Republished message %s was not '
+                                    'delivered', info)
+
+        future.add_done_callback(on_confirmation)
+        return future
+
+    def resume(self):
+        """Resume consuming after it was paused. If the ``Basic.CancelOk``
+        has not been received yet, consuming is resumed once it is.
+
+        """
+        if not self.paused:
+            return
+        self.logger.debug('Resuming consuming')
+        self.paused = False
+        if not self.pausing:
+            self._basic_consume()
+
+    def set_qos(self, prefetch_count):
+        """Change the QoS prefetch count for the channel while consuming. The
+        prefetch count is applied to the channel, as RabbitMQ does not apply
+        changes to the per-consumer prefetch count of an active consumer.
+
+        :param int prefetch_count: The number of messages to prefetch
+
+        """
+        if not self.channel or self.channel.is_closed:
+            self.logger.debug('Can not set QoS, channel is closed')
+            return
+        self.channel.basic_qos(self.on_qos_set, 0, prefetch_count, True)
+
+    @gen.coroutine
+    def wait_for_publish_window(self):
+        """Wait until the number of published messages that are awaiting
+        confirmation is below the publish window, returning immediately if
+        it already is or no publish window is set.
+
+        """
+        while self.is_publish_window_full:
+            yield self.publish_window_changed.wait()
+
+    def on_paused(self, _frame):
+        """Invoked by pika when the ``Basic.CancelOk`` is received after
+        pausing, resuming consuming if it was requested in the meantime.
+
+        :param _frame: The Basic.CancelOk frame
+        :type _frame: pika.frame.Frame
+
+        """
+        self.logger.debug('Consuming paused')
+        self.pausing = False
+        if not self.paused:
+            self._basic_consume()
 
     def on_qos_set(self, frame):
         """Invoked by pika when the QoS is set
@@ -265,47 +903,47 @@ class Connection(state.State):
         """
         self.logger.debug('Consumer has been cancelled')
         if self.is_shutting_down:
+            self.flush_acks()
             self.channel.close()
         else:
             self.set_state(self.STATE_CONNECTED)
 
-    def on_confirmation(self, frame):
-        """Invoked by pika when RabbitMQ responds to a Basic.Publish RPC
-        command, passing in either a Basic.Ack or Basic.Nack frame with
-        the delivery tag of the message that was published. The delivery tag
-        is an integer counter indicating the message number that was sent
-        on the channel via Basic.Publish.
+    def confirm_delivery(self, delivery_tag, delivered, multiple=False):
+        """Confirm the delivery of messages published on the consuming
+        channel.
 
-        :param pika.frame.Method frame: Basic.Ack or Basic.Nack frame
+        :param int delivery_tag: The message # being confirmed
+        :param bool delivered: Was the message delivered
+        :param bool multiple: Confirm all prior delivery tags as well
 
         """
-        delivered = frame.method.NAME.split('.')[1].lower() == 'ack'
-        self.logger.debug('Received publisher confirmation (Delivered: %s)',
-                          delivered)
-        if frame.method.multiple:
-            for index in range(self.last_confirmation + 1,
-                               frame.method.delivery_tag):
-                self.confirm_delivery(index, delivered)
-        self.confirm_delivery(frame.method.delivery_tag, delivered)
-        self.last_confirmation = frame.method.delivery_tag
-
-    def confirm_delivery(self, delivery_tag, delivered):
-        """Invoked by RabbitMQ when it is confirming delivery via a Basic.Ack
+        self.publisher.confirm_delivery(delivery_tag, delivered, multiple)
 
-        :param
-        :param int delivery_tag: The message # being confirmed
-        :param bool delivered: Was the message delivered
+    def next_publisher(self):
+        """Return the :class:`PublishingChannel` to publish the next message
+        on, rotating through the open channels that are dedicated to
+        publishing and falling back to the consuming channel if there are
+        none.
+
+        :rtype: rejected.connection.PublishingChannel
+
+        """
+        for _offset in range(len(self.publishers)):
+            publisher = self.publishers[self.publish_index]
+            self.publish_index = \
+                (self.publish_index + 1) % len(self.publishers)
+            if publisher.is_open:
+                return publisher
+        return self.publisher
+
+    def on_confirmation(self, frame):
+        """Invoked by pika when RabbitMQ confirms a message published on the
+        consuming channel.
+
+        :param pika.frame.Method frame: Basic.Ack or Basic.Nack frame
 
         """
-        for offset, msg in self.pending_confirmations():
-            if delivery_tag == msg.delivery_tag:
-                self.published_messages[offset].future.set_result(delivered)
-                return
-        for msg in self.published_messages:
-            if msg.delivery_tag == delivery_tag and msg.future.done():
-                return
-        self.logger.warning('Attempted to confirm publish without future: %r',
-                            delivery_tag)
+        self.publisher.on_confirmation(frame)
 
     def on_delivery(self, channel, method, properties, body):
         """Invoked by pika when RabbitMQ delivers a message from a queue.
@@ -319,11 +957,14 @@ class Connection(state.State):
         :param bytes body: The message body
 
         """
+        if self.ack_batch_size > 1 and not self.no_ack:
+            self.unsettled[method.delivery_tag] = _UNSETTLED
         self.callbacks.on_delivery(
             self.name, channel, method, properties, body)
 
     def on_return(self, channel, method, properties, body):
-        """Invoked by RabbitMQ when it returns a message that was published.
+        """Invoked by RabbitMQ when it returns a message that was published
+        on the consuming channel.
 
         :param channel: The channel the message was delivered on
         :type channel: pika.channel.Channel
@@ -334,43 +975,87 @@ class Connection(state.State):
         :param bytes body: The message body
 
         """
-        pending = self.pending_confirmations()
-        if not pending:  # Exit early if there are no pending messages
-            self.logger.warning('RabbitMQ returned message %s and no pending '
-                                'messages are unconfirmed',
-                                utils.message_info(method.exchange,
-                                                   method.routing_key,
-                                                   properties))
+        self.publisher.on_return(channel, method, properties, body)
+
+    def pending_confirmations(self):
+        """Return all published messages that have yet to be acked, nacked, or
+        returned.
+
+        :rtype: list(rejected.connection.Published)
+
+        """
+        pending = []
+        for publisher in self._publishers:
+            pending.extend(publisher.published_messages.pending())
+        return pending
+
+    def _basic_consume(self):
+        """Issue the ``Basic.Consume`` RPC to RabbitMQ to start delivering
+        messages, if the channel is still open.
+
+        """
+        if (self.is_shutting_down or not self.channel or
+                self.channel.is_closed):
             return
+        self.set_state(self.STATE_ACTIVE)
+        self.channel.basic_consume(
+            consumer_callback=self.on_delivery, queue=self.queue_name,
+            no_ack=self.no_ack, consumer_tag=self.consumer_tag)
 
-        self.logger.warning('RabbitMQ returned message %s: (%s) %s',
-                            utils.message_info(method.exchange,
-                                               method.routing_key, properties),
-                            method.reply_code, method.reply_text)
+    @property
+    def _publishers(self):
+        """Return the publishing state for the consuming channel and the
+        channels dedicated to publishing.
 
-        # Try and match the exact message or first message published that
-        # matches the exchange and routing key
-        for offset, msg in pending:
-            if (msg.message_id == properties.message_id or
-                    (msg.exchange == method.exchange and
-                     msg.routing_key == method.routing_key)):
-                self.published_messages[offset].future.set_result(False)
-                return
+        :rtype: list(rejected.connection.PublishingChannel)
 
-        # Handle the case where we only can go on message ordering
-        self.published_messages[0].future.set_result(False)
+        """
+        return [self.publisher] + self.publishers
 
-    def pending_confirmations(self):
-        """Return all published messages that have yet to be acked, nacked, or
-        returned.
+    def _discard_acks(self):
+        """Discard the deferred acknowledgements and outstanding delivery tags
+        when the channel is closed or replaced, as RabbitMQ will redeliver
+        the messages.
+
+        """
+        if self.ack_timer:
+            self.io_loop.remove_timeout(self.ack_timer)
+            self.ack_timer = None
+        self.pending_acks = 0
+        self.unsettled.clear()
+
+    def _send_ack(self, delivery_tag, result, multiple=False):
+        """Send the Basic.Ack or Basic.Nack frame for the delivery tag.
+
+        :param int delivery_tag: The delivery tag of the message
+        :param int result: The deferred acknowledgement state
+        :param bool multiple: Include all prior outstanding delivery tags
+
+        """
+        if result == _ACKED:
+            self.channel.basic_ack(delivery_tag=delivery_tag,
+                                   multiple=multiple)
+        else:
+            self.channel.basic_nack(delivery_tag=delivery_tag,
+                                    multiple=multiple,
+                                    requeue=result == _REQUEUED)
+
+    def _settle(self, delivery_tag, result):
+        """Record the result for an outstanding delivery tag, flushing the
+        deferred acknowledgements if ``ack_batch_size`` has been reached or
+        scheduling the flush for when ``ack_batch_timeout`` expires.
 
-        :return: [(int, Published)]
+        :param int delivery_tag: The delivery tag of the message
+        :param int result: The deferred acknowledgement state
 
         """
-        return sorted([(idx, msg)
-                       for idx, msg in enumerate(self.published_messages)
-                       if not msg.future.done()],
-                      key=lambda x: x[1].delivery_tag)
+        self.unsettled[delivery_tag] = result
+        self.pending_acks += 1
+        if self.pending_acks >= self.ack_batch_size or self.is_shutting_down:
+            self.flush_acks()
+        elif not self.ack_timer:
+            self.ack_timer = self.io_loop.call_later(
+                self.ack_batch_timeout / 1000.0, self.flush_acks)
 
     @property
     def _connection_parameters(self):
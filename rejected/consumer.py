@@ -1,6 +1,7 @@
 """
-The :py:class:`Consumer`, and :py:class:`SmartConsumer` provide base
-classes to extend for consumer applications.
+The :py:class:`Consumer`, :py:class:`SmartConsumer`, :py:class:`BatchConsumer`,
+:py:class:`ThreadPoolConsumer`, and :py:class:`ProcessPoolConsumer` provide
+base classes to extend for consumer applications.
 
 While the :py:class:`Consumer` class provides all the structure required for
 implementing a rejected consumer, the :py:class:`SmartConsumer` adds
@@ -9,12 +10,12 @@ are received by consumers extending :py:class:`SmartConsumer`, if the message's
 ``content_type`` property contains one of the supported mime-types, the message
 body will automatically be deserialized, making the deserialized message body
 available via the ``body`` attribute. Additionally, should one of the supported
-``content_encoding`` types (``gzip`` or ``bzip2``) be specified in the
-message's property, it will automatically be decoded.
+``content_encoding`` types (``gzip``, ``bzip2``, ``lz4`` or ``zstd``) be
+specified in the message's property, it will automatically be decoded.
 
 Supported `SmartConsumer` MIME types are:
 
- - application/msgpack (with u-msgpack-python installed)
+ - application/msgpack (with msgpack or u-msgpack-python installed)
  - application/json
  - application/pickle
  - application/x-pickle
@@ -27,40 +28,37 @@ Supported `SmartConsumer` MIME types are:
  - text/yaml
  - text/x-yaml
 
+Additional MIME types and content encodings are supported by registering
+codecs with :py:mod:`rejected.codec`.
+
 """
-import bz2
 import contextlib
-import csv
 import datetime
-import io
-import json
+import functools
 import logging
-import pickle
-import plistlib
+import multiprocessing
 import sys
+import threading
 import time
 import uuid
-import zlib
 
 import pika
 from pika import exceptions
-from tornado import concurrent, gen, locks
-import yaml
+from tornado import concurrent, gen, ioloop, locks, stack_context
 
-from rejected import data, errors, log
+from rejected import codec, data, envelope, errors, log, schema
 
 # Optional imports
 try:
-    import bs4
+    from concurrent import futures
 except ImportError:  # pragma: nocover
-    logging.warning('BeautifulSoup not found, disabling html and xml support')
-    bs4 = None
+    futures = None
 
+# Python 3.5+ native coroutine support
 try:
-    import umsgpack
+    from inspect import isawaitable
 except ImportError:  # pragma: nocover
-    logging.warning('umsgpack not found, disabling msgpack support')
-    umsgpack = None
+    isawaitable = None
 
 # Python3 Support
 try:
@@ -74,11 +72,71 @@ _DROPPED_MESSAGE = 'X-Rejected-Dropped'
 _PROCESSING_EXCEPTIONS = 'X-Processing-Exceptions'
 _EXCEPTION_FROM = 'X-Exception-From'
 
-BS4_MIME_TYPES = ('text/html', 'text/xml')
-PICKLE_MIME_TYPES = ('application/pickle', 'application/x-pickle',
-                     'application/x-vnd.python.pickle',
-                     'application/vnd.python.pickle')
-YAML_MIME_TYPES = ('text/yaml', 'text/x-yaml')
+BS4_MIME_TYPES = codec.BS4_MIME_TYPES
+PICKLE_MIME_TYPES = codec.PICKLE_MIME_TYPES
+YAML_MIME_TYPES = codec.YAML_MIME_TYPES
+
+
+def _call_in_worker(submitted_at, func, args, kwargs):
+    """Invoke a function in a :class:`ProcessPoolConsumer` worker process,
+    returning how long the call waited for a worker along with the result.
+
+    :param float submitted_at: When the call was submitted to the pool
+    :param callable func: The function to invoke
+    :param tuple args: The positional arguments for the function
+    :param dict kwargs: The keyword arguments for the function
+    :rtype: tuple
+
+    """
+    wait = max(submitted_at, time.time()) - submitted_at
+    return wait, func(*args, **kwargs)
+
+
+def _is_async(value):
+    """Returns a bool specifying if the value returned by a consumer method
+    is a :class:`~tornado.concurrent.Future` or, for ``async def`` methods, an
+    awaitable that needs to be yielded.
+
+    :param mixed value: The value returned by the method
+    :rtype: bool
+
+    """
+    return concurrent.is_future(value) or bool(
+        isawaitable and isawaitable(value))
+
+
+def _picklable(value):
+    """Return a copy of a :class:`memoryview` as :class:`bytes` so that it
+    can be pickled when passed to a :class:`ProcessPoolConsumer` worker,
+    returning other values as is.
+
+    :param mixed value: The value to check
+    :rtype: mixed
+
+    """
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    return value
+
+
+class _Context(object):
+    """Per-message state for a :class:`Consumer`. Each message that is being
+    processed gets its own context, allowing a single consumer instance to
+    process multiple messages concurrently.
+
+    """
+    __slots__ = ['body', 'confirmations', 'correlation_id', 'finished',
+                 'measurement', 'message', 'message_body', 'published']
+
+    def __init__(self, message=None, measurement=None):
+        self.body = None
+        self.confirmations = None
+        self.correlation_id = None
+        self.finished = False
+        self.measurement = measurement
+        self.message = message
+        self.message_body = None
+        self.published = None
 
 
 class Consumer(object):
@@ -189,7 +247,7 @@ class Consumer(object):
         """
         self._confirmation_futures = {}
         self._connections = {}
-        self._correlation_id = None
+        self._context = _Context()
         self._drop_exchange = kwargs.get('drop_exchange') or self.DROP_EXCHANGE
         self._drop_invalid = (kwargs.get('drop_invalid_messages') or
                               self.DROP_INVALID_MESSAGES)
@@ -198,11 +256,7 @@ class Consumer(object):
         self._error_max_retry = (kwargs.get('error_max_retry') or
                                  self.ERROR_MAX_RETRIES or
                                  self.ERROR_MAX_RETRY)
-        self._finished = False
-        self._message = None
         self._message_type = kwargs.get('message_type') or self.MESSAGE_TYPE
-        self._measurement = None
-        self._message_body = None
         self._process = kwargs['process']
         self._settings = kwargs['settings']
         self._yield_condition = locks.Condition()
@@ -232,7 +286,8 @@ class Consumer(object):
         validates messages and rejected them if data is missing.
 
         .. note:: Asynchronous support: Decorate this method with
-            :func:`tornado.gen.coroutine` to make it asynchronous.
+            :func:`tornado.gen.coroutine` or define it with ``async def``
+            to make it asynchronous.
 
         If this method returns a :class:`~tornado.concurrent.Future`, execution
         will not proceed until the Future has completed.
@@ -253,7 +308,8 @@ class Consumer(object):
         :exc:`~rejected.consumer.ConsumerException`.
 
         .. note:: Asynchronous support: Decorate this method with
-            :func:`tornado.gen.coroutine` to make it asynchronous.
+            :func:`tornado.gen.coroutine` or define it with ``async def``
+            to make it asynchronous.
 
         :raises: :exc:`rejected.consumer.ConsumerException`
         :raises: :exc:`rejected.consumer.MessageException`
@@ -342,15 +398,38 @@ class Consumer(object):
 
     @property
     def body(self):
-        """Access the opaque body from the current message.
+        """Access the opaque body from the current message. Bodies moved to
+        memory-mapped temporary files with the ``spill_size`` setting are
+        copied onto the heap the first time they are accessed, use
+        :attr:`~rejected.consumer.Consumer.body_file` to read them in place.
 
-        :rtype: str
+        :rtype: bytes
 
         """
         if not self._message:
             return None
+        elif isinstance(self._message.body, memoryview):
+            if self._context.body is None:
+                self._context.body = self._message.body.tobytes()
+            return self._context.body
         return self._message.body
 
+    @property
+    def body_file(self):
+        """Access the opaque body from the current message as a read-only
+        file-like object that reads the body in place, without copying
+        bodies that were moved to memory-mapped temporary files onto the
+        heap.
+
+        .. versionadded:: 4.0.0
+
+        :rtype: io.BufferedReader
+
+        """
+        if not self._message:
+            return None
+        return self._message.body_file
+
     @property
     def content_encoding(self):
         """Access the current message's ``content-encoding`` AMQP message
@@ -463,7 +542,8 @@ class Consumer(object):
     @property
     def measurement(self):
         """Access the current message's :class:`rejected.data.Measurement`
-        instance.
+        instance. Measurements are reused once a message has been processed,
+        so a reference to it should not be kept after processing.
 
         .. versionadded:: 4.0.0
 
@@ -662,16 +742,91 @@ class Consumer(object):
         self.logger.debug('Publishing message to %s:%s (%s)',
                           exchange, routing_key, conn.name)
         basic_properties = self._get_pika_properties(properties)
+        publisher = conn.next_publisher()
         with self._measurement.track_duration(
                 'publish.{}.{}'.format(exchange, routing_key)):
-            conn.channel.basic_publish(
+            publisher.channel.basic_publish(
                 exchange=exchange,
                 routing_key=routing_key,
                 properties=basic_properties,
                 body=body,
                 mandatory=conn.publisher_confirmations)
             return self._publisher_confirmation_future(
-                conn.name, exchange, routing_key, basic_properties)
+                publisher, exchange, routing_key, basic_properties)
+
+    def publish_messages(self, messages, connection=None):
+        """Publish multiple messages to RabbitMQ in a single pass. Each
+        message is a ``(exchange, routing_key, properties, body)`` tuple and
+        messages that share the same ``properties`` object only have them
+        converted once. If
+        `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
+        are enabled, a single :class:`~tornado.concurrent.Future` is returned
+        that resolves to a :class:`list` of :class:`bool` values, indicating
+        if each message was delivered, once all of the messages have been
+        confirmed.
+
+        .. versionadded:: 4.0.0
+
+        :param messages: The messages to publish
+        :type messages: iterable((str, str, dict, str))
+        :param str connection: The connection to use. If it is not
+            specified, the channel that the message was delivered on is used.
+        :rtype: tornado.concurrent.Future or None
+
+        """
+        conn = self._publish_connection(connection)
+        publisher = conn.next_publisher()
+        converted, published = {}, []
+        with self._measurement.track_duration('publish_messages'):
+            for exchange, routing_key, properties, body in messages:
+                # Hold a reference to the properties so the id is not reused
+                if id(properties) not in converted:
+                    converted[id(properties)] = (
+                        properties, self._get_pika_properties(properties))
+                basic_properties = converted[id(properties)][1]
+                publisher.channel.basic_publish(
+                    exchange=exchange,
+                    routing_key=routing_key,
+                    properties=basic_properties,
+                    body=body,
+                    mandatory=conn.publisher_confirmations)
+                published.append((exchange, routing_key, basic_properties))
+        self.logger.debug('Published %i messages (%s)',
+                          len(published), conn.name)
+        if conn.publisher_confirmations:
+            return self._track_confirmation(
+                publisher.add_confirmation_batch(published))
+
+    @gen.coroutine
+    def publish_windowed(self, exchange, routing_key, properties, body,
+                         connection=None):
+        """Publish a message to RabbitMQ without waiting for the publisher
+        confirmation, first waiting until the number of messages awaiting
+        confirmation on the connection is below its ``publish_window``. This
+        keeps the connection busy publishing while bounding the number of
+        unconfirmed messages. The delivery results are returned by
+        :meth:`~rejected.consumer.Consumer.wait_for_confirmations`.
+
+        .. versionadded:: 4.0.0
+
+        :param str exchange: The exchange to publish to
+        :param str routing_key: The routing key to publish with
+        :param dict properties: The message properties
+        :param str body: The message body
+        :param str connection: The connection to use. If it is not
+            specified, the channel that the message was delivered on is used.
+
+        """
+        conn = self._publish_connection(connection)
+        if conn.is_publish_window_full:
+            with self._measurement.track_duration('publish_window_wait'):
+                yield conn.wait_for_publish_window()
+        future = self.publish_message(
+            exchange, routing_key, properties, body, connection=conn.name)
+        if future is not None:
+            if self._context.confirmations is None:
+                self._context.confirmations = []
+            self._context.confirmations.append(future)
 
     def rpc_reply(self, body, properties=None, exchange=None, reply_to=None,
                   connection=None):
@@ -740,7 +895,7 @@ class Consumer(object):
             :func:`sys.exc_info`
 
         """
-        self._process.send_exception_to_sentry(exc_info)
+        self._process.send_exception_to_sentry(exc_info, self._message)
 
     def set_sentry_context(self, tag, value):
         """Set a context tag in Sentry for the given key and value.
@@ -882,6 +1037,39 @@ class Consumer(object):
         if self.sentry_client:
             self.sentry_client.tags.pop(tag, None)
 
+    @gen.coroutine
+    def wait_for_confirmations(self):
+        """Wait for the publisher confirmations of the messages published
+        with :meth:`~rejected.consumer.Consumer.publish_windowed` while
+        processing the current message, returning a :class:`list` of
+        :class:`bool` values that indicate if each message was delivered, in
+        the order they were published.
+
+        .. code-block:: python
+           :caption: Example Usage
+
+           class Consumer(consumer.Consumer):
+
+               @gen.coroutine
+               def process(self):
+                   for value in self.body['values']:
+                       yield self.publish_windowed(
+                           'exchange', 'routing-key', {}, value)
+                   results = yield self.wait_for_confirmations()
+                   if not all(results):
+                       raise consumer.ProcessingException('Undelivered')
+
+        .. versionadded:: 4.0.0
+
+        :rtype: list(bool)
+        :raises: rejected.errors.RabbitMQException
+
+        """
+        confirmations = self._context.confirmations or []
+        self._context.confirmations = None
+        results = yield confirmations
+        raise gen.Return(results)
+
     @gen.coroutine
     def yield_to_ioloop(self):
         """Function that will allow Rejected to process IOLoop events while
@@ -906,24 +1094,44 @@ class Consumer(object):
 
     """Internal Methods"""
 
-    @gen.coroutine
     def execute(self, message_in, measurement):
         """Process the message from RabbitMQ. To implement logic for processing
         a message, extend Consumer._process, not this method.
 
+        The message is processed in its own per-message context that is
+        restored each time the processing of the message resumes on the
+        IOLoop, allowing for multiple messages to be processed concurrently.
+
         This for internal use and should not be extended or used directly.
 
         :param message_in: The message to process
         :type message_in: :class:`rejected.data.Message`
         :param measurement: For collecting per-message instrumentation
         :type measurement: :class:`rejected.data.Measurement`
-        :rtype: bool
+        :rtype: tornado.concurrent.Future
+
+        """
+        context = _Context(message_in, measurement)
+        with stack_context.StackContext(
+                functools.partial(self._activate_context, context)):
+            future = self._execute(message_in, measurement)
+        future.add_done_callback(
+            lambda _future: self._release_confirmations(context))
+        return future
+
+    @gen.coroutine
+    def _execute(self, message_in, measurement):
+        """Coroutine that implements the per-message processing contract,
+        invoked by :meth:`~rejected.consumer.Consumer.execute`.
+
+        :param message_in: The message to process
+        :type message_in: :class:`rejected.data.Message`
+        :param measurement: For collecting per-message instrumentation
+        :type measurement: :class:`rejected.data.Measurement`
+        :rtype: int
 
         """
         self.logger.debug('Received: %r', message_in)
-        self._clear()
-        self._message = message_in
-        self._measurement = measurement
 
         # If timestamp is set, record age of the message coming in
         if message_in.properties.timestamp:
@@ -945,109 +1153,33 @@ class Consumer(object):
         if self.message_type:
             self.set_sentry_context('type', self.message_type)
 
-        # Validate the message type if the child sets MESSAGE_TYPE
-        if self._message_type:
-            if isinstance(self._message_type, (tuple, list, set)):
-                message_supported = self.message_type in self._message_type
-            else:
-                message_supported = self.message_type == self._message_type
-
-            if not message_supported:
-                self.logger.warning('Received unsupported message type: %s',
-                                    self.message_type)
-                # Should the message be dropped or returned to the broker?
-                if self._drop_invalid:
-                    if self._drop_exchange:
-                        self._republish_dropped_message('invalid type')
-                    raise gen.Return(data.MESSAGE_DROP)
-                raise gen.Return(data.MESSAGE_EXCEPTION)
-
-        # Check the number of ProcessingErrors and possibly drop the message
-        if (self._error_max_retry and
-                _PROCESSING_EXCEPTIONS in self.headers):
-            if self.headers[_PROCESSING_EXCEPTIONS] >= self._error_max_retry:
-                self.logger.warning('Dropping message with %i deaths due to '
-                                    'ERROR_MAX_RETRY',
-                                    self.headers[_PROCESSING_EXCEPTIONS])
-                if self._drop_exchange:
-                    self._republish_dropped_message(
-                        'max retries ({})'.format(
-                            self.headers[_PROCESSING_EXCEPTIONS]))
-                raise gen.Return(data.MESSAGE_DROP)
+        result = self._validate_message(message_in)
+        if result:
+            raise gen.Return(result)
 
         result = None
         try:
-            result = self.prepare()
-            if concurrent.is_future(result):
+            result = self._invoke(self.prepare)
+            if _is_async(result):
                 yield result
             if not self._finished:
-                result = self.process()
-                if concurrent.is_future(result):
+                result = self._invoke(self.process)
+                if _is_async(result):
                     yield result
                     self.logger.debug('Post yield of future process')
         except KeyboardInterrupt:
             self.logger.debug('CTRL-C')
-            self._process.reject(message_in.delivery_tag, True)
+            self._process.reject(message_in, True)
             self._process.stop()
             raise gen.Return(data.MESSAGE_REQUEUE)
 
-        except errors.RabbitMQException as error:
-            self.logger.critical('RabbitMQException while processing %s: %s',
-                                 message_in.delivery_tag, error)
-            self._measurement.set_tag('exception', error.__class__.__name__)
-            raise gen.Return(data.RABBITMQ_EXCEPTION)
-
-        except ConsumerException as error:
-            self.logger.error('ConsumerException processing delivery %s: %s',
-                              message_in.delivery_tag, error)
-            self._measurement.set_tag('exception', error.__class__.__name__)
-            if error.metric:
-                self._measurement.set_tag('error', error.metric)
-            raise gen.Return(data.CONSUMER_EXCEPTION)
-
-        except MessageException as error:
-            self.logger.info('MessageException processing delivery %s: %s',
-                             message_in.delivery_tag, error)
-            self._measurement.set_tag('exception', error.__class__.__name__)
-            if error.metric:
-                self._measurement.set_tag('error', error.metric)
-            raise gen.Return(data.MESSAGE_EXCEPTION)
-
-        except ProcessingException as error:
-            self.logger.warning(
-                'ProcessingException processing delivery %s: %s',
-                message_in.delivery_tag, error)
-            self._measurement.set_tag('exception', error.__class__.__name__)
-            if error.metric:
-                self._measurement.set_tag('error', error.metric)
-            self._republish_processing_error(
-                error.metric or error.__class__.__name__)
-            raise gen.Return(data.PROCESSING_EXCEPTION)
-
-        except NotImplementedError as error:
-            self._log_exception('NotImplementedError processing delivery'
-                                ' %s: %s', message_in.delivery_tag, error)
-            self._measurement.set_tag('exception', 'NotImplementedError')
-            raise gen.Return(data.UNHANDLED_EXCEPTION)
-
         except Exception as error:
-            exc_info = sys.exc_info()
-            if concurrent.is_future(result):
-                error = result.exception()
-                exc_info = result.exc_info()
-            self._log_exception('Exception processing delivery %s: %s',
-                                message_in.delivery_tag, error,
-                                exc_info=exc_info)
-            self._measurement.set_tag('exception', 'UnhandledException')
-            raise gen.Return(data.UNHANDLED_EXCEPTION)
+            raise gen.Return(
+                self._on_processing_exception(error, [message_in], result))
 
         if not self._finished:
             self.finish()
 
-        # Clean up any pending futures
-        for name in self._connections.keys():
-            self._connections[name].clear_confirmation_futures()
-
         self.logger.debug('Post finish')
         raise gen.Return(data.MESSAGE_ACK)
 
@@ -1062,6 +1194,22 @@ class Consumer(object):
         """
         del self._connections[name]
 
+    def republish_error(self, message, error):
+        """Republish a message that could not be processed to the error
+        exchange, adding the same headers that are added when a
+        :exc:`~rejected.consumer.ProcessingException` is raised. Invoked by
+        the consumer process for messages in an envelope that fail after
+        other messages in the envelope were processed.
+
+        This for internal use and should not be extended or used directly.
+
+        :param message: The message to republish
+        :type message: :class:`rejected.data.Message`
+        :param str error: The reason the message could not be processed
+
+        """
+        self._republish_processing_error(error, message)
+
     def set_connection(self, connection):
         """Assign the connection to the Consumer so that it may be used
         when requested.
@@ -1087,9 +1235,80 @@ class Consumer(object):
 
     def _clear(self):
         """Resets all assigned data for the current message."""
-        self._finished = False
-        self._message = None
-        self._message_body = None
+        self._context = _Context()
+
+    @contextlib.contextmanager
+    def _activate_context(self, context):
+        """Make the per-message context current for the consumer. Used as a
+        :class:`~tornado.stack_context.StackContext` factory so that the
+        context is activated each time the processing of a message resumes.
+
+        The context is left in place when exiting so that the state of the
+        last message processed remains available, matching the behavior
+        of a consumer processing a single message at a time.
+
+        :param _Context context: The context to activate
+
+        """
+        self._context = context
+        if context.correlation_id and context.message:
+            self._connections[context.message.connection].correlation_id = \
+                context.correlation_id
+        yield
+
+    @property
+    def _correlation_id(self):
+        return self._context.correlation_id
+
+    @_correlation_id.setter
+    def _correlation_id(self, value):
+        self._context.correlation_id = value
+
+    @property
+    def _finished(self):
+        return self._context.finished
+
+    @_finished.setter
+    def _finished(self, value):
+        self._context.finished = value
+
+    @property
+    def _measurement(self):
+        return self._context.measurement
+
+    @_measurement.setter
+    def _measurement(self, value):
+        self._context.measurement = value
+
+    @property
+    def _message(self):
+        return self._context.message
+
+    @_message.setter
+    def _message(self, value):
+        self._context.body = None
+        self._context.message = value
+
+    @property
+    def _message_body(self):
+        return self._context.message_body
+
+    @_message_body.setter
+    def _message_body(self, value):
+        self._context.message_body = value
+
+    def _invoke(self, method):
+        """Invoke :meth:`~rejected.consumer.Consumer.prepare` or
+        :meth:`~rejected.consumer.Consumer.process` for the current message,
+        returning the result.
+
+        This for internal use and should not be extended or used directly.
+
+        :param callable method: The method to invoke
+        :rtype: mixed
+
+        """
+        return method()
 
     @staticmethod
     def _get_pika_properties(properties_in):
@@ -1130,10 +1349,73 @@ class Consumer(object):
             exc_name = exc_type.__name__
             self.logger.exception('Processor handled %s: %s', exc_name,
                                   exc_value, exc_info=exc_info)
-        self._process.send_exception_to_sentry(exc_info)
+        self._process.send_exception_to_sentry(exc_info, self._message)
+
+    def _on_processing_exception(self, error, messages, result=None):
+        """Log and instrument an exception that was raised while processing
+        one or more messages, returning the processing result for the
+        messages.
+
+        This for internal use and should not be extended or used directly.
+
+        :param Exception error: The exception that was raised
+        :param list messages: The messages that were being processed
+        :param result: The last value returned by the consumer, if any
+        :rtype: int
+
+        """
+        delivery_tags = ', '.join(str(m.delivery_tag) for m in messages)
+        if isinstance(error, errors.RabbitMQException):
+            self.logger.critical('RabbitMQException while processing %s: %s',
+                                 delivery_tags, error)
+            self._measurement.set_tag('exception', error.__class__.__name__)
+            return data.RABBITMQ_EXCEPTION
+
+        elif isinstance(error, ConsumerException):
+            self.logger.error('ConsumerException processing delivery %s: %s',
+                              delivery_tags, error)
+            self._measurement.set_tag('exception', error.__class__.__name__)
+            if error.metric:
+                self._measurement.set_tag('error', error.metric)
+            return data.CONSUMER_EXCEPTION
+
+        elif isinstance(error, MessageException):
+            self.logger.info('MessageException processing delivery %s: %s',
+                             delivery_tags, error)
+            self._measurement.set_tag('exception', error.__class__.__name__)
+            if error.metric:
+                self._measurement.set_tag('error', error.metric)
+            return data.MESSAGE_EXCEPTION
 
-    def _publisher_confirmation_future(self, name, exchange, routing_key,
-                                       properties):
+        elif isinstance(error, ProcessingException):
+            self.logger.warning(
+                'ProcessingException processing delivery %s: %s',
+                delivery_tags, error)
+            self._measurement.set_tag('exception', error.__class__.__name__)
+            if error.metric:
+                self._measurement.set_tag('error', error.metric)
+            for message in messages:
+                self._republish_processing_error(
+                    error.metric or error.__class__.__name__, message)
+            return data.PROCESSING_EXCEPTION
+
+        elif isinstance(error, NotImplementedError):
+            self._log_exception('NotImplementedError processing delivery'
+                                ' %s: %s', delivery_tags, error)
+            self._measurement.set_tag('exception', 'NotImplementedError')
+            return data.UNHANDLED_EXCEPTION
+
+        exc_info = sys.exc_info()
+        if concurrent.is_future(result):
+            error = result.exception()
+            exc_info = result.exc_info()
+        self._log_exception('Exception processing delivery %s: %s',
+                            delivery_tags, error, exc_info=exc_info)
+        self._measurement.set_tag('exception', 'UnhandledException')
+        return data.UNHANDLED_EXCEPTION
+
+    def _publisher_confirmation_future(self, publisher, exchange,
+                                       routing_key, properties):
         """Return a future a publisher confirmation result that enables
         consumers to block on the confirmation of a published message.
 
@@ -1144,7 +1426,8 @@ class Consumer(object):
 
         This for internal use and should not be extended or used directly.
 
-        :param str name: The connection name for the future
+        :param publisher: The channel the message was published on
+        :type publisher: rejected.connection.PublishingChannel
         :param str exchange: The exchange the message was published to
         :param str routing_key: The routing key that was used
         :param properties: The AMQP message properties for the delivery
@@ -1152,11 +1435,11 @@ class Consumer(object):
         :rtype: concurrent.Future.
 
         """
-        if self._connections[name].publisher_confirmations:
+        if publisher.connection.publisher_confirmations:
             future = concurrent.Future()
-            self._connections[name].add_confirmation_future(
+            publisher.add_confirmation_future(
                 exchange, routing_key, properties, future)
-            return future
+            return self._track_confirmation(future)
 
     def _publish_connection(self, name=None):
         """Return the connection to publish. If the name is not specified,
@@ -1166,6 +1449,9 @@ class Consumer(object):
         :rtype: rejected.process.Connection
 
         """
+        if not name and not self._message:
+            raise ValueError('A connection name is required when not '
+                             'processing a single message')
         try:
             conn = self._connections[name or self._message.connection]
         except KeyError:
@@ -1174,32 +1460,70 @@ class Consumer(object):
             raise errors.RabbitMQException(conn.name, 599, 'NOT_CONNECTED')
         return conn
 
-    def _republish_dropped_message(self, reason):
+    def _release_confirmations(self, context):
+        """Invoked when a message has finished processing to release the
+        publisher confirmations for the messages it published. Confirmations
+        that are still pending remain tracked by the connection until
+        RabbitMQ acks, nacks, or returns the message or the channel is
+        closed, leaving the confirmations of other messages that are being
+        processed concurrently untouched.
+
+        This for internal use and should not be extended or used directly.
+
+        :param _Context context: The context of the finished message
+
+        """
+        published, context.published = context.published or [], None
+        for future in published:
+            if not future.done():
+                future.add_done_callback(self._on_released_confirmation)
+
+    def _on_released_confirmation(self, future):
+        """Invoked when a publisher confirmation is resolved after the
+        message that published it has finished processing, logging messages
+        that were not delivered.
+
+        :param tornado.concurrent.Future future: The confirmation future
+
+        """
+        if future.exception():
+            self.logger.warning('Publisher confirmation failed after '
+                                'processing finished: %s', future.exception())
+        elif future.result() is False or (isinstance(future.result(), list)
+                                          and not all(future.result())):
+            self.logger.warning('Message published while processing was not '
+                                'delivered')
+
+    def _republish_dropped_message(self, reason, message=None):
         """Republish the original message that was received it is being dropped
         by the consumer.
 
         This for internal use and should not be extended or used directly.
 
         :param str reason: The reason the message was dropped
+        :param message: The message to republish, defaults to the current
+            message
+        :type message: :class:`rejected.data.Message`
 
         """
         self.logger.debug('Republishing due to ProcessingException')
-        properties = dict(self._message.properties) or {}
+        message = message or self._message
+        properties = dict(message.properties) or {}
         if 'headers' not in properties or not properties['headers']:
             properties['headers'] = {}
         properties['headers']['X-Dropped-By'] = self.name
         properties['headers']['X-Dropped-Reason'] = reason
         properties['headers']['X-Dropped-Timestamp'] = \
             datetime.datetime.utcnow().isoformat()
-        properties['headers']['X-Original-Exchange'] = self._message.exchange
+        properties['headers']['X-Original-Exchange'] = message.exchange
 
-        self._message.channel.basic_publish(
+        self._connections[message.connection].publish(
             self._drop_exchange,
-            self._message.routing_key,
-            self._message.body,
-            pika.BasicProperties(**properties))
+            message.routing_key,
+            pika.BasicProperties(**properties),
+            message.body)
 
-    def _republish_processing_error(self, error):
+    def _republish_processing_error(self, error, message=None):
         """Republish the original message that was received because a
         :exc:`~rejected.consumer.ProcessingException` was raised.
 
@@ -1209,10 +1533,14 @@ class Consumer(object):
         for this message.
 
         :param str error: The string value for the exception
+        :param message: The message to republish, defaults to the current
+            message
+        :type message: :class:`rejected.data.Message`
 
         """
         self.logger.debug('Republishing due to ProcessingException')
-        properties = dict(self._message.properties) or {}
+        message = message or self._message
+        properties = dict(message.properties) or {}
         if 'headers' not in properties or not properties['headers']:
             properties['headers'] = {}
 
@@ -1227,26 +1555,87 @@ class Consumer(object):
             except TypeError:
                 properties['headers'][_PROCESSING_EXCEPTIONS] = 1
 
-        self._message.channel.basic_publish(
+        self._connections[message.connection].publish(
             self._error_exchange,
-            self._message.routing_key,
-            self._message.body,
-            pika.BasicProperties(**properties))
+            message.routing_key,
+            pika.BasicProperties(**properties),
+            message.body)
+
+    def _track_confirmation(self, future):
+        """Record the publisher confirmation future on the context of the
+        message that is being processed, returning the future.
+
+        :param tornado.concurrent.Future future: The confirmation future
+        :rtype: tornado.concurrent.Future
+
+        """
+        if self._context.published is None:
+            self._context.published = []
+        self._context.published.append(future)
+        return future
+
+    def _validate_message(self, message):
+        """Validate the message type if the child sets
+        :const:`~rejected.consumer.Consumer.MESSAGE_TYPE` and check the number
+        of times a :exc:`~rejected.consumer.ProcessingException` was raised
+        for the message, returning the result for the message if it should
+        not be processed.
+
+        This for internal use and should not be extended or used directly.
+
+        :param message: The message to validate
+        :type message: :class:`rejected.data.Message`
+        :rtype: int or None
+
+        """
+        message_type = message.properties.type
+        if self._message_type:
+            if isinstance(self._message_type, (tuple, list, set)):
+                message_supported = message_type in self._message_type
+            else:
+                message_supported = message_type == self._message_type
+
+            if not message_supported:
+                self.logger.warning('Received unsupported message type: %s',
+                                    message_type)
+                # Should the message be dropped or returned to the broker?
+                if self._drop_invalid:
+                    if self._drop_exchange:
+                        self._republish_dropped_message('invalid type',
+                                                        message)
+                    return data.MESSAGE_DROP
+                return data.MESSAGE_EXCEPTION
+
+        # Check the number of ProcessingErrors and possibly drop the message
+        headers = message.properties.headers or {}
+        if self._error_max_retry and _PROCESSING_EXCEPTIONS in headers:
+            if headers[_PROCESSING_EXCEPTIONS] >= self._error_max_retry:
+                self.logger.warning('Dropping message with %i deaths due to '
+                                    'ERROR_MAX_RETRY',
+                                    headers[_PROCESSING_EXCEPTIONS])
+                if self._drop_exchange:
+                    self._republish_dropped_message(
+                        'max retries ({})'.format(
+                            headers[_PROCESSING_EXCEPTIONS]), message)
+                return data.MESSAGE_DROP
 
 
 class SmartConsumer(Consumer):
     """Base class to ease the implementation of strongly typed message
     consumers that validate and automatically decode and deserialize the
     inbound message body based upon the message properties. Additionally,
-    should one of the supported ``content_encoding`` types (``gzip`` or
-    ``bzip2``) be specified in the message's property, it will automatically
-    be decoded.
+    should one of the supported ``content_encoding`` types (``gzip``,
+    ``bzip2``, ``lz4`` or ``zstd``) be specified in the message's property,
+    it will automatically be decoded.
 
     When publishing a message, the message can be automatically serialized
     and encoded. If the ``content_type`` property is specified, the consumer
     will attempt to automatically serialize the message body. If the
     ``content_encoding`` property is specified using a supported encoding
-    (``gzip`` or ``bzip2``), it will automatically be encoded as well.
+    (``gzip``, ``bzip2``, ``lz4`` or ``zstd``), it will automatically be
+    encoded as well. Message bodies that do not specify a ``content_encoding``
+    can be compressed automatically when they reach a minimum size by setting
+    :const:`~rejected.consumer.SmartConsumer.COMPRESSION_ENCODING`.
 
     *Supported MIME types for automatic serialization and deserialization are:*
 
@@ -1262,6 +1651,10 @@ class SmartConsumer(Consumer):
      - text/yaml
      - text/x-yaml
 
+    Codecs for additional MIME types and content encodings can be registered
+    with :func:`rejected.codec.register_content_type` and
+    :func:`rejected.codec.register_content_encoding`.
+
     In any of the consumer base classes, if the ``MESSAGE_TYPE`` attribute is
     set, the ``type`` property of incoming messages will be validated against
     when a message is received, checking for string equality against the
@@ -1275,128 +1668,412 @@ class SmartConsumer(Consumer):
         into the same class.
 
     """
-    def publish_message(self, exchange, routing_key, properties, body,
-                        no_serialization=False,
-                        no_encoding=False,
-                        channel=None, connection=None):
-        """Publish a message to RabbitMQ on the same channel the original
-        message was received on.
+    COMPRESSION_DICTIONARY = None
+    """The path to a Zstandard dictionary trained with
+    :command:`rejected-zstd-dictionary` that is used to compress published
+    message bodies with the ``zstd`` content encoding. Message bodies
+    compressed with the dictionary are decompressed with it automatically.
 
-        By default, if you pass a non-string object to the body and the
-        properties have a supported ``content_type`` set, the body will be
-        auto-serialized in the specified ``content_type``.
+    :default: :class:`None`
+    :type: str
+    """
 
-        If the properties do not have a timestamp set, it will be set to the
-        current time.
+    COMPRESSION_ENCODING = None
+    """The ``content_encoding`` used to compress published message bodies
+    that do not specify one, such as ``zstd`` or ``lz4``. If :class:`None`,
+    message bodies are only compressed when the ``content_encoding`` property
+    is set.
 
-        If you specify a ``content_encoding`` in the properties and the
-        encoding is supported, the body will be auto-encoded.
+    :default: :class:`None`
+    :type: str
+    """
 
-        Both of these behaviors can be disabled by setting
-        ``no_serialization`` or ``no_encoding`` to ``True``.
+    COMPRESSION_LEVEL = None
+    """The compression level used when automatically compressing published
+    message bodies. If :class:`None`, the default level for the
+    :const:`~rejected.consumer.SmartConsumer.COMPRESSION_ENCODING` is used.
 
-        .. versionchanged:: 4.0.0
-           The method returns a :py:class:`~tornado.concurrent.Future` if
-           `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
-           are enabled on for the connection. In addition, The ``channel``
-           parameter is deprecated and will be removed in a future release.
+    :default: :class:`None`
+    :type: int
+    """
 
-        :param str exchange: The exchange to publish to
-        :param str routing_key: The routing key to publish with
-        :param dict properties: The message properties
-        :param mixed body: The message body to publish
-        :param bool no_serialization: Turn off auto-serialization of the body
-        :param bool no_encoding: Turn off auto-encoding of the body
-        :param str channel: **Deprecated in 4.0.0** Specify the connection
-            parameter instead.
-        :param str connection: The connection to use. If it is not
-            specified, the channel that the message was delivered on is used.
-        :rtype: tornado.concurrent.Future or None
+    COMPRESSION_MIN_SIZE = 1024
+    """The minimum size in bytes of a published message body for it to be
+    automatically compressed.
 
-        """
-        # Auto-serialize the content if needed
-        is_string = (isinstance(body, str) or
-                     isinstance(body, bytes) or
-                     isinstance(body, unicode))
-        if (not no_serialization and not is_string and
-                properties.get('content_type')):
-            self.logger.debug('Auto-serializing message body')
-            body = self._auto_serialize(properties.get('content_type'), body)
+    :default: :const:`1024`
+    :type: int
+    """
 
-        # Auto-encode the message body if needed
-        if not no_encoding and properties.get('content_encoding'):
-            self.logger.debug('Auto-encoding message body')
-            body = self._auto_encode(properties.get('content_encoding'), body)
+    ENVELOPE_MAX_DELAY = 100
+    """The maximum time in milliseconds that a message published with
+    ``envelope=True`` is buffered before its envelope is published.
+
+    :default: :const:`100`
+    :type: int
+    """
+
+    ENVELOPE_MAX_MESSAGES = 100
+    """The maximum number of messages in an envelope.
+
+    :default: :const:`100`
+    :type: int
+    """
+
+    ENVELOPE_MAX_SIZE = 65536
+    """The size in bytes of the buffered message bodies at which an envelope
+    is published.
+
+    :default: :const:`65536`
+    :type: int
+    """
+
+    MAX_DECOMPRESSED_SIZE = 0
+    """The maximum size in bytes of a decompressed message body. Message
+    bodies are decompressed incrementally and a
+    :exc:`~rejected.consumer.MessageException` is raised once the limit is
+    exceeded. If :const:`0`, the size is not limited.
+
+    :default: :const:`0`
+    :type: int
+    """
+
+    MESSAGE_SCHEMAS = {}
+    """A mapping of AMQP ``type`` message property values to the
+    :class:`~rejected.schema.Schema` used to validate the deserialized body
+    of messages of that type, converting it into a typed object. A path to a
+    JSON Schema file may be used instead of a
+    :class:`~rejected.schema.Schema`. Schemas are compiled once, when the
+    consumer is created.
+
+    :default: ``{}``
+    :type: dict
+    """
+
+    OFFLOAD_MAX_WORKERS = 2
+    """The maximum number of threads used to decode large message bodies.
+
+    :default: :const:`2`
+    :type: int
+    """
+
+    OFFLOAD_MIN_SIZE = 0
+    """The minimum size in bytes of a message body for it to be decoded and
+    deserialized in a thread pool instead of on the IOLoop. If :const:`0`,
+    message bodies are always decoded on the IOLoop.
+
+    :default: :const:`0`
+    :type: int
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Creates a new instance of the
+        :class:`~rejected.consumer.SmartConsumer` class.
+
+        """
+        self._max_decompressed_size = int(
+            kwargs.get('max_decompressed_size') or
+            self.MAX_DECOMPRESSED_SIZE)
+        self._schemas = self._compile_schemas(
+            dict(self.MESSAGE_SCHEMAS, **(kwargs.get('schemas') or {})))
+        offload = kwargs.get('offload') or {}
+        self._offload_executor = None
+        self._offload_max_workers = int(offload.get(
+            'max_workers', self.OFFLOAD_MAX_WORKERS))
+        self._offload_min_size = int(offload.get(
+            'min_size', self.OFFLOAD_MIN_SIZE))
+        if self._offload_min_size and futures is None:
+            raise ConfigurationException(
+                'concurrent.futures is required for offloading decoding')
+
+        compression = kwargs.get('compression') or {}
+        self._compression_encoding = compression.get(
+            'encoding', self.COMPRESSION_ENCODING)
+        self._compression_level = compression.get(
+            'level', self.COMPRESSION_LEVEL)
+        self._compression_min_size = int(compression.get(
+            'min_size', self.COMPRESSION_MIN_SIZE))
+        if (self._compression_encoding and
+                self._compression_encoding not in codec.CONTENT_ENCODINGS):
+            raise ConfigurationException(
+                'Unsupported compression encoding: {}'.format(
+                    self._compression_encoding))
+        self._compression_dictionary = None
+        for path in compression.get('dictionaries') or []:
+            self._load_zstd_dictionary(path)
+        dictionary = compression.get(
+            'dictionary', self.COMPRESSION_DICTIONARY)
+        if dictionary:
+            if self._compression_encoding not in (None, 'zstd'):
+                raise ConfigurationException(
+                    'Compression dictionaries require the zstd encoding')
+            self._compression_dictionary = self._load_zstd_dictionary(
+                dictionary)
+
+        settings = kwargs.get('envelope') or {}
+        self._envelopes = {}
+        self._envelope_max_delay = int(settings.get(
+            'max_delay', self.ENVELOPE_MAX_DELAY))
+        self._envelope_max_messages = int(settings.get(
+            'max_messages', self.ENVELOPE_MAX_MESSAGES))
+        self._envelope_max_size = int(settings.get(
+            'max_size', self.ENVELOPE_MAX_SIZE))
+        super(SmartConsumer, self).__init__(*args, **kwargs)
+
+    def publish_message(self, exchange, routing_key, properties, body,
+                        no_serialization=False,
+                        no_encoding=False,
+                        channel=None, connection=None, envelope=False):
+        """Publish a message to RabbitMQ on the same channel the original
+        message was received on.
+
+        By default, if you pass a non-string object to the body and the
+        properties have a supported ``content_type`` set, the body will be
+        auto-serialized in the specified ``content_type``.
 
+        If the properties do not have a timestamp set, it will be set to the
+        current time.
+
+        If you specify a ``content_encoding`` in the properties and the
+        encoding is supported, the body will be auto-encoded.
+
+        Both of these behaviors can be disabled by setting
+        ``no_serialization`` or ``no_encoding`` to ``True``.
+
+        If ``envelope`` is ``True``, the message is buffered with the other
+        messages published to the same exchange and routing key and
+        published in a batch envelope once
+        :const:`~rejected.consumer.SmartConsumer.ENVELOPE_MAX_MESSAGES`
+        messages or
+        :const:`~rejected.consumer.SmartConsumer.ENVELOPE_MAX_SIZE` bytes are
+        buffered, or after
+        :const:`~rejected.consumer.SmartConsumer.ENVELOPE_MAX_DELAY`
+        milliseconds. A :py:class:`~tornado.concurrent.Future` is returned
+        that resolves when the envelope is published, with the publisher
+        confirmation result if publisher confirmations are enabled. Consumer
+        processes unpack envelopes that they receive, processing each message
+        in the envelope separately.
+
+        .. versionchanged:: 4.0.0
+           The method returns a :py:class:`~tornado.concurrent.Future` if
+           `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
+           are enabled on for the connection. In addition, The ``channel``
+           parameter is deprecated and will be removed in a future release.
+
+        :param str exchange: The exchange to publish to
+        :param str routing_key: The routing key to publish with
+        :param dict properties: The message properties
+        :param mixed body: The message body to publish
+        :param bool no_serialization: Turn off auto-serialization of the body
+        :param bool no_encoding: Turn off auto-encoding of the body
+        :param str channel: **Deprecated in 4.0.0** Specify the connection
+            parameter instead.
+        :param str connection: The connection to use. If it is not
+            specified, the channel that the message was delivered on is used.
+        :param bool envelope: Buffer the message to publish it in a batch
+            envelope
+        :rtype: tornado.concurrent.Future or None
+
+        """
+        properties, body = self._prepare_body(
+            properties, body, no_serialization, no_encoding)
+        if envelope:
+            return self._buffer_message(
+                exchange, routing_key, properties, body,
+                channel or connection)
         return super(SmartConsumer, self).publish_message(
             exchange, routing_key, properties, body, channel or connection)
 
-    @property
-    def body(self):
-        """Return the message body, unencoded if needed,
-        deserialized if possible.
+    def publish_messages(self, messages, no_serialization=False,
+                         no_encoding=False, connection=None):
+        """Publish multiple messages to RabbitMQ in a single pass, with each
+        message body auto-serialized and auto-encoded as with
+        :meth:`~rejected.consumer.SmartConsumer.publish_message`. Each
+        message is a ``(exchange, routing_key, properties, body)`` tuple. If
+        `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
+        are enabled, a single :class:`~tornado.concurrent.Future` is returned
+        that resolves to a :class:`list` of :class:`bool` values once all of
+        the messages have been confirmed.
 
-        :rtype: any
+        .. versionadded:: 4.0.0
+
+        :param messages: The messages to publish
+        :type messages: iterable((str, str, dict, mixed))
+        :param bool no_serialization: Turn off auto-serialization of the body
+        :param bool no_encoding: Turn off auto-encoding of the body
+        :param str connection: The connection to use. If it is not
+            specified, the channel that the message was delivered on is used.
+        :rtype: tornado.concurrent.Future or None
 
         """
-        # Return a materialized view of the body if it has been previously set
-        if self._message_body:
-            return self._message_body
+        return super(SmartConsumer, self).publish_messages(
+            ((exchange, routing_key) + self._prepare_body(
+                properties, body, no_serialization, no_encoding)
+             for exchange, routing_key, properties, body in messages),
+            connection)
+
+    def decode_columns(self, messages, fields):
+        """Decode the bodies of a batch of messages, returning the numeric
+        fields as NumPy column arrays, one per field, each with a validity
+        mask. The batch is decoded in a single pass: each message body is
+        decoded and deserialized in the same manner as
+        :attr:`~rejected.consumer.SmartConsumer.body` and its fields are
+        copied into the columns by :func:`rejected.codec.to_columns` before
+        the next message body is decoded, so the decoded bodies of the batch
+        are not held in memory at once.
+        Fields that are missing, not numeric, or out of range for their data
+        type, and all of the fields of message bodies that can not be
+        decoded, are marked as not valid. Requires
+        `numpy <https://pypi.org/project/numpy/>`_.
+
+        .. code-block:: python
+
+           class Consumer(consumer.BatchConsumer, consumer.SmartConsumer):
+
+               def process_batch(self, messages):
+                   columns = self.decode_columns(
+                       messages, {'temperature': 'float32',
+                                  'sensor.id': 'int64'})
+                   temperature = columns['temperature']
+                   self.stats_set_value(
+                       'mean_temperature',
+                       temperature.values[temperature.valid].mean())
+
+        :param list messages: The :class:`~rejected.data.Message` objects to
+            decode
+        :param fields: The NumPy data type by field name, or the field names
+            for ``float64`` fields. Nested fields are specified with dots.
+        :type fields: dict or list
+        :rtype: dict(str, rejected.codec.Column)
+        :raises: rejected.consumer.ConfigurationException
+
+        """
+        if codec.numpy is None:
+            raise ConfigurationException(
+                'numpy is required for decode_columns')
+        return codec.to_columns(self._iter_decoded(messages), fields)
 
-        # Handle bzip2 compressed content
-        elif self.content_encoding == 'bzip2':
-            self._message_body = self._decode_bz2(self._message.body)
+    def flush_envelopes(self):
+        """Publish the envelopes of the messages buffered by
+        :meth:`~rejected.consumer.SmartConsumer.publish_message` without
+        waiting for them to reach their size or time limits.
 
-        # Handle zlib compressed content
-        elif self.content_encoding == 'gzip':
-            self._message_body = self._decode_gzip(self._message.body)
+        """
+        for key in list(self._envelopes):
+            self._publish_envelope(key)
 
-        # Else we want to assign self._message.body to self._message_body
-        else:
-            self._message_body = self._message.body
+    def get_body(self):
+        """Return a :class:`~tornado.concurrent.Future` that is resolved
+        with the message body, unencoded if needed, deserialized if
+        possible. Message bodies of at least
+        :const:`~rejected.consumer.SmartConsumer.OFFLOAD_MIN_SIZE` bytes are
+        decoded and deserialized in a thread pool, keeping the IOLoop free to
+        service RabbitMQ while they are being decoded.
 
-        # Handle the auto-deserialization
-        if self.content_type == 'application/json':
-            self._message_body = self._load_json_value(self._message_body)
+        .. code-block:: python
 
-        elif umsgpack and self.content_type == 'application/msgpack':
-            self._message_body = self._load_msgpack_value(self._message_body)
+           @gen.coroutine
+           def process(self):
+               body = yield self.get_body()
+
+        :rtype: tornado.concurrent.Future
+        :raises: rejected.consumer.MessageException
+
+        """
+        future = concurrent.Future()
+        if self._message_body or not self._offload_decoding():
+            try:
+                future.set_result(self.body)
+            except Exception:
+                future.set_exc_info(sys.exc_info())
+            return future
 
-        elif self.content_type in PICKLE_MIME_TYPES:
-            self._message_body = self._load_pickle_value(self._message_body)
+        context = self._context
 
-        elif self.content_type == 'application/x-plist':
-            self._message_body = self._load_plist_value(self._message_body)
+        def on_decoded(decoded):
+            try:
+                context.message_body = decoded.result()
+            except Exception:
+                return future.set_exc_info(sys.exc_info())
+            future.set_result(context.message_body)
 
-        elif self.content_type == 'text/csv':
-            self._message_body = self._load_csv_value(self._message_body)
+        # The result is applied on the IOLoop, not on the pool thread
+        ioloop.IOLoop.current().add_future(self._offload_pool.submit(
+            self._decode_in_thread, context.message, context.measurement,
+            time.time()), on_decoded)
+        return future
 
-        elif bs4 and self.content_type in BS4_MIME_TYPES:
-            self._message_body = self._load_bs4_value(self._message_body)
+    @property
+    def body(self):
+        """Return the message body, unencoded if needed,
+        deserialized if possible. Use
+        :meth:`~rejected.consumer.SmartConsumer.get_body` to decode large
+        message bodies without blocking the IOLoop.
 
-        elif self.content_type in YAML_MIME_TYPES:
-            self._message_body = self._load_yaml_value(self._message_body)
+        :rtype: any
+        :raises: rejected.consumer.MessageException
 
-        # Return the message body
+        """
+        # Return a materialized view of the body if it has been previously set
+        if not self._message_body:
+            self._message_body = self._decode_body(self._message)
         return self._message_body
 
+    @property
+    def body_stream(self):
+        """Return an iterator of the message body in chunks of up to
+        :const:`rejected.codec.CHUNK_SIZE` bytes, decompressed incrementally
+        if the ``content_encoding`` is supported. The body is not
+        deserialized, allowing consumers that can process the body
+        incrementally to do so without holding the whole decompressed body in
+        memory. Each access returns a new iterator.
+
+        .. code-block:: python
+
+           def process(self):
+               digest = hashlib.sha256()
+               for chunk in self.body_stream:
+                   digest.update(chunk)
+
+        :rtype: iterator(bytes)
+        :raises: rejected.consumer.MessageException
+
+        """
+        return self._iter_body(self._message)
+
+    def shutdown(self):
+        """Implement to cleanly shutdown your application code when rejected is
+        stopping the consumer. When extending this method, invoke it with
+        :func:`super` to publish the buffered envelopes and stop the thread
+        pool used to decode large message bodies.
+
+        """
+        self.flush_envelopes()
+        if self._offload_executor:
+            self._offload_executor.shutdown()
+
     def _auto_encode(self, content_encoding, value):
         """Based upon the value of the content_encoding, encode the value.
 
-        :param str content_encoding: The content encoding type (gzip, bzip2)
+        :param str content_encoding: The content encoding type (gzip, bzip2,
+            lz4, zstd)
         :param str value: The value to encode
         :rtype: value
 
         """
-        if content_encoding == 'gzip':
-            return self._encode_gzip(value)
-
-        if content_encoding == 'bzip2':
-            return self._encode_bz2(value)
-
-        self.logger.warning(
-            'Invalid content-encoding specified for auto-encoding')
-        return value
+        encoding = codec.CONTENT_ENCODINGS.get(content_encoding)
+        if not encoding:
+            self.logger.warning(
+                'Invalid content-encoding specified for auto-encoding')
+            return value
+        level = (self._compression_level
+                 if content_encoding == self._compression_encoding else None)
+        if content_encoding == 'zstd' and self._compression_dictionary:
+            return codec.encode_zstd(
+                value, level, self._compression_dictionary)
+        elif level is not None:
+            return encoding.encode(value, level)
+        return encoding.encode(value)
 
     def _auto_serialize(self, content_type, value):
         """Auto-serialization of the value based upon the content-type value.
@@ -1406,265 +2083,896 @@ class SmartConsumer(Consumer):
         :rtype: str
 
         """
-        if content_type == 'application/json':
-            self.logger.debug('Auto-serializing content as JSON')
-            return self._dump_json_value(value)
+        serializer = codec.CONTENT_TYPES.get(content_type)
+        if serializer:
+            self.logger.debug('Auto-serializing content as %s', content_type)
+            return serializer.encode(value)
+        self.logger.warning(
+            'Invalid content-type specified for auto-serialization')
+        return value
 
-        elif umsgpack and content_type == 'application/msgpack':
-            self.logger.debug('Auto-serializing content as msgpack')
-            return self._dump_msgpack_value(value)
+    def _buffer_message(self, exchange, routing_key, properties, body,
+                        connection=None):
+        """Buffer a message to publish in an envelope, returning the future
+        that resolves when the envelope is published.
 
-        elif content_type in PICKLE_MIME_TYPES:
-            self.logger.debug('Auto-serializing content as Pickle')
-            return self._dump_pickle_value(value)
+        :param str exchange: The exchange to publish to
+        :param str routing_key: The routing key to publish with
+        :param dict properties: The message properties
+        :param bytes body: The message body
+        :param str connection: The connection to use
+        :rtype: tornado.concurrent.Future
+
+        """
+        name = self._publish_connection(connection).name
+        key = name, exchange, routing_key
+        if key not in self._envelopes:
+            self._envelopes[key] = envelope.Buffer(
+                name, exchange, routing_key, concurrent.Future())
+            self._envelopes[key].timeout = ioloop.IOLoop.current().call_later(
+                self._envelope_max_delay / 1000.0,
+                self._publish_envelope, key)
+        buffer = self._envelopes[key]
+        buffer.append(properties, body)
+        if len(buffer) >= self._envelope_max_messages or \
+                buffer.size >= self._envelope_max_size:
+            self._publish_envelope(key)
+        return buffer.future
+
+    @staticmethod
+    def _compile_schemas(schemas):
+        """Return the compiled schemas by message type, loading the JSON
+        Schema files that are specified by path.
 
-        elif content_type == 'application/x-plist':
-            self.logger.debug('Auto-serializing content as plist')
-            return self._dump_plist_value(value)
+        :param dict schemas: The schemas or schema file paths by message type
+        :rtype: dict
+        :raises: rejected.consumer.ConfigurationException
 
-        elif content_type == 'text/csv':
-            self.logger.debug('Auto-serializing content as csv')
-            return self._dump_csv_value(value)
+        """
+        compiled = {}
+        for message_type, value in schemas.items():
+            if isinstance(value, schema.Schema):
+                compiled[message_type] = value
+                continue
+            try:
+                compiled[message_type] = schema.load(value)
+            except (IOError, ValueError) as error:
+                raise ConfigurationException(
+                    'Could not load the schema for {}: {}'.format(
+                        message_type, error))
+        return compiled
+
+    def _decode_body(self, message):
+        """Return the message body, decompressed based upon the
+        ``content_encoding`` and deserialized based upon the ``content_type``
+        of the message.
+
+        :param rejected.data.Message message: The message to decode
+        :rtype: any
+        :raises: rejected.consumer.MessageException
 
-        # If it's XML or HTML auto
-        elif (bs4 and isinstance(value, bs4.BeautifulSoup) and
-              content_type in ('text/html', 'text/xml')):
-            self.logger.debug('Dumping BS4 object into HTML or XML')
-            return self._dump_bs4_value(value)
+        """
+        body = message.body
+        content_encoding = (message.properties.content_encoding or
+                            '').lower() or None
+        content_type = (message.properties.content_type or '').lower() or None
 
-        # If it's YAML, load the content via pyyaml into a dict
-        elif self.content_type in YAML_MIME_TYPES:
-            self.logger.debug('Auto-serializing content as YAML')
-            return self._dump_yaml_value(value)
+        # Handle compressed content
+        encoding = codec.CONTENT_ENCODINGS.get(content_encoding)
+        if encoding:
+            try:
+                if self._max_decompressed_size:
+                    body = b''.join(codec.iter_decode(
+                        content_encoding, body, self._max_decompressed_size))
+                else:
+                    body = encoding.decode(body)
+            except ValueError as error:
+                self.logger.exception('Could not decode message body: %s',
+                                      error)
+                raise MessageException(
+                    'Could not decode message body: {}', None, error)
+
+        # Else we want a materialized copy of a memoryview body
+        elif isinstance(body, memoryview):
+            body = body.tobytes()
+
+        # Handle the auto-deserialization and schema validation
+        content_type = codec.CONTENT_TYPES.get(content_type)
+        message_schema = self._schemas.get(message.properties.type)
+        if content_type or message_schema:
+            try:
+                if content_type:
+                    body = content_type.decode(body)
+                if message_schema:
+                    body = message_schema.decode(body)
+            except ValueError as error:
+                self.logger.exception('Could not decode message body: %s',
+                                      error)
+                raise MessageException(
+                    'Could not decode message body: {}', None, error)
+        return body
+
+    def _decode_in_thread(self, message, measurement, submitted_at):
+        """Decode the message body in a thread pool thread, recording the
+        time the message waited for a thread as ``offload_wait``.
+
+        :param rejected.data.Message message: The message to decode
+        :param rejected.data.Measurement measurement: The message measurement
+        :param float submitted_at: When the message was submitted to the pool
+        :rtype: any
+        :raises: rejected.consumer.MessageException
 
-        self.logger.warning(
-            'Invalid content-type specified for auto-serialization')
-        return value
+        """
+        measurement.add_duration(
+            'offload_wait', max(submitted_at, time.time()) - submitted_at)
+        return self._decode_body(message)
 
-    @staticmethod
-    def _decode_bz2(value):
-        """Return a bz2 decompressed value
+    @gen.coroutine
+    def _decode_then_invoke(self, method):
+        """Decode the message body in the thread pool before invoking
+        :meth:`~rejected.consumer.Consumer.prepare` or
+        :meth:`~rejected.consumer.Consumer.process`.
 
-        :param bytes value: Compressed value
-        :rtype: str
+        :param callable method: The method to invoke
+        :rtype: mixed
 
         """
-        return bz2.decompress(value)
+        yield self.get_body()
+        result = super(SmartConsumer, self)._invoke(method)
+        if _is_async(result):
+            result = yield result
+        raise gen.Return(result)
 
-    @staticmethod
-    def _decode_gzip(value):
-        """Return a zlib decompressed value
+    def _invoke(self, method):
+        """Invoke :meth:`~rejected.consumer.Consumer.prepare` or
+        :meth:`~rejected.consumer.Consumer.process` for the current message,
+        decoding large message bodies in the thread pool first so that
+        :attr:`~rejected.consumer.SmartConsumer.body` does not block the
+        IOLoop.
 
-        :param bytes value: Compressed value
-        :rtype: str
+        :param callable method: The method to invoke
+        :rtype: mixed
 
         """
-        return zlib.decompress(value)
+        if not self._message_body and self._offload_decoding():
+            return self._decode_then_invoke(method)
+        return super(SmartConsumer, self)._invoke(method)
 
-    @staticmethod
-    def _dump_bs4_value(value):
-        """Return a BeautifulSoup object as a string
+    def _iter_body(self, message):
+        """Return an iterator of the message body in chunks, decompressed
+        incrementally based upon the ``content_encoding`` of the message.
 
-        :param bs4.BeautifulSoup value: The object to return a string from
-        :rtype: str
+        :param rejected.data.Message message: The message to iterate over
+        :rtype: iterator(bytes)
+        :raises: rejected.consumer.MessageException
 
         """
-        return str(value)
+        content_encoding = (message.properties.content_encoding or
+                            '').lower() or None
+        try:
+            for chunk in codec.iter_decode(content_encoding, message.body,
+                                           self._max_decompressed_size):
+                yield chunk
+        except ValueError as error:
+            self.logger.exception('Could not decode message body: %s', error)
+            raise MessageException(
+                'Could not decode message body: {}', None, error)
 
-    @staticmethod
-    def _dump_csv_value(value):
-        """Take a list of lists and return it as a CSV value
+    def _iter_decoded(self, messages):
+        """Return an iterator of the decoded bodies of the messages, yielding
+        :data:`None` for the message bodies that can not be decoded.
 
-        :param list value: A list of lists to return as a CSV
-        :rtype: str
+        :param list messages: The messages to decode
+        :rtype: iterator
 
         """
-        buff = io.StringIO()
-        writer = csv.writer(buff, quotechar='"', quoting=csv.QUOTE_ALL)
-        writer.writerows(value)
-        buff.seek(0)
-        value = buff.read()
-        buff.close()
-        return value
+        for message in messages:
+            try:
+                yield self._decode_body(message)
+            except MessageException:
+                yield None
 
     @staticmethod
-    def _dump_json_value(value):
-        """Serialize a value into JSON
+    def _load_zstd_dictionary(path):
+        """Load the Zstandard dictionary from the path, returning its id.
 
-        :param object value: The value to serialize
-        :rtype: bytes
+        :param str path: The path to the dictionary file
+        :rtype: int
+        :raises: rejected.consumer.ConfigurationException
 
         """
-        return json.dumps(value, ensure_ascii=True).encode('utf-8')
+        if not codec.zstandard:
+            raise ConfigurationException(
+                'zstandard is required for compression dictionaries')
+        try:
+            return codec.load_zstd_dictionary(path)
+        except (IOError, ValueError) as error:
+            raise ConfigurationException(
+                'Could not load the compression dictionary {}: {}'.format(
+                    path, error))
 
-    @staticmethod
-    def _dump_msgpack_value(value):
-        """Serialize a value into MessagePack
+    def _offload_decoding(self):
+        """Return :class:`True` if the current message body should be decoded
+        in the thread pool instead of on the IOLoop.
 
-        :param object value: The value to serialize
-        :type value: str or dict or list
-        :rtype: bytes
+        :rtype: bool
 
         """
-        return umsgpack.packb(value)
+        return bool(self._offload_min_size and self._message and
+                    len(self._message.body) >= self._offload_min_size and
+                    (self.content_encoding in codec.CONTENT_ENCODINGS or
+                     self.content_type in codec.CONTENT_TYPES))
 
-    @staticmethod
-    def _dump_pickle_value(value):
-        """Serialize a value into the pickle format
+    @property
+    def _offload_pool(self):
+        """Return the thread pool used to decode large message bodies,
+        creating it when first used.
 
-        :param object value: The object to pickle
-        :rtype: bytes
+        :rtype: concurrent.futures.ThreadPoolExecutor
 
         """
-        return pickle.dumps(value)
+        if self._offload_executor is None:
+            self._offload_executor = futures.ThreadPoolExecutor(
+                self._offload_max_workers)
+        return self._offload_executor
 
-    @staticmethod
-    def _dump_plist_value(value):
-        """Create a plist value from a dictionary
+    def _prepare_body(self, properties, body, no_serialization, no_encoding):
+        """Return the message properties and body to publish, auto-serialized
+        and auto-encoded based upon the message properties. If the properties
+        do not specify a ``content_encoding`` and automatic compression is
+        enabled, bodies of at least the minimum size are compressed and a
+        copy of the properties with the ``content_encoding`` set is returned.
 
-        :param dict value: The value to make the plist from
-        :rtype: bytes
+        :param dict properties: The message properties
+        :param mixed body: The message body to publish
+        :param bool no_serialization: Turn off auto-serialization of the body
+        :param bool no_encoding: Turn off auto-encoding of the body
+        :rtype: tuple(dict, bytes)
+
+        """
+        # Auto-serialize the content if needed
+        is_string = (isinstance(body, str) or
+                     isinstance(body, bytes) or
+                     isinstance(body, unicode))
+        if (not no_serialization and not is_string and
+                properties.get('content_type')):
+            self.logger.debug('Auto-serializing message body')
+            body = self._auto_serialize(properties.get('content_type'), body)
+
+        if no_encoding:
+            return properties, body
+
+        # Auto-encode the message body if needed
+        if properties.get('content_encoding'):
+            self.logger.debug('Auto-encoding message body')
+            body = self._auto_encode(properties.get('content_encoding'), body)
+
+        # Compress the message body if it has reached the minimum size
+        elif (self._compression_encoding and
+              isinstance(body, (bytes, str, unicode)) and
+              len(body) >= self._compression_min_size):
+            body = self._auto_encode(self._compression_encoding, body)
+            properties = dict(properties)
+            properties['content_encoding'] = self._compression_encoding
+        return properties, body
+
+    def _publish_envelope(self, key):
+        """Publish the envelope of the buffered messages for the connection,
+        exchange and routing key, resolving the future returned when the
+        messages were buffered.
+
+        :param tuple key: The connection name, exchange and routing key
 
         """
-        if hasattr(plistlib, 'dumps'):
-            return plistlib.dumps(value)
+        buffer = self._envelopes.pop(key, None)
+        if buffer is None:
+            return
+        ioloop.IOLoop.current().remove_timeout(buffer.timeout)
+        self.logger.debug('Publishing an envelope of %i messages to %s:%s',
+                          len(buffer), buffer.exchange, buffer.routing_key)
         try:
-            return plistlib.writePlistToString(value).encode('utf-8')
-        except AttributeError:
-            return plistlib.writePlistToBytes(value)
+            conn = self._publish_connection(buffer.connection)
+            properties = self._get_pika_properties({
+                'app_id': self.name,
+                'content_type': envelope.CONTENT_TYPE,
+                'timestamp': int(time.time())})
+            publisher = conn.next_publisher()
+            publisher.channel.basic_publish(
+                exchange=buffer.exchange,
+                routing_key=buffer.routing_key,
+                properties=properties,
+                body=envelope.pack(buffer.messages),
+                mandatory=conn.publisher_confirmations)
+            result = self._publisher_confirmation_future(
+                publisher, buffer.exchange, buffer.routing_key, properties)
+        except Exception:
+            buffer.future.set_exc_info(sys.exc_info())
+            return
+        if result is None:
+            buffer.future.set_result(None)
+        else:
+            concurrent.chain_future(result, buffer.future)
+
+
+class BatchConsumer(Consumer):
+    """Base class for consumers that process messages in batches instead of
+    one at a time. You must extend the
+    :meth:`~rejected.consumer.BatchConsumer.process_batch` method in your
+    child class instead of :meth:`~rejected.consumer.Consumer.process`.
+
+    Batches contain up to :const:`~rejected.consumer.BatchConsumer.BATCH_SIZE`
+    messages, or the messages that were received within
+    :const:`~rejected.consumer.BatchConsumer.BATCH_TIMEOUT` milliseconds of
+    the first message in the batch, whichever comes first. Both may be
+    overridden in the consumer configuration with ``batch_size`` and
+    ``batch_timeout``. The ``qos_prefetch`` for the consumer should be at
+    least the batch size.
+
+    Messages are validated individually prior to being added to the batch
+    and the per-message attributes such as
+    :attr:`~rejected.consumer.Consumer.body` are not available while
+    processing a batch. Use the attributes of the
+    :class:`~rejected.data.Message` objects passed in to
+    :meth:`~rejected.consumer.BatchConsumer.process_batch` instead.
 
-    @staticmethod
-    def _dump_yaml_value(value):
-        """Dump an object into a YAML string
+    .. code-block:: python
+       :caption: Example Usage
 
-        :param object value: The value to dump as a YAML string
-        :rtype: str
+       class Consumer(consumer.BatchConsumer):
+
+           BATCH_SIZE = 500
+
+           @gen.coroutine
+           def process_batch(self, messages):
+               results = {}
+               for message in messages:
+                   if not message.body:
+                       results[message] = data.MESSAGE_DROP
+               yield self.bulk_insert(
+                   [m.body for m in messages if m not in results])
+               raise gen.Return(results)
+
+    .. versionadded:: 4.0.0
+
+    """
+    BATCH_SIZE = 100
+    """The maximum number of messages to pass in to
+    :meth:`~rejected.consumer.BatchConsumer.process_batch` at a time.
+
+    :default: :const:`100`
+    :type: int
+    """
+
+    BATCH_TIMEOUT = 1000
+    """The maximum duration in milliseconds to wait for a batch to fill
+    before processing the messages that have been received.
+
+    :default: :const:`1000`
+    :type: int
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Creates a new instance of the
+        :class:`~rejected.consumer.BatchConsumer` class.
 
         """
-        return yaml.dump(value)
+        self._batch_size = int(kwargs.get('batch_size') or self.BATCH_SIZE)
+        self._batch_timeout = int(kwargs.get('batch_timeout') or
+                                  self.BATCH_TIMEOUT)
+        super(BatchConsumer, self).__init__(*args, **kwargs)
 
-    @staticmethod
-    def _encode_bz2(value):
-        """Return a bzip2 compressed value
+    def process_batch(self, messages):
+        """Implement this method for the primary, top-level batch processing
+        logic for your consumer.
 
-        :param str value: Uncompressed value
-        :rtype: bytes
+        Return :data:`None` to acknowledge all of the messages in the batch.
+        To specify the result for individual messages, return a :class:`dict`
+        of :class:`~rejected.data.Message` to result values, where messages
+        that are omitted are acknowledged, or a :class:`list` of result values
+        in the same order as ``messages``. The result values are:
+
+        - :const:`rejected.data.MESSAGE_ACK`: Acknowledge the message
+        - :const:`rejected.data.MESSAGE_DROP`: Reject the message without
+          re-queueing it, republishing it to the
+          :const:`~rejected.consumer.Consumer.DROP_EXCHANGE` if set
+        - :const:`rejected.data.MESSAGE_EXCEPTION`: Reject the message
+          without re-queueing it
+        - :const:`rejected.data.MESSAGE_REQUEUE`: Re-queue the message
+        - :const:`rejected.data.PROCESSING_EXCEPTION`: Reject the message,
+          republishing it to the
+          :const:`~rejected.consumer.Consumer.ERROR_EXCHANGE`
+
+        Exceptions that are raised apply to all of the messages in the batch,
+        in the same manner as they do for
+        :meth:`~rejected.consumer.Consumer.process`.
+
+        .. note:: Asynchronous support: Decorate this method with
+            :func:`tornado.gen.coroutine` or define it with ``async def``
+            to make it asynchronous.
+
+        :param list messages: The :class:`~rejected.data.Message` objects
+            to process
+        :rtype: None or dict or list
+        :raises: :exc:`rejected.consumer.ConsumerException`
+        :raises: :exc:`rejected.consumer.MessageException`
+        :raises: :exc:`rejected.consumer.ProcessingException`
 
         """
-        if not isinstance(value, bytes):
-            value = value.encode('utf-8')
-        return bz2.compress(value)
+        raise NotImplementedError
 
-    @staticmethod
-    def _encode_gzip(value):
-        """Return zlib compressed value
+    @property
+    def batch_size(self):
+        """Return the maximum number of messages in a batch.
 
-        :param str value: Uncompressed value
-        :rtype: bytes
+        :rtype: int
 
         """
-        if not isinstance(value, bytes):
-            value = value.encode('utf-8')
-        return zlib.compress(value)
+        return self._batch_size
 
-    @staticmethod
-    def _load_bs4_value(value):
-        """Load an HTML or XML string into an lxml etree object.
+    @property
+    def batch_timeout(self):
+        """Return the maximum duration in milliseconds to wait for a batch to
+        fill.
+
+        :rtype: int
+
+        """
+        return self._batch_timeout
+
+    """Internal Methods"""
+
+    def execute_batch(self, messages, measurement):
+        """Process a batch of messages from RabbitMQ. To implement logic for
+        processing a batch, extend
+        :meth:`~rejected.consumer.BatchConsumer.process_batch`, not this
+        method.
+
+        This for internal use and should not be extended or used directly.
 
-        :param str value: The HTML or XML string
-        :rtype: bs4.BeautifulSoup
-        :raises: ConsumerException
+        :param list messages: The :class:`~rejected.data.Message` objects
+            to process
+        :param measurement: For collecting per-batch instrumentation
+        :type measurement: :class:`rejected.data.Measurement`
+        :rtype: tornado.concurrent.Future
 
         """
-        if not bs4:
-            raise ConsumerException('BeautifulSoup4 is not enabled')
-        if isinstance(value, bytes):
-            value = value.decode('utf-8')
-        return bs4.BeautifulSoup(value)
+        context = _Context(None, measurement)
+        with stack_context.StackContext(
+                functools.partial(self._activate_context, context)):
+            future = self._execute_batch(messages, measurement)
+        future.add_done_callback(
+            lambda _future: self._release_confirmations(context))
+        return future
+
+    @gen.coroutine
+    def _execute_batch(self, messages, measurement):
+        """Coroutine that implements the batch processing contract, invoked
+        by :meth:`~rejected.consumer.BatchConsumer.execute_batch`. Returns
+        the results for the messages in the same order as ``messages``.
+
+        :param list messages: The :class:`~rejected.data.Message` objects
+            to process
+        :param measurement: For collecting per-batch instrumentation
+        :type measurement: :class:`rejected.data.Measurement`
+        :rtype: list
+
+        """
+        self.logger.debug('Received batch of %i messages', len(messages))
+        self._correlation_id = str(uuid.uuid4())
+
+        results, batch = {}, []
+        for message in messages:
+            if message.properties.timestamp:
+                message_age = float(
+                    max(message.properties.timestamp, time.time()) -
+                    message.properties.timestamp)
+                if message_age > 0:
+                    measurement.add_duration(
+                        self.message_age_key(), message_age)
+            results[message] = self._validate_message(message)
+            if not results[message]:
+                batch.append(message)
+        measurement.set_value('batch_size', len(batch))
+
+        if batch:
+            result = None
+            try:
+                result = self.process_batch(batch)
+                if _is_async(result):
+                    result = yield result
+                results.update(self._batch_results(batch, result))
+            except KeyboardInterrupt:
+                self.logger.debug('CTRL-C')
+                self._process.stop()
+                results.update(
+                    (message, data.MESSAGE_REQUEUE) for message in batch)
+            except Exception as error:
+                result = self._on_processing_exception(error, batch, result)
+                results.update((message, result) for message in batch)
+            else:
+                self._republish_batch_results(batch, results)
+
+        if not self._finished:
+            self.finish()
+
+        raise gen.Return([results[message] for message in messages])
 
     @staticmethod
-    def _load_csv_value(value):
-        """Create a csv.DictReader instance for the sniffed dialect for the
-        value passed in.
+    def _batch_results(messages, value):
+        """Return a dict of message to result for the value returned by
+        :meth:`~rejected.consumer.BatchConsumer.process_batch`.
 
-        :param str value: The CSV value
-        :rtype: csv.DictReader
+        :param list messages: The messages that were processed
+        :param value: The value returned for the batch
+        :type value: None or dict or list
+        :rtype: dict
+        :raises: ValueError
 
         """
-        if isinstance(value, bytes):
-            value = value.decode('utf-8')
-        csv_buffer = io.StringIO(value)
-        dialect = csv.Sniffer().sniff(csv_buffer.read(1024))
-        csv_buffer.seek(0)
-        return csv.DictReader(csv_buffer, dialect=dialect)
+        if value is None:
+            return dict((message, data.MESSAGE_ACK) for message in messages)
+        elif isinstance(value, dict):
+            return dict((message, value.get(message) or data.MESSAGE_ACK)
+                        for message in messages)
+        elif isinstance(value, (list, tuple)):
+            if len(value) != len(messages):
+                raise ValueError(
+                    'Expected {} batch results, received {}'.format(
+                        len(messages), len(value)))
+            return dict((message, result or data.MESSAGE_ACK)
+                        for message, result in zip(messages, value))
+        raise ValueError('Unsupported batch result: {!r}'.format(value))
+
+    def _republish_batch_results(self, messages, results):
+        """Republish the messages in a batch that were dropped or had a
+        processing exception returned as their result.
+
+        :param list messages: The messages that were processed
+        :param dict results: The result for each message
+
+        """
+        for message in messages:
+            if results[message] == data.MESSAGE_DROP and self._drop_exchange:
+                self._republish_dropped_message('batch result', message)
+            elif results[message] == data.PROCESSING_EXCEPTION:
+                self._republish_processing_error(
+                    ProcessingException.__name__, message)
+
+
+class ThreadPoolConsumer(Consumer):
+    """Base class for consumers that call blocking code, such as client
+    libraries that do not support Tornado, when processing messages.
+    :meth:`~rejected.consumer.Consumer.prepare` and
+    :meth:`~rejected.consumer.Consumer.process` are run in a
+    :class:`~concurrent.futures.ThreadPoolExecutor` with up to
+    :const:`~rejected.consumer.ThreadPoolConsumer.MAX_WORKERS` threads, which
+    may be overridden in the consumer configuration with ``max_workers``.
+    The IOLoop remains free to service RabbitMQ while messages are being
+    processed, and setting ``max_concurrency`` to the number of workers
+    allows that many messages to be processed at a time.
+
+    The per-message attributes and methods, such as
+    :attr:`~rejected.consumer.Consumer.body` and
+    :meth:`~rejected.consumer.Consumer.stats_incr`, may be used from the
+    worker threads. :meth:`~rejected.consumer.Consumer.publish_message`
+    publishes on the IOLoop, blocking the worker thread until the message is
+    published and returning the confirmation result instead of a
+    :class:`~tornado.concurrent.Future` if publisher confirmations are
+    enabled. As such, ``prepare`` and ``process`` should not be coroutines.
+    Combine with :class:`~rejected.consumer.SmartConsumer` by extending both,
+    with :class:`~rejected.consumer.ThreadPoolConsumer` first.
+
+    The size of the thread pool and the time each message waited for a
+    worker thread are added to the per-message measurements as
+    ``thread_pool_size`` and ``thread_pool_wait``.
+
+    .. code-block:: python
+       :caption: Example Usage
+
+       class Consumer(consumer.ThreadPoolConsumer):
 
-    def _load_json_value(self, value):
-        """Deserialize a JSON string returning the native Python data type
-        for the value.
+           MAX_WORKERS = 8
 
-        :param str value: The JSON string
-        :rtype: object
+           def process(self):
+               self.database.insert(self.body)
+
+    .. versionadded:: 4.0.0
+
+    """
+    MAX_WORKERS = 4
+    """The maximum number of threads used to process messages.
+
+    :default: :const:`4`
+    :type: int
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Creates a new instance of the
+        :class:`~rejected.consumer.ThreadPoolConsumer` class.
 
         """
-        if isinstance(value, bytes):
-            value = value.decode('utf-8')
-        try:
-            return json.loads(value, encoding='utf-8')
-        except ValueError as error:
-            self.logger.exception('Could not decode message body: %s', error)
-            raise MessageException(error)
+        if futures is None:
+            raise ConfigurationException(
+                'concurrent.futures is required for ThreadPoolConsumer')
+        self._local = threading.local()
+        self._max_workers = int(kwargs.get('max_workers') or
+                                self.MAX_WORKERS)
+        self._executor = futures.ThreadPoolExecutor(self._max_workers)
+        super(ThreadPoolConsumer, self).__init__(*args, **kwargs)
+
+    def publish_message(self, exchange, routing_key, properties, body,
+                        *args, **kwargs):
+        """Publish a message to RabbitMQ on the same channel the original
+        message was received on. When invoked from a worker thread, the
+        message is published on the IOLoop and the thread blocks until it
+        has been published. If
+        `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
+        are enabled, a :type:`bool` that indicates if the publishing was
+        successful is returned once the confirmation is received.
+
+        Additional arguments, such as ``connection``, are passed through to
+        the parent class.
+
+        :param str exchange: The exchange to publish to
+        :param str routing_key: The routing key to publish with
+        :param dict properties: The message properties
+        :param str body: The message body
+        :rtype: bool or tornado.concurrent.Future or None
+
+        """
+        return self._publish_on_ioloop(functools.partial(
+            super(ThreadPoolConsumer, self).publish_message,
+            exchange, routing_key, properties, body, *args, **kwargs))
+
+    def publish_messages(self, messages, *args, **kwargs):
+        """Publish multiple messages to RabbitMQ in a single pass. When
+        invoked from a worker thread, the messages are published on the
+        IOLoop and the thread blocks until they have been published. If
+        `publisher confirmations <https://www.rabbitmq.com/confirms.html>`_
+        are enabled, a :class:`list` of :class:`bool` values that indicate
+        if each message was delivered is returned once all of the messages
+        have been confirmed.
+
+        Additional arguments, such as ``connection``, are passed through to
+        the parent class.
 
-    def _load_msgpack_value(self, value):
-        """Deserialize a msgpack string returning the native Python data type
-        for the value.
+        :param messages: The ``(exchange, routing_key, properties, body)``
+            tuples of the messages to publish
+        :type messages: iterable(tuple)
+        :rtype: list or tornado.concurrent.Future or None
 
-        :param str value: The msgpack string
-        :rtype: object
+        """
+        return self._publish_on_ioloop(functools.partial(
+            super(ThreadPoolConsumer, self).publish_messages,
+            list(messages), *args, **kwargs))
+
+    def shutdown(self):
+        """Implement to cleanly shutdown your application code when rejected is
+        stopping the consumer. When extending this method, invoke it with
+        :func:`super` to stop the thread pool.
+
+        """
+        self._executor.shutdown()
+        super(ThreadPoolConsumer, self).shutdown()
+
+    @property
+    def max_workers(self):
+        """Return the maximum number of threads used to process messages.
+
+        :rtype: int
+
+        """
+        return self._max_workers
+
+    """Internal Methods"""
+
+    @property
+    def _context(self):
+        """Return the per-message context for the worker thread that is
+        processing a message, or the context that is current on the IOLoop.
+
+        :rtype: _Context
+
+        """
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            return self._ioloop_context
+        return context
+
+    @_context.setter
+    def _context(self, value):
+        self._ioloop_context = value
+
+    def _invoke(self, method):
+        """Run :meth:`~rejected.consumer.Consumer.prepare` or
+        :meth:`~rejected.consumer.Consumer.process` in the thread pool,
+        returning the :class:`concurrent.futures.Future` for its result. The
+        future is yielded on the IOLoop, which waits for it to be resolved
+        by the worker thread without touching Tornado futures off of the
+        IOLoop. The default, empty ``prepare`` is invoked directly.
+
+        :param callable method: The method to invoke
+        :rtype: concurrent.futures.Future
+
+        """
+        if (getattr(method, '__func__', None) is
+                getattr(Consumer.prepare, '__func__', Consumer.prepare)):
+            return method()
+        self._measurement.set_value('thread_pool_size', self._max_workers)
+        return self._executor.submit(
+            self._run_in_thread, method, self._context,
+            ioloop.IOLoop.current(), time.time())
+
+    def _publish_from_thread(self, context, future, publish):
+        """Invoked on the IOLoop to publish a message on behalf of a worker
+        thread, resolving the :class:`~concurrent.futures.Future` the thread
+        is blocked on once the message is published or confirmed.
+
+        :param _Context context: The context of the message being processed
+        :param concurrent.futures.Future future: The future to resolve
+        :param callable publish: The publishing method with its arguments
 
         """
         try:
-            return umsgpack.unpackb(value)
-        except ValueError as error:
-            self.logger.exception('Could not decode message body: %s', error)
-            raise MessageException(error)
+            with stack_context.StackContext(
+                    functools.partial(self._activate_context, context)):
+                result = publish()
+        except Exception as error:
+            return future.set_exception(error)
+        if not concurrent.is_future(result):
+            return future.set_result(result)
 
-    @staticmethod
-    def _load_pickle_value(value):
-        """Deserialize a pickle string returning the native Python data type
-        for the value.
+        def on_confirmation(confirmation):
+            if confirmation.exception():
+                return future.set_exception(confirmation.exception())
+            future.set_result(confirmation.result())
+
+        result.add_done_callback(on_confirmation)
+
+    def _publish_on_ioloop(self, publish):
+        """Invoke the publishing method directly when on the IOLoop, or
+        schedule it on the IOLoop and block until it has been published or
+        confirmed when invoked from a worker thread.
 
-        :param bytes value: The pickle string
-        :rtype: object
+        :param callable publish: The publishing method with its arguments
+        :rtype: mixed
 
         """
-        return pickle.loads(value)
+        if getattr(self._local, 'context', None) is None:
+            return publish()
+        future = futures.Future()
+        self._local.io_loop.add_callback(
+            self._publish_from_thread, self._local.context, future, publish)
+        return future.result()
 
-    @staticmethod
-    def _load_plist_value(value):
-        """Deserialize a plist string returning the native Python data type
-        for the value.
+    def _run_in_thread(self, method, context, io_loop, submitted_at):
+        """Invoke the method in a worker thread with the message context
+        set as the context of the thread.
 
-        :param bytes value: The pickle string
-        :rtype: dict
+        :param callable method: The method to invoke
+        :param _Context context: The context of the message being processed
+        :param tornado.ioloop.IOLoop io_loop: The IOLoop of the process
+        :param float submitted_at: When the method was submitted to the pool
+        :rtype: mixed
 
         """
-        if hasattr(plistlib, 'loads'):
-            return plistlib.loads(value)
+        context.measurement.add_duration(
+            'thread_pool_wait', max(submitted_at, time.time()) - submitted_at)
+        self._local.context, self._local.io_loop = context, io_loop
         try:
-            return plistlib.readPlistFromString(value)
-        except AttributeError:
-            return plistlib.readPlistFromBytes(value)
+            return method()
+        finally:
+            self._local.context, self._local.io_loop = None, None
+
+
+class ProcessPoolConsumer(Consumer):
+    """Base class for consumers with CPU-bound message processing, such as
+    parsing, image manipulation, or scoring, that needs to scale with the
+    number of CPU cores. Instead of adding consumer processes, each with
+    their own connection to RabbitMQ, the consumer process keeps its
+    connection and passes the work to a
+    :class:`~concurrent.futures.ProcessPoolExecutor` of up to
+    :const:`~rejected.consumer.ProcessPoolConsumer.MAX_WORKERS` worker
+    processes, which may be overridden in the consumer configuration with
+    ``max_workers``.
+
+    Use :meth:`~rejected.consumer.ProcessPoolConsumer.run_in_worker` in
+    :meth:`~rejected.consumer.Consumer.process` to invoke a module level
+    function with the message body, or any other value that can be pickled,
+    in a worker process. Messages are acknowledged by the consumer process
+    once processing is complete, and setting ``max_concurrency`` to the number
+    of workers allows that many messages to be processed at a time.
+
+    The worker processes are started when the consumer is created, prior to
+    connecting to RabbitMQ. If a worker process dies, the pool can no longer
+    be used and the consumer process is restarted once ``max_errors`` is
+    reached.
+
+    The size of the pool and the time each call waited for a worker process
+    are added to the per-message measurements as ``process_pool_size`` and
+    ``process_pool_wait``.
 
-    @staticmethod
-    def _load_yaml_value(value):
-        """Load an YAML string into an dict object.
+    .. code-block:: python
+       :caption: Example Usage
 
-        :param str value: The YAML string
-        :rtype: any
-        :raises: ConsumerException
+       def score(body):
+           return model.predict(body)
+
+
+       class Consumer(consumer.ProcessPoolConsumer):
+
+           @gen.coroutine
+           def process(self):
+               result = yield self.run_in_worker(score, self.body)
+               self.publish_message('scores', self.routing_key, {}, result)
+
+    .. versionadded:: 4.0.0
+
+    """
+    MAX_WORKERS = None
+    """The maximum number of worker processes. If :data:`None`, the number of
+    CPU cores is used.
+
+    :default: :data:`None`
+    :type: int or None
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Creates a new instance of the
+        :class:`~rejected.consumer.ProcessPoolConsumer` class.
+
+        """
+        if futures is None:
+            raise ConfigurationException(
+                'concurrent.futures is required for ProcessPoolConsumer')
+        self._max_workers = int(kwargs.get('max_workers') or
+                                self.MAX_WORKERS or
+                                multiprocessing.cpu_count())
+        self._executor = futures.ProcessPoolExecutor(self._max_workers)
+
+        # Start the worker processes prior to connecting to RabbitMQ
+        self._executor.submit(time.time)
+        super(ProcessPoolConsumer, self).__init__(*args, **kwargs)
+
+    @gen.coroutine
+    def run_in_worker(self, func, *args, **kwargs):
+        """Invoke the function in a worker process, returning its result.
+        The function must be defined at the module level and the arguments
+        and return value must be able to be pickled. :class:`memoryview`
+        arguments, such as the body of a message that was moved to a
+        memory-mapped temporary file, are copied to :class:`bytes`.
+
+        :param callable func: The function to invoke
+        :param args: Positional arguments for the function
+        :param kwargs: Keyword arguments for the function
+        :rtype: mixed
+
+        """
+        self._measurement.set_value('process_pool_size', self._max_workers)
+        args = tuple(_picklable(value) for value in args)
+        kwargs = dict((key, _picklable(value))
+                      for key, value in kwargs.items())
+        wait, result = yield self._executor.submit(
+            _call_in_worker, time.time(), func, args, kwargs)
+        self._measurement.add_duration('process_pool_wait', wait)
+        raise gen.Return(result)
+
+    def shutdown(self):
+        """Implement to cleanly shutdown your application code when rejected is
+        stopping the consumer. When extending this method, invoke it with
+        :func:`super` to stop the worker processes.
+
+        """
+        self._executor.shutdown()
+
+    @property
+    def max_workers(self):
+        """Return the maximum number of worker processes.
+
+        :rtype: int
 
         """
-        return yaml.load(value)
+        return self._max_workers
 
 
 class ConfigurationException(errors.RejectedException):
@@ -5,16 +5,15 @@ OS Level controlling class invokes startup, shutdown and handles signals.
 import logging
 import os
 import signal
+import subprocess
 import sys
 
 import helper
 from helper import parser
-try:
-    import raven
-except ImportError:
-    raven = None
 
-from rejected import mcp, __version__
+from rejected import mcp, startup, utils, __version__
+
+raven = utils.lazy_import('raven')
 
 LOGGER = logging.getLogger(__name__)
 
@@ -60,6 +59,27 @@ class Controller(helper.Controller):
         LOGGER.debug('Prepending "%s" to the python path.', path)
         sys.path.insert(0, path)
 
+    def _startup_profile(self):
+        """Report the time a consumer process spends importing the rejected
+        modules and the configured consumer modules when it starts, importing
+        them in a new interpreter.
+
+        :rtype: int
+
+        """
+        modules = ['rejected.process']
+        consumers = self.config.application.get('Consumers') or {}
+        for name in sorted(consumers):
+            if not self.args.consumer or name == self.args.consumer:
+                modules.append(consumers[name]['consumer'].rsplit('.', 1)[0])
+        env = dict(os.environ)
+        if self.args.prepend_path:
+            env['PYTHONPATH'] = os.pathsep.join(
+                [self.args.prepend_path] +
+                ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+        script = os.path.splitext(startup.__file__)[0] + '.py'
+        return subprocess.call([sys.executable, script] + modules, env=env)
+
     def setup(self):
         """Continue the run process blocking on MasterControlProgram.run"""
         # If the app was invoked to specified to prepend the path, do so now
@@ -97,6 +117,8 @@ class Controller(helper.Controller):
     def run(self):
         """Run the rejected Application"""
         self.setup()
+        if self.args.startup_profile:
+            sys.exit(self._startup_profile())
         self._mcp = self._master_control_program()
         try:
             self._mcp.run()
@@ -132,6 +154,12 @@ def add_parser_arguments():
                            default=None,
                            dest='prepend_path',
                            help='Prepend the python path with the value.')
+    argparser.add_argument('--startup-profile',
+                           action='store_true',
+                           dest='startup_profile',
+                           help='Report the time spent importing the rejected '
+                           'and consumer modules when a consumer process '
+                           'starts, then exit. Use with -f.')
     argparser.add_argument('-q', '--qty',
                            action='store',
                            type=int,
@@ -4,7 +4,9 @@ Rejected data objects
 """
 import collections
 import contextlib
-import copy
+import io
+import mmap
+import tempfile
 import time
 
 MESSAGE_ACK = 1
@@ -23,13 +25,15 @@ class Data(object):
     __slots__ = []
 
     def __iter__(self):
-        """Iterate the attributes and values as key, value pairs.
+        """Iterate the attributes and values as key, value pairs, skipping
+        private attributes.
 
         :rtype: tuple
 
         """
         for attribute in self.__slots__:
-            yield (attribute, getattr(self, attribute))
+            if not attribute.startswith('_'):
+                yield (attribute, getattr(self, attribute))
 
     def __repr__(self):
         """Return a string representation of the object
@@ -48,7 +52,7 @@ class Message(Data):
     +------------------------------------------------------------------+
     | Attributes                                                       |
     +======================+===========================================+
-    | :attr:`body`         |The AMQP message body                      |
+    | :attr:`body`         | The AMQP message body, as delivered       |
     +----------------------+-------------------------------------------+
     | :attr:`connection`   | The name of the connection that the       |
     |                      | message was received on.                  |
@@ -80,11 +84,14 @@ class Message(Data):
     | :attr:`routing_key`  | The routing key that was used to deliver  |
     |                      | the message.                              |
     +----------------------+-------------------------------------------+
+    | :attr:`spilled`      | A flag that indicates the body was moved  |
+    |                      | to a memory-mapped temporary file.        |
+    +----------------------+-------------------------------------------+
 
     """
     __slots__ = ['connection', 'channel', 'method', 'properties', 'body',
                  'consumer_tag', 'delivery_tag', 'exchange', 'redelivered',
-                 'routing_key']
+                 'routing_key', 'spilled']
 
     def __init__(self, connection, channel, method, properties, body):
         """Initialize a message setting the attributes from the given channel,
@@ -95,14 +102,16 @@ class Message(Data):
         :type channel: pika.channel.Channel
         :param pika.frames.Method method: pika Method Frame object
         :param pika.spec.BasicProperties properties: message properties
-        :param str body: Opaque message body
+        :param body: Opaque message body, which is not copied
+        :type body: bytes or memoryview
 
         """
         self.connection = connection
         self.channel = channel
         self.method = method
         self.properties = Properties(properties)
-        self.body = copy.copy(body)
+        self.body = body
+        self.spilled = False
 
         # Map method properties
         self.consumer_tag = method.consumer_tag
@@ -111,10 +120,80 @@ class Message(Data):
         self.redelivered = method.redelivered
         self.routing_key = method.routing_key
 
+    @property
+    def body_file(self):
+        """Return a read-only file-like object for the body that reads it
+        in place, without copying the whole body.
+
+        :rtype: io.BufferedReader
+
+        """
+        return io.BufferedReader(_BodyReader(self.body or b''))
+
+    def spill(self, directory=None):
+        """Move the body to an unlinked temporary file and replace it with a
+        read-only :class:`memoryview` of the file mapped into memory, so the
+        kernel can page the body in and out instead of it being held on the
+        Python heap. The file is removed when the last reference to the
+        body is released.
+
+        :param str directory: The directory to create the file in, defaulting
+            to the system temporary directory
+        :raises: IOError
+        :raises: OSError
+
+        """
+        if self.spilled or not self.body:
+            return
+        with tempfile.TemporaryFile(dir=directory) as handle:
+            handle.write(self.body)
+            handle.flush()
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.body = memoryview(mapped)
+        self.spilled = True
+
+
+class _BodyReader(io.RawIOBase):
+    """Raw reader of a message body that copies only the bytes read.
+
+    :param body: The message body
+    :type body: bytes or memoryview
+
+    """
+    def __init__(self, body):
+        super(_BodyReader, self).__init__()
+        self._body = memoryview(body)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._body[self._position:self._position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._body)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
 
 class Properties(Data):
     """A class that represents all of the field attributes of AMQP's
-    ``Basic.Properties``.
+    ``Basic.Properties``. When created from a
+    :class:`~pika.spec.BasicProperties` object, each attribute is read from
+    it the first time it is accessed.
 
     +-----------------------------------------------------------------+
     | Attributes                                                      |
@@ -150,7 +229,7 @@ class Properties(Data):
     __slots__ = ['app_id', 'content_type', 'content_encoding',
                  'correlation_id', 'delivery_mode', 'expiration', 'headers',
                  'priority', 'reply_to', 'message_id', 'timestamp', 'type',
-                 'user_id']
+                 'user_id', '_properties']
 
     def __init__(self, properties=None, **kwargs):
         """Create a base object to contain all of the properties we need,
@@ -161,13 +240,27 @@ class Properties(Data):
         :type: properties: pika.spec.BasicProperties
 
         """
-        for attribute in self.__slots__:
-            setattr(self, attribute, None)
-            if properties and getattr(properties, attribute) is not None:
-                setattr(self, attribute, getattr(properties, attribute))
-            elif kwargs.get(attribute, None) is not None:
+        self._properties = properties
+        for attribute in kwargs:
+            if (attribute in self.__slots__ and
+                    kwargs[attribute] is not None and
+                    getattr(properties, attribute, None) is None):
                 setattr(self, attribute, kwargs[attribute])
 
+    def __getattr__(self, name):
+        """Read an attribute that has not been set yet from the
+        :class:`~pika.spec.BasicProperties`, caching the value.
+
+        :param str name: The attribute name
+        :raises: AttributeError
+
+        """
+        if name.startswith('_') or name not in self.__slots__:
+            raise AttributeError(name)
+        value = getattr(self._properties, name, None)
+        setattr(self, name, value)
+        return value
+
 
 class Measurement(Data):
     """Common Measurement Object that provides common methods for collecting
@@ -232,6 +325,18 @@ class Measurement(Data):
             self.durations[key] = []
         self.durations[key].append(value)
 
+    def reset(self):
+        """Clear the measurement data in place so that the measurement can be
+        reused for another message.
+
+        .. versionadded:: 4.0.0
+
+        """
+        self.durations.clear()
+        self.counters.clear()
+        self.tags.clear()
+        self.values.clear()
+
     def set_tag(self, key, value):
         """Set a tag. This is only used for InfluxDB measurements.
 
@@ -268,3 +373,106 @@ class Measurement(Data):
         finally:
             self.durations[key].append(
                 max(start_time, time.time()) - start_time)
+
+
+class NullMeasurement(Measurement):
+    """A :class:`~rejected.data.Measurement` that discards everything that is
+    recorded in it, used when there are no statsd or InfluxDB backends to
+    submit measurements to.
+
+    .. versionadded:: 4.0.0
+
+    """
+    __slots__ = []
+
+    def decr(self, key, value=1):
+        """Discard the counter decrement.
+
+        :param str key: The key to decrement
+        :param int value: The value to decrement by
+
+        """
+
+    def incr(self, key, value=1):
+        """Discard the counter increment.
+
+        :param str key: The key to increment
+        :param int value: The value to increment by
+
+        """
+
+    def add_duration(self, key, value):
+        """Discard the duration.
+
+        :param str key: The value name
+        :param float value: The value
+
+        """
+
+    def set_tag(self, key, value):
+        """Discard the tag.
+
+        :param str key: The tag name
+        :param value: The tag value
+        :type value: str or bool or int
+
+        """
+
+    def set_value(self, key, value):
+        """Discard the value.
+
+        :param str key: The value name
+        :type value: int or float
+        :param value: The value
+
+        """
+
+    @contextlib.contextmanager
+    def track_duration(self, key):
+        """Context manager that does not track the duration of what it is
+        wrapping.
+
+        :param str key: The timing name
+
+        """
+        yield
+
+
+class MeasurementPool(object):
+    """A pool of :class:`~rejected.data.Measurement` objects that are reset
+    and reused once a message has been processed and its measurement
+    submitted, instead of allocating new ones for every message.
+
+    :param int size: The maximum number of measurements to keep in the pool
+
+    .. versionadded:: 4.0.0
+
+    """
+    SIZE = 32
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.measurements = []
+
+    def get(self):
+        """Return a measurement from the pool, creating a new one if the pool
+        is empty.
+
+        :rtype: rejected.data.Measurement
+
+        """
+        if self.measurements:
+            return self.measurements.pop()
+        return Measurement()
+
+    def put(self, measurement):
+        """Reset the measurement and return it to the pool, discarding it if
+        the pool is full.
+
+        :param rejected.data.Measurement measurement: The measurement
+
+        """
+        if (len(self.measurements) < self.size and
+                not isinstance(measurement, NullMeasurement)):
+            measurement.reset()
+            self.measurements.append(measurement)
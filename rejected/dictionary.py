@@ -0,0 +1,147 @@
+"""
+Trains a Zstandard dictionary from a sample of captured message bodies for
+compressing small messages with the ``zstd`` content encoding. Each sample
+file contains a single message body, and directories are searched for sample
+files recursively.
+
+"""
+import argparse
+import os
+import sys
+
+from rejected import __version__, codec
+
+DEFAULT_SIZE = 112640
+
+
+def add_parser_arguments(parser):
+    """Add the command line options to the parser
+
+    :param argparse.ArgumentParser parser: The parser to add options to
+
+    """
+    parser.add_argument('-o', '--output',
+                        action='store',
+                        required=True,
+                        dest='output',
+                        help='The path to write the trained dictionary to')
+    parser.add_argument('-s', '--size',
+                        action='store',
+                        type=int,
+                        default=DEFAULT_SIZE,
+                        dest='size',
+                        help='The maximum size of the dictionary in bytes '
+                             '(default: {})'.format(DEFAULT_SIZE))
+    parser.add_argument('-l', '--level',
+                        action='store',
+                        type=int,
+                        default=codec.ZSTD_LEVEL,
+                        dest='level',
+                        help='The compression level to optimize the '
+                             'dictionary for (default: {})'.format(
+                                 codec.ZSTD_LEVEL))
+    parser.add_argument('-i', '--dict-id',
+                        action='store',
+                        type=int,
+                        default=0,
+                        dest='dict_id',
+                        help='The dictionary id to use instead of a random '
+                             'one')
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s {}'.format(__version__))
+    parser.add_argument('paths',
+                        nargs='+',
+                        metavar='PATH',
+                        help='Files or directories of captured message '
+                             'bodies')
+
+
+def read_samples(paths):
+    """Return the message bodies in the files and directories specified.
+
+    :param list paths: The file and directory paths to read
+    :rtype: list(bytes)
+
+    """
+    samples = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                samples.extend(read_samples(
+                    [os.path.join(root, name) for name in sorted(files)]))
+        else:
+            with open(path, 'rb') as handle:
+                samples.append(handle.read())
+    return samples
+
+
+def train(samples, size=DEFAULT_SIZE, level=codec.ZSTD_LEVEL, dict_id=0):
+    """Train a Zstandard dictionary from the message body samples.
+
+    :param list samples: The message bodies to train the dictionary with
+    :param int size: The maximum size of the dictionary in bytes
+    :param int level: The compression level to optimize the dictionary for
+    :param int dict_id: The dictionary id or ``0`` for a random one
+    :rtype: zstandard.ZstdCompressionDict
+    :raises: zstandard.ZstdError
+
+    """
+    return codec.zstandard.train_dictionary(
+        size, samples, level=level, dict_id=dict_id)
+
+
+def compressed_size(samples, level, dictionary=None):
+    """Return the total size of the samples when compressed individually.
+
+    :param list samples: The message bodies to compress
+    :param int level: The compression level
+    :param dictionary: The dictionary to compress with
+    :type dictionary: zstandard.ZstdCompressionDict or None
+    :rtype: int
+
+    """
+    compressor = codec.zstandard.ZstdCompressor(
+        level=level, dict_data=dictionary)
+    return sum(len(compressor.compress(sample)) for sample in samples)
+
+
+def main(args=None):
+    """Called when invoking the command line script.
+
+    :param list args: The command line arguments, defaulting to sys.argv
+    :rtype: int
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Train a Zstandard dictionary from message bodies')
+    add_parser_arguments(parser)
+    args = parser.parse_args(args)
+    if codec.zstandard is None:
+        parser.error('zstandard is not installed')
+
+    samples = read_samples(args.paths)
+    if not samples:
+        parser.error('no message body samples were found')
+    try:
+        dictionary = train(samples, args.size, args.level, args.dict_id)
+    except codec.zstandard.ZstdError as error:
+        sys.stderr.write('Error training the dictionary: {}\n'.format(error))
+        return 1
+
+    with open(args.output, 'wb') as handle:
+        handle.write(dictionary.as_bytes())
+
+    total = sum(len(sample) for sample in samples)
+    sys.stdout.write(
+        'Wrote dictionary {} ({} bytes) to {}, trained from {} samples\n'
+        'Compressed size: {} bytes without the dictionary, {} bytes with it, '
+        'from {} bytes\n'.format(
+            dictionary.dict_id(), len(dictionary.as_bytes()), args.output,
+            len(samples), compressed_size(samples, args.level),
+            compressed_size(samples, args.level, dictionary), total))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Envelopes
+=========
+Batch envelopes coalesce many small logical messages, each with its own
+properties and body, into a single AMQP message with the
+``application/vnd.rejected.batch+msgpack`` content type, saving a broker frame
+and an acknowledgement per message.
+
+:meth:`~rejected.consumer.SmartConsumer.publish_message` buffers messages into
+envelopes when invoked with ``envelope=True``, and consumer processes unpack
+envelopes that they receive, processing each message in the envelope as if
+it was delivered separately.
+
+"""
+from pika import spec
+
+from rejected import codec, data
+
+CONTENT_TYPE = 'application/vnd.rejected.batch+msgpack'
+
+
+class Buffer(object):
+    """The messages buffered for an envelope that has not been published.
+
+    :param str connection: The name of the connection to publish on
+    :param str exchange: The exchange to publish the envelope to
+    :param str routing_key: The routing key to publish the envelope with
+
+    """
+    __slots__ = ['connection', 'exchange', 'future', 'messages',
+                 'routing_key', 'size', 'timeout']
+
+    def __init__(self, connection, exchange, routing_key, future):
+        self.connection = connection
+        self.exchange = exchange
+        self.future = future
+        self.messages = []
+        self.routing_key = routing_key
+        self.size = 0
+        self.timeout = None
+
+    def __len__(self):
+        return len(self.messages)
+
+    def append(self, properties, body):
+        """Add a message to the buffer.
+
+        :param dict properties: The message properties
+        :param bytes body: The message body
+
+        """
+        body = codec._as_bytes(body)
+        self.messages.append((properties, body))
+        self.size += len(body)
+
+
+def is_envelope(message):
+    """Return :class:`True` if the message is an envelope.
+
+    :param rejected.data.Message message: The message to check
+    :rtype: bool
+
+    """
+    return message.properties.content_type == CONTENT_TYPE
+
+
+def pack(messages):
+    """Return the envelope body for the messages.
+
+    :param list messages: The ``(properties, body)`` tuples of the messages,
+        with the properties as a dict or :class:`rejected.data.Properties`
+    :rtype: bytes
+
+    """
+    return codec.dump_msgpack(
+        [[dict((key, value) for key, value in dict(properties).items()
+               if value is not None), codec._as_bytes(body)]
+         for properties, body in messages])
+
+
+def unpack(message):
+    """Return the messages in the envelope as :class:`~rejected.data.Message`
+    objects that share the connection, channel and delivery of the envelope.
+
+    :param rejected.data.Message message: The envelope
+    :rtype: list(rejected.data.Message)
+    :raises: ValueError
+
+    """
+    body = message.body
+    if isinstance(body, memoryview):
+        body = body.tobytes()
+    try:
+        values = codec.load_msgpack(body)
+        return [data.Message(message.connection, message.channel,
+                             message.method, spec.BasicProperties(**props),
+                             inner)
+                for props, inner in values]
+    except Exception as error:  # msgpack libraries raise their own errors
+        raise ValueError('Invalid envelope: {!r}'.format(error))
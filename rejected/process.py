@@ -15,24 +15,29 @@ except ImportError:
     import profile
 import signal
 import time
+import uuid
 import warnings
 
-try:
-    import sprockets_influxdb as influxdb
-except ImportError:
-    influxdb = None
-
 from tornado import gen, ioloop, locks
 import pika
 
 try:
-    import raven
-    from raven import breadcrumbs
-    from raven.contrib.tornado import AsyncSentryClient
+    import asyncio
+    from tornado.platform import asyncio as tornado_asyncio
+except ImportError:
+    asyncio, tornado_asyncio = None, None
+
+try:
+    import uvloop
 except ImportError:
-    breadcrumbs, raven, AsyncSentryClient = None, None, None
+    uvloop = None
 
-from rejected import __version__, connection, data, state, statsd, utils
+from rejected import (__version__, connection, consumer, data, envelope,
+                      qos, state, statsd, utils)
+
+# Optional imports, imported the first time they are used
+influxdb = utils.lazy_import('sprockets_influxdb')
+raven = utils.lazy_import('raven.breadcrumbs', 'raven.contrib.tornado')
 
 LOGGER = logging.getLogger(__name__)
 
@@ -58,9 +63,12 @@ class Process(multiprocessing.Process, state.State):
     ERROR = 'failed'
     FAILURES = 'failures_until_stop'
     NACKED = 'nacked'
+    PENDING_BYTES = 'pending_bytes'
+    PENDING_MESSAGES = 'pending_messages'
     PROCESSED = 'processed'
     REQUEUED = 'requeued'
     REDELIVERED = 'redelivered'
+    SPILLED = 'spilled'
     TIME_SPENT = 'processing_time'
     TIME_WAITED = 'idle_time'
 
@@ -70,8 +78,25 @@ class Process(multiprocessing.Process, state.State):
     RABBITMQ_EXCEPTION = 'rabbitmq_exception'
     UNHANDLED_EXCEPTION = 'unhandled_exception'
 
+    ENVELOPE_MESSAGES = 'envelope_messages'
+    ENVELOPE_COUNTERS = {
+        data.MESSAGE_DROP: DROPPED,
+        data.MESSAGE_EXCEPTION: MESSAGE_EXCEPTION,
+        data.PROCESSING_EXCEPTION: PROCESSING_EXCEPTION
+    }
+    ENVELOPE_ERRORS = {
+        data.CONSUMER_EXCEPTION: CONSUMER_EXCEPTION,
+        data.UNHANDLED_EXCEPTION: UNHANDLED_EXCEPTION
+    }
+
+    ACK_BATCH_SIZE = 1
+    ACK_BATCH_TIMEOUT = 100
+    DISPATCH_BATCH_SIZE = 100
+    DISPATCH_INTERVAL = 10
     QOS_PREFETCH_COUNT = 1
+    MAX_CONCURRENCY = 1
     MAX_ERROR_COUNT = 5
+    NULL_MEASUREMENT = data.NullMeasurement()
     MAX_ERROR_WINDOW = 60
     MAX_SHUTDOWN_WAIT = 5
 
@@ -84,7 +109,10 @@ class Process(multiprocessing.Process, state.State):
         if kwargs is None:  # pragma: nocover
             kwargs = {}
         super(Process, self).__init__(group, target, name, args, kwargs)
-        self.active_message = None
+        self.active_batches = 0
+        self.active_messages = {}
+        self.batch_deadline = None
+        self.batch_timer = None
         self.callbacks = connection.Callbacks(
             self.on_connection_ready,
             self.on_connection_failure,
@@ -98,17 +126,25 @@ class Process(multiprocessing.Process, state.State):
         self.consumer_lock = None
         self.consumer_version = None
         self.counters = collections.Counter()
+        self.draining = False
 
-        self.delivery_time = None
         self.influxdb = None
         self.ioloop = None
         self.last_failure = 0
         self.last_stats_time = None
-        self.measurement = None
+        self.max_concurrency = self.MAX_CONCURRENCY
+        self.max_pending_bytes = 0
+        self.max_pending_messages = 0
+        self.measurements = data.MeasurementPool()
         self.message_connection_id = None
+        self.message_processed = None
         self.pending = collections.deque()
+        self.pending_bytes = 0
+        self.consuming_paused = False
         self.prepend_path = None
         self.previous = None
+        self.qos_controller = None
+        self.qos_timer = None
         self.sentry_client = None
         self.state = self.STATE_INITIALIZING
         self.state_start = time.time()
@@ -117,20 +153,35 @@ class Process(multiprocessing.Process, state.State):
         # Override ACTIVE with PROCESSING
         self.STATES[0x04] = 'Processing'
 
-    def ack_message(self, message):
+    def ack_message(self, message, measurement):
         """Acknowledge the message on the broker and log the ack
 
         :param message: The message to acknowledge
         :type message: rejected.data.Message
+        :param measurement: The measurement for the message
+        :type measurement: rejected.data.Measurement
 
         """
         if message.channel.is_closed:
             LOGGER.warning('Can not ack message, channel is closed')
             self.counters[self.CLOSED_ON_COMPLETE] += 1
             return
-        message.channel.basic_ack(delivery_tag=message.delivery_tag)
+        self.connections[message.connection].ack(message.delivery_tag)
         self.counters[self.ACKED] += 1
-        self.measurement.set_tag(self.ACKED, True)
+        measurement.set_tag(self.ACKED, True)
+
+    def append_pending(self, message):
+        """Add a message to the pending message buffer, pausing consuming if
+        the buffer has reached ``max_pending_messages`` or
+        ``max_pending_bytes``.
+
+        :param rejected.data.Message message: The message to buffer
+
+        """
+        self.pending.append(message)
+        self.pending_bytes += len(message.body or b'')
+        if not self.consuming_paused and self.is_pending_full:
+            self.pause_consuming()
 
     def create_connections(self):
         """Create and start the RabbitMQ connections, assigning the connection
@@ -139,11 +190,14 @@ class Process(multiprocessing.Process, state.State):
         """
         self.set_state(self.STATE_CONNECTING)
         for conn in self.consumer_config.get('connections', []):
-            name, confirm, consume = conn, False, True
+            name, confirm, consume, window, channels = \
+                conn, False, True, 0, 0
             if isinstance(conn, dict):
                 name = conn['name']
                 confirm = conn.get('publisher_confirmation', False)
                 consume = conn.get('consume', True)
+                window = int(conn.get('publish_window', 0))
+                channels = int(conn.get('publishing_channels', 0))
 
             if name not in self.config['Connections']:
                 LOGGER.critical('Connection "%s" for %s not found',
@@ -152,7 +206,39 @@ class Process(multiprocessing.Process, state.State):
 
             self.connections[name] = connection.Connection(
                 name, self.config['Connections'][name], self.consumer_name,
-                consume, confirm, self.ioloop, self.callbacks)
+                consume, confirm, self.ioloop, self.callbacks,
+                self.ack_batch_size, self.ack_batch_timeout, window,
+                channels)
+
+    @gen.coroutine
+    def drain_pending(self):
+        """Dispatch the pending messages to the consumer in a loop, processing
+        up to ``max_concurrency`` messages at a time. Messages that are
+        processed without blocking are dispatched back to back, yielding to
+        the IOLoop every
+        :const:`~rejected.process.Process.DISPATCH_BATCH_SIZE` messages or
+        :const:`~rejected.process.Process.DISPATCH_INTERVAL` milliseconds so
+        that heartbeats, deliveries and confirmations are still serviced.
+
+        """
+        self.draining = True
+        dispatched = 0
+        deadline = self.ioloop.time() + self.DISPATCH_INTERVAL / 1000.0
+        try:
+            while self.pending:
+                if self.is_saturated:
+                    yield self.message_processed.wait()
+                elif (dispatched >= self.DISPATCH_BATCH_SIZE or
+                      self.ioloop.time() >= deadline):
+                    yield gen.moment
+                else:
+                    self.invoke_consumer(self.pop_pending())
+                    dispatched += 1
+                    continue
+                dispatched = 0
+                deadline = self.ioloop.time() + self.DISPATCH_INTERVAL / 1000.0
+        finally:
+            self.draining = False
 
     @staticmethod
     def get_config(cfg, number, name, connection_name):
@@ -202,7 +288,15 @@ class Process(multiprocessing.Process, state.State):
             'drop_invalid_messages': cfg.get('drop_invalid_messages'),
             'message_type': cfg.get('message_type'),
             'error_exchange': cfg.get('error_exchange'),
-            'error_max_retry': cfg.get('error_max_retry')
+            'error_max_retry': cfg.get('error_max_retry'),
+            'batch_size': cfg.get('batch_size'),
+            'batch_timeout': cfg.get('batch_timeout'),
+            'max_workers': cfg.get('max_workers'),
+            'compression': cfg.get('compression'),
+            'offload': cfg.get('offload'),
+            'max_decompressed_size': cfg.get('max_decompressed_size'),
+            'schemas': cfg.get('schemas'),
+            'envelope': cfg.get('envelope')
         }
 
         try:
@@ -211,6 +305,59 @@ class Process(multiprocessing.Process, state.State):
             LOGGER.exception('Error creating the consumer "%s": %s',
                              cfg['consumer'], error)
 
+    def handle_result(self, message, result, measurement):
+        """Acknowledge or reject the message based upon the result of
+        processing it, returning a bool specifying if the result is a
+        processing error.
+
+        :param rejected.data.Message message: The message that was processed
+        :param int result: The result of the processing of the message
+        :param rejected.data.Measurement measurement: The message measurement
+        :rtype: bool
+
+        """
+        if result == data.MESSAGE_DROP:
+            LOGGER.debug('Rejecting message due to drop return from consumer')
+            self.reject(message, False, measurement)
+            self.counters[self.DROPPED] += 1
+
+        elif result == data.MESSAGE_EXCEPTION:
+            LOGGER.debug('Rejecting message due to MessageException')
+            self.reject(message, False, measurement)
+            self.counters[self.MESSAGE_EXCEPTION] += 1
+
+        elif result == data.PROCESSING_EXCEPTION:
+            LOGGER.debug('Rejecting message due to ProcessingException')
+            self.reject(message, False, measurement)
+            self.counters[self.PROCESSING_EXCEPTION] += 1
+
+        elif result == data.CONSUMER_EXCEPTION:
+            LOGGER.debug('Re-queueing message due to ConsumerException')
+            self.reject(message, True, measurement)
+            self.counters[self.CONSUMER_EXCEPTION] += 1
+            return True
+
+        elif result == data.RABBITMQ_EXCEPTION:
+            LOGGER.debug('Processing interrupted due to RabbitMQException')
+            self.counters[self.RABBITMQ_EXCEPTION] += 1
+            return True
+
+        elif result == data.UNHANDLED_EXCEPTION:
+            LOGGER.debug('Re-queueing message due to UnhandledException')
+            self.reject(message, True, measurement)
+            self.counters[self.UNHANDLED_EXCEPTION] += 1
+            return True
+
+        elif result == data.MESSAGE_REQUEUE:
+            LOGGER.debug('Re-queueing message due Consumer request')
+            self.reject(message, True, measurement)
+            self.counters[self.REQUEUED] += 1
+
+        elif result == data.MESSAGE_ACK and not self.no_ack:
+            self.ack_message(message, measurement)
+
+        return False
+
     @gen.engine
     def invoke_consumer(self, message):
         """Wrap the actual processor processing bits
@@ -218,57 +365,239 @@ class Process(multiprocessing.Process, state.State):
         :param rejected.data.Message message: The message to process
 
         """
-        # Only allow for a single message to be processed at a time
-        with (yield self.consumer_lock.acquire()):
-            if self.is_idle:
-                if message.channel.is_closed:
-                    LOGGER.warning('Channel %s is closed on '
-                                   'connection "%s", discarding '
-                                   'local copy of message %s',
-                                   message.channel.channel_number,
-                                   message.connection,
-                                   utils.message_info(message.exchange,
-                                                      message.routing_key,
-                                                      message.properties))
-                    self.counters[self.CLOSED_ON_START] += 1
-                    self.maybe_get_next_message()
-                    return
-
+        # Callers only invoke the consumer when not saturated, so the message
+        # is added to active_messages before the first yield
+        if self.is_idle or self.state == self.STATE_PROCESSING:
+            if self.is_channel_closed(message):
+                return
+
+            if not self.is_processing:
+                self.on_idle_wait()
                 self.set_state(self.STATE_PROCESSING)
-                self.delivery_time = start_time = time.time()
-                self.active_message = message
-
-                self.measurement = data.Measurement()
-
-                if message.method.redelivered:
-                    self.counters[self.REDELIVERED] += 1
-                    self.measurement.set_tag(self.REDELIVERED, True)
-
-                try:
-                    result = yield self.consumer.execute(message,
-                                                         self.measurement)
-                except Exception as error:
-                    LOGGER.exception('Unhandled exception from consumer in '
-                                     'process. This should not happen. %s',
-                                     error)
-                    result = data.MESSAGE_REQUEUE
-
-                LOGGER.debug('Finished processing message: %r', result)
-                self.on_processed(message, result, start_time)
-            elif self.is_waiting_to_shutdown:
-                LOGGER.info(
-                    'Requeueing pending message due to pending shutdown')
-                self.reject(message, True)
+            start_time = time.time()
+            self.active_messages[message] = start_time
+
+            measurement = self.new_measurement()
+            measurement.set_value(self.PENDING_BYTES, self.pending_bytes)
+            measurement.set_value(self.PENDING_MESSAGES, len(self.pending))
+
+            if message.method.redelivered:
+                self.counters[self.REDELIVERED] += 1
+                measurement.set_tag(self.REDELIVERED, True)
+
+            try:
+                if envelope.is_envelope(message):
+                    result = yield self.invoke_envelope(message, measurement)
+                else:
+                    result = yield self.consumer.execute(message, measurement)
+            except Exception as error:
+                LOGGER.exception('Unhandled exception from consumer in '
+                                 'process. This should not happen. %s',
+                                 error)
+                result = data.MESSAGE_REQUEUE
+
+            LOGGER.debug('Finished processing message: %r', result)
+            self.on_processed(message, result, start_time, measurement)
+            if self.message_processed:
+                self.message_processed.notify()
+        elif self.is_waiting_to_shutdown:
+            LOGGER.info(
+                'Requeueing pending message due to pending shutdown')
+            self.reject(message, True)
+            if not self.active_messages:
                 self.shutdown_connections()
-            elif self.is_shutting_down:
-                LOGGER.info('Requeueing pending message due to shutdown')
-                self.reject(message, True)
+        elif self.is_shutting_down:
+            LOGGER.info('Requeueing pending message due to shutdown')
+            self.reject(message, True)
+            if not self.active_messages:
                 self.on_ready_to_stop()
+        else:
+            LOGGER.warning('Exiting invoke_consumer without processing, '
+                           'this should not happen. State: %s',
+                           self.state_description)
+
+    @gen.coroutine
+    def invoke_envelope(self, message, measurement):
+        """Invoke the consumer with each of the messages in an envelope,
+        returning the result that the envelope is acknowledged or rejected
+        with. Each message is processed with its own measurement.
+
+        Messages that are dropped or that raise a message or processing
+        exception are handled by the consumer and counted, and the envelope
+        is acknowledged once every message is processed. If the consumer
+        requests that a message is requeued or raises a consumer exception
+        for it, the remaining messages are republished to the queue in a new
+        envelope and the envelope is acknowledged, unless no messages were
+        processed. A message that raised a consumer exception is published
+        to the error exchange instead of being republished to the queue.
+
+        :param rejected.data.Message message: The envelope to process
+        :param rejected.data.Measurement measurement: The message measurement
+        :rtype: int
+
+        """
+        try:
+            messages = envelope.unpack(message)
+        except ValueError as error:
+            LOGGER.warning('Rejecting message %s: %s',
+                           message.properties.message_id, error)
+            raise gen.Return(data.MESSAGE_EXCEPTION)
+
+        measurement.set_value(self.ENVELOPE_MESSAGES, len(messages))
+        for offset, inner in enumerate(messages):
+            inner_measurement = self.new_measurement()
+            result = yield self.consumer.execute(inner, inner_measurement)
+            inner_measurement.set_tag(self.PROCESSED, True)
+            self.maybe_submit_measurement(inner_measurement)
+            if result in self.ENVELOPE_COUNTERS:
+                self.counters[self.ENVELOPE_COUNTERS[result]] += 1
+            elif result == data.RABBITMQ_EXCEPTION or \
+                    (result != data.MESSAGE_ACK and not offset):
+                raise gen.Return(result)
+            elif result == data.MESSAGE_REQUEUE:
+                self.counters[self.REQUEUED] += 1
+                self.republish_envelope(message, messages[offset:])
+                break
+            elif result != data.MESSAGE_ACK:
+                self.counters[self.ENVELOPE_ERRORS[result]] += 1
+                self.consumer.republish_error(
+                    inner, self.ENVELOPE_ERRORS[result])
+                self.on_processing_error()
+                self.republish_envelope(message, messages[offset + 1:])
+                break
+        raise gen.Return(data.MESSAGE_ACK)
+
+    @gen.engine
+    def invoke_batch(self):
+        """Invoke the batch consumer with up to ``batch_size`` of the pending
+        messages.
+
+        """
+        self.active_batches += 1
+        if self.batch_timer:
+            self.ioloop.remove_timeout(self.batch_timer)
+            self.batch_timer = None
+
+        messages = []
+        while self.pending and len(messages) < self.consumer.batch_size:
+            messages.append(self.pop_pending())
+        if self.pending:
+            self.batch_deadline = self.ioloop.time() + (
+                self.consumer.batch_timeout / 1000.0)
+
+        with (yield self.consumer_lock.acquire()):
+            if self.is_idle or self.state == self.STATE_PROCESSING:
+                messages = [m for m in messages
+                            if not self.is_channel_closed(m)]
+                if messages:
+                    if not self.is_processing:
+                        self.on_idle_wait()
+                        self.set_state(self.STATE_PROCESSING)
+                    start_time = time.time()
+                    for message in messages:
+                        self.active_messages[message] = start_time
+
+                    measurement = self.new_measurement()
+                    measurement.set_value(
+                        self.PENDING_BYTES, self.pending_bytes)
+                    measurement.set_value(
+                        self.PENDING_MESSAGES, len(self.pending))
+                    redelivered = len([m for m in messages
+                                       if m.method.redelivered])
+                    if redelivered:
+                        self.counters[self.REDELIVERED] += redelivered
+                        measurement.set_tag(self.REDELIVERED, redelivered)
+
+                    try:
+                        results = yield self.consumer.execute_batch(
+                            messages, measurement)
+                    except Exception as error:
+                        LOGGER.exception('Unhandled exception from consumer '
+                                         'in process. This should not '
+                                         'happen. %s', error)
+                        results = [data.MESSAGE_REQUEUE] * len(messages)
+
+                    LOGGER.debug('Finished processing batch of %i messages',
+                                 len(messages))
+                    self.on_batch_processed(
+                        messages, results, start_time, measurement)
+            elif self.is_waiting_to_shutdown:
+                LOGGER.info('Requeueing pending batch due to pending shutdown')
+                for message in messages:
+                    self.reject(message, True)
+                if not self.active_messages:
+                    self.shutdown_connections()
+            elif self.is_shutting_down:
+                LOGGER.info('Requeueing pending batch due to shutdown')
+                for message in messages:
+                    self.reject(message, True)
+                if not self.active_messages:
+                    self.on_ready_to_stop()
             else:
-                LOGGER.warning('Exiting invoke_consumer without processing, '
+                LOGGER.warning('Exiting invoke_batch without processing, '
                                'this should not happen. State: %s',
                                self.state_description)
-            self.maybe_get_next_message()
+        self.active_batches -= 1
+        self.maybe_invoke_batch()
+
+    @property
+    def is_batch_consumer(self):
+        """Returns a bool specifying if the consumer processes messages in
+        batches.
+
+        :rtype: bool
+
+        """
+        return isinstance(self.consumer, consumer.BatchConsumer)
+
+    def is_channel_closed(self, message):
+        """Returns a bool specifying if the channel the message was delivered
+        on is closed, in which case the local copy of the message is
+        discarded.
+
+        :param rejected.data.Message message: The message to check
+        :rtype: bool
+
+        """
+        if not message.channel.is_closed:
+            return False
+        LOGGER.warning('Channel %s is closed on connection "%s", discarding '
+                       'local copy of message %s',
+                       message.channel.channel_number, message.connection,
+                       utils.message_info(message.exchange,
+                                          message.routing_key,
+                                          message.properties))
+        self.counters[self.CLOSED_ON_START] += 1
+        return True
+
+    @property
+    def is_pending_full(self):
+        """Returns a bool specifying if the pending message buffer has reached
+        the configured message or byte limit.
+
+        :rtype: bool
+
+        """
+        return bool(
+            (self.max_pending_messages and
+             len(self.pending) >= self.max_pending_messages) or
+            (self.max_pending_bytes and
+             self.pending_bytes >= self.max_pending_bytes))
+
+    @property
+    def is_pending_drained(self):
+        """Returns a bool specifying if the pending message buffer has drained
+        below half of the configured limits, at which point consuming is
+        resumed.
+
+        :rtype: bool
+
+        """
+        return not (
+            (self.max_pending_messages and
+             len(self.pending) * 2 >= self.max_pending_messages) or
+            (self.max_pending_bytes and
+             self.pending_bytes * 2 >= self.max_pending_bytes))
 
     @property
     def is_processing(self):
@@ -279,26 +608,112 @@ class Process(multiprocessing.Process, state.State):
         """
         return self.state in [self.STATE_PROCESSING, self.STATE_STOP_REQUESTED]
 
-    def maybe_get_next_message(self):
-        """Pop the next message on the stack, adding a callback on the IOLoop
-        to invoke the consumer with the message. This is done so we let the
-        IOLoop perform any pending callbacks before trying to process the
-        next message.
+    @property
+    def is_saturated(self):
+        """Returns a bool specifying if the process is processing as many
+        messages as it is allowed to concurrently.
+
+        :rtype: bool
 
         """
-        if self.pending:
-            self.ioloop.add_callback(
-                self.invoke_consumer, self.pending.popleft())
+        return len(self.active_messages) >= self.max_concurrency
 
-    def maybe_submit_measurement(self):
+    def maybe_drain_pending(self):
+        """Start the dispatch loop for the pending messages if it is not
+        already running.
+
+        """
+        if self.pending and not self.draining:
+            self.drain_pending()
+
+    def maybe_invoke_batch(self):
+        """Invoke the batch consumer if a full batch of messages is pending
+        or the batch timeout has been reached, otherwise ensure the batch
+        timeout is scheduled.
+
+        """
+        if not self.pending or not (self.is_idle or
+                                    self.state == self.STATE_PROCESSING):
+            return
+        elif self.active_batches >= self.max_concurrency:
+            LOGGER.debug('Batch pending with %i batch(es) processing',
+                         self.active_batches)
+        elif (len(self.pending) >= self.consumer.batch_size or
+              self.ioloop.time() >= self.batch_deadline):
+            self.invoke_batch()
+        elif not self.batch_timer:
+            self.batch_timer = self.ioloop.call_at(
+                self.batch_deadline, self.on_batch_timeout)
+
+    def maybe_submit_measurement(self, measurement):
         """Check for configured instrumentation backends and if found, submit
-        the message measurement info.
+        the message measurement info, returning the measurement to the pool
+        afterwards.
+
+        :param rejected.data.Measurement measurement: The measurement to submit
 
         """
         if self.statsd:
-            self.submit_statsd_measurements()
+            self.submit_statsd_measurements(measurement)
         if self.influxdb:
-            self.submit_influxdb_measurement()
+            self.submit_influxdb_measurement(measurement)
+        self.measurements.put(measurement)
+
+    def new_measurement(self):
+        """Return a measurement for processing a message from the pool, or a
+        :class:`~rejected.data.NullMeasurement` that discards what is recorded
+        in it if there are no statsd or InfluxDB backends configured.
+
+        :rtype: rejected.data.Measurement
+
+        """
+        if not self.statsd and not self.influxdb:
+            return self.NULL_MEASUREMENT
+        return self.measurements.get()
+
+    def on_batch_processed(self, messages, results, start_time,
+                           measurement):
+        """Invoked after a batch of messages is processed by the consumer,
+        applying the result for each message in the batch.
+
+        :param list messages: The messages that were processed
+        :param list results: The result for each message that was processed
+        :param float start_time: When the batch processing started
+        :param rejected.data.Measurement measurement: The batch measurement
+
+        """
+        duration = max(start_time, time.time()) - start_time
+        self.counters[self.TIME_SPENT] += duration
+        measurement.add_duration(self.TIME_SPENT, duration)
+
+        if self.qos_controller:
+            self.qos_controller.on_processed(
+                duration, len(messages),
+                len([m for m in messages if m.method.redelivered]),
+                len(self.pending))
+
+        errored = False
+        for message, result in zip(messages, results):
+            errored = self.handle_result(message, result, measurement) or \
+                errored
+            self.counters[self.PROCESSED] += 1
+
+        # A failed batch only counts as a single processing error
+        if errored:
+            self.on_processing_error()
+
+        measurement.set_tag(self.PROCESSED, True)
+        self.maybe_submit_measurement(measurement)
+        for message in messages:
+            self.reset_state(message)
+
+    def on_batch_timeout(self):
+        """Invoked when the batch timeout is reached, processing the pending
+        messages as a partial batch.
+
+        """
+        self.batch_timer = None
+        self.maybe_invoke_batch()
 
     def on_connection_closed(self, name):
         if self.is_running:
@@ -324,7 +739,10 @@ class Process(multiprocessing.Process, state.State):
             for key in self.connections.keys():
                 if self.connections[key].should_consume:
                     self.connections[key].consume(
-                        self.queue_name, self.no_ack, self.qos_prefetch)
+                        self.queue_name, self.no_ack, self.prefetch_count,
+                        self.qos_controller is not None)
+                    if self.consuming_paused:
+                        self.connections[key].pause()
             if self.is_connecting:
                 self.set_state(self.STATE_IDLE)
 
@@ -357,11 +775,20 @@ class Process(multiprocessing.Process, state.State):
 
         """
         message = data.Message(name, channel, method, properties, body)
-        if self.is_processing:
-            return self.pending.append(message)
+        if self.spill_size and len(body) >= self.spill_size:
+            self.spill(message)
+        if self.is_batch_consumer:
+            if not self.pending:
+                self.batch_deadline = self.ioloop.time() + (
+                    self.consumer.batch_timeout / 1000.0)
+            self.append_pending(message)
+            return self.maybe_invoke_batch()
+        if self.pending or self.is_saturated:
+            self.append_pending(message)
+            return self.maybe_drain_pending()
         self.invoke_consumer(message)
 
-    def on_processed(self, message, result, start_time):
+    def on_processed(self, message, result, start_time, measurement):
         """Invoked after a message is processed by the consumer and
         implements the logic for how to deal with a message based upon
         the result.
@@ -369,56 +796,36 @@ class Process(multiprocessing.Process, state.State):
         :param rejected.data.Message message: The message that was processed
         :param int result: The result of the processing of the message
         :param float start_time: When the message was received
+        :param rejected.data.Measurement measurement: The message measurement
 
         """
         duration = max(start_time, time.time()) - start_time
         self.counters[self.TIME_SPENT] += duration
-        self.measurement.add_duration(self.TIME_SPENT, duration)
-
-        if result == data.MESSAGE_DROP:
-            LOGGER.debug('Rejecting message due to drop return from consumer')
-            self.reject(message, False)
-            self.counters[self.DROPPED] += 1
-
-        elif result == data.MESSAGE_EXCEPTION:
-            LOGGER.debug('Rejecting message due to MessageException')
-            self.reject(message, False)
-            self.counters[self.MESSAGE_EXCEPTION] += 1
-
-        elif result == data.PROCESSING_EXCEPTION:
-            LOGGER.debug('Rejecting message due to ProcessingException')
-            self.reject(message, False)
-            self.counters[self.PROCESSING_EXCEPTION] += 1
+        measurement.add_duration(self.TIME_SPENT, duration)
+        if self.qos_controller:
+            self.qos_controller.on_processed(
+                duration, 1, int(bool(message.method.redelivered)),
+                len(self.pending))
 
-        elif result == data.CONSUMER_EXCEPTION:
-            LOGGER.debug('Re-queueing message due to ConsumerException')
-            self.reject(message, True)
+        if self.handle_result(message, result, measurement):
             self.on_processing_error()
-            self.counters[self.CONSUMER_EXCEPTION] += 1
-
-        elif result == data.RABBITMQ_EXCEPTION:
-            LOGGER.debug('Processing interrupted due to RabbitMQException')
-            self.on_processing_error()
-            self.counters[self.RABBITMQ_EXCEPTION] += 1
 
-        elif result == data.UNHANDLED_EXCEPTION:
-            LOGGER.debug('Re-queueing message due to UnhandledException')
-            self.reject(message, True)
-            self.on_processing_error()
-            self.counters[self.UNHANDLED_EXCEPTION] += 1
-
-        elif result == data.MESSAGE_REQUEUE:
-            LOGGER.debug('Re-queueing message due Consumer request')
-            self.reject(message, True)
-            self.counters[self.REQUEUED] += 1
+        self.counters[self.PROCESSED] += 1
+        measurement.set_tag(self.PROCESSED, True)
+        self.maybe_submit_measurement(measurement)
+        self.reset_state(message)
 
-        elif result == data.MESSAGE_ACK and not self.no_ack:
-            self.ack_message(message)
+    def on_idle_wait(self):
+        """Invoked when the process is going from idle to processing,
+        recording the amount of time spent waiting for a message.
 
-        self.counters[self.PROCESSED] += 1
-        self.measurement.set_tag(self.PROCESSED, True)
-        self.maybe_submit_measurement()
-        self.reset_state()
+        """
+        if not self.is_idle:
+            return
+        duration = max(self.state_start, time.time()) - self.state_start
+        self.counters[self.TIME_WAITED] += duration
+        if self.qos_controller:
+            self.qos_controller.on_idle_wait(duration)
 
     def on_processing_error(self):
         """Called when message processing failure happens due to a
@@ -437,6 +844,23 @@ class Process(multiprocessing.Process, state.State):
                             self.counters[self.ERROR])
             self.shutdown_connections()
 
+    def on_qos_interval(self):
+        """Invoked periodically when adaptive QoS is enabled to apply the
+        prefetch count calculated by the QoS controller to the consuming
+        connections. The prefetch count is also applied to connections that
+        have paused consuming, so it is in effect when consuming resumes.
+
+        """
+        prefetch_count = self.qos_controller.update()
+        if prefetch_count is None:
+            return
+        LOGGER.info('Adjusting QoS prefetch count to %i', prefetch_count)
+        for conn in self.connections.values():
+            if conn.should_consume and (conn.is_active or conn.paused):
+                conn.set_qos(prefetch_count)
+        if self.statsd:
+            self.statsd.set_gauge('qos_prefetch', prefetch_count)
+
     def on_ready_to_stop(self):
         """Invoked when the consumer is ready to stop."""
 
@@ -455,6 +879,10 @@ class Process(multiprocessing.Process, state.State):
 
         # Clear IOLoop constructs
         self.consumer_lock = None
+        self.message_processed = None
+        if self.qos_timer:
+            self.qos_timer.stop()
+            self.qos_timer = None
 
         # Stop the IOLoop
         if self.ioloop:
@@ -485,12 +913,39 @@ class Process(multiprocessing.Process, state.State):
         LOGGER.critical('Could not start %s: %s', self.consumer_name, error)
         self.set_state(self.STATE_STOPPED)
 
-    def reject(self, message, requeue=True):
+    def pause_consuming(self):
+        """Stop consuming on all of the consuming connections until the
+        pending message buffer has drained.
+
+        """
+        LOGGER.info('Pausing consuming with %i pending messages (%i bytes)',
+                    len(self.pending), self.pending_bytes)
+        self.consuming_paused = True
+        for conn in self.connections.values():
+            if conn.should_consume:
+                conn.pause()
+
+    def pop_pending(self):
+        """Remove and return the oldest message in the pending message buffer,
+        resuming consuming if it was paused and the buffer has drained.
+
+        :rtype: rejected.data.Message
+
+        """
+        message = self.pending.popleft()
+        self.pending_bytes -= len(message.body or b'')
+        if self.consuming_paused and self.is_pending_drained:
+            self.resume_consuming()
+        return message
+
+    def reject(self, message, requeue=True, measurement=None):
         """Reject the message on the broker and log it.
 
         :param message: The message to reject
         :type message: rejected.Data.message
         :param bool requeue: Specify if the message should be re-queued or not
+        :param measurement: The measurement for the message, if processed
+        :type measurement: rejected.data.Measurement
 
         """
         if self.no_ack:
@@ -503,10 +958,11 @@ class Process(multiprocessing.Process, state.State):
 
         LOGGER.warning('Rejecting message %s %s requeue', message.delivery_tag,
                        'with' if requeue else 'without')
-        message.channel.basic_nack(
-            delivery_tag=message.delivery_tag, requeue=requeue)
-        self.measurement.set_tag(self.NACKED, True)
-        self.measurement.set_tag(self.REQUEUED, requeue)
+        self.connections[message.connection].nack(
+            message.delivery_tag, requeue)
+        if measurement:
+            measurement.set_tag(self.NACKED, True)
+            measurement.set_tag(self.REQUEUED, requeue)
 
     def report_stats(self):
         """Create the dict of stats data for the MCP stats queue"""
@@ -523,18 +979,43 @@ class Process(multiprocessing.Process, state.State):
         self.previous = dict(self.counters)
         return values
 
+    def republish_envelope(self, message, messages):
+        """Republish the messages from an envelope that were not processed
+        in a new envelope, publishing it to the default exchange so that it
+        is only routed back to the queue the process consumes from.
+
+        :param rejected.data.Message message: The original envelope
+        :param list messages: The unprocessed messages in the envelope
+
+        """
+        if not messages:
+            return
+        LOGGER.debug('Republishing the %i unprocessed messages in the '
+                     'envelope to %s', len(messages), self.queue_name)
+        properties = dict(message.properties)
+        properties['message_id'] = str(uuid.uuid4())
+        self.connections[message.connection].publish(
+            '', self.queue_name, pika.BasicProperties(**properties),
+            envelope.pack((m.properties, m.body) for m in messages))
+
     def reset_error_counter(self):
         """Reset the error counter to 0"""
         LOGGER.debug('Resetting the error counter')
         self.counters[self.ERROR] = 0
 
-    def reset_state(self):
+    def reset_state(self, message):
         """Reset the runtime state after processing a message to either idle
-        or shutting down based upon the current state.
+        or shutting down based upon the current state. The state is only
+        changed once no other messages are being processed.
+
+        :param rejected.data.Message message: The message that was processed
 
         """
-        self.active_message = None
-        self.measurement = None
+        self.active_messages.pop(message, None)
+        if self.active_messages:
+            LOGGER.debug('%i message(s) still processing (%s in pending)',
+                         len(self.active_messages), len(self.pending))
+            return
         if self.is_waiting_to_shutdown:
             self.set_state(self.STATE_SHUTTING_DOWN)
             self.shutdown_connections()
@@ -547,6 +1028,15 @@ class Process(multiprocessing.Process, state.State):
         LOGGER.debug('State reset to %s (%s in pending)',
                      self.state_description, len(self.pending))
 
+    def resume_consuming(self):
+        """Resume consuming on all of the consuming connections."""
+        LOGGER.info('Resuming consuming with %i pending messages (%i bytes)',
+                    len(self.pending), self.pending_bytes)
+        self.consuming_paused = False
+        for conn in self.connections.values():
+            if conn.should_consume:
+                conn.resume()
+
     def run(self):
         """Start the consumer"""
         if self.profile_file:
@@ -561,8 +1051,8 @@ class Process(multiprocessing.Process, state.State):
     def _run(self):
         """Run method that can be profiled"""
         self.set_state(self.STATE_INITIALIZING)
-        self.ioloop = ioloop.IOLoop.current()
-        self.consumer_lock = locks.Lock()
+        self.ioloop = self.setup_ioloop()
+        self.message_processed = locks.Condition()
 
         self.sentry_client = self.setup_sentry(
             self._kwargs['config'], self.consumer_name)
@@ -580,26 +1070,28 @@ class Process(multiprocessing.Process, state.State):
             except KeyboardInterrupt:
                 LOGGER.warning('CTRL-C while waiting for clean shutdown')
 
-    def send_exception_to_sentry(self, exc_info):
+    def send_exception_to_sentry(self, exc_info, message=None):
         """Send an exception to Sentry if enabled.
 
         :param tuple exc_info: exception information as returned from
             :func:`sys.exc_info`
+        :param message: The message that was being processed
+        :type message: rejected.data.Message
 
         """
         if not self.sentry_client:
             LOGGER.debug('No sentry_client, aborting')
             return
 
-        message = dict(self.active_message)
         try:
-            duration = math.ceil(time.time() - self.delivery_time) * 1000
-        except TypeError:
+            duration = math.ceil(
+                time.time() - self.active_messages[message]) * 1000
+        except KeyError:
             duration = 0
         kwargs = {'extra': {
                       'consumer_name': self.consumer_name,
                       'env': dict(os.environ),
-                      'message': message},
+                      'message': dict(message or {})},
                   'time_spent': duration}
         LOGGER.debug('Sending exception to sentry: %r', kwargs)
         self.sentry_client.captureException(exc_info, **kwargs)
@@ -611,6 +1103,14 @@ class Process(multiprocessing.Process, state.State):
         """
         LOGGER.info('Initializing for %s', self.name)
 
+        self.max_concurrency = max(1, int(self.consumer_config.get(
+            'max_concurrency', self.MAX_CONCURRENCY)))
+        self.max_pending_bytes = int(
+            self.consumer_config.get('max_pending_bytes') or 0)
+        self.max_pending_messages = int(
+            self.consumer_config.get('max_pending_messages') or 0)
+        self.consumer_lock = locks.Semaphore(self.max_concurrency)
+
         if 'consumer' not in self.consumer_config:
             return self.on_startup_error(
                 '"consumer" not specified in configuration')
@@ -623,11 +1123,54 @@ class Process(multiprocessing.Process, state.State):
                     self.consumer_config.get(
                         'consumer', 'unconfigured consumer')))
 
+        if self.qos_prefetch < self.max_concurrency:
+            LOGGER.warning('qos_prefetch (%i) is lower than max_concurrency '
+                           '(%i), limiting concurrent processing',
+                           self.qos_prefetch, self.max_concurrency)
+
+        if self.ack_batch_size > self.qos_prefetch:
+            LOGGER.warning('ack_batch_size (%i) is greater than qos_prefetch '
+                           '(%i), acks will be delayed by ack_batch_timeout',
+                           self.ack_batch_size, self.qos_prefetch)
+
+        if (self.is_batch_consumer and
+                self.qos_prefetch < self.consumer.batch_size):
+            LOGGER.warning('qos_prefetch (%i) is lower than batch_size (%i), '
+                           'batches will be limited by the batch timeout',
+                           self.qos_prefetch, self.consumer.batch_size)
+
+        if (isinstance(self.consumer, (consumer.ProcessPoolConsumer,
+                                       consumer.ThreadPoolConsumer)) and
+                self.max_concurrency < self.consumer.max_workers):
+            LOGGER.warning('max_concurrency (%i) is lower than max_workers '
+                           '(%i), limiting the workers in use',
+                           self.max_concurrency, self.consumer.max_workers)
+
         self.setup_instrumentation()
+        self.setup_adaptive_qos()
         self.reset_error_counter()
         self.setup_sighandlers()
         self.create_connections()
 
+    def setup_adaptive_qos(self):
+        """Create the controller that adjusts the QoS prefetch count at
+        runtime if adaptive QoS is configured for the consumer.
+
+        """
+        config = self.consumer_config.get('adaptive_qos')
+        if not config or not config.get('enabled', True):
+            return
+        concurrency = self.max_concurrency
+        if self.is_batch_consumer:
+            concurrency *= self.consumer.batch_size
+        self.qos_controller = qos.Controller(
+            self.qos_prefetch, concurrency, config)
+        self.qos_timer = ioloop.PeriodicCallback(
+            self.on_qos_interval, self.qos_controller.interval * 1000)
+        self.qos_timer.start()
+        LOGGER.debug('Adaptive QoS configured between %i and %i',
+                     self.qos_controller.minimum, self.qos_controller.maximum)
+
     def setup_influxdb(self, config):
         """Configure the InfluxDB module for measurement submission.
 
@@ -657,6 +1200,33 @@ class Process(multiprocessing.Process, state.State):
             base_tags=base_tags)
         return config.get('database', 'rejected'), measurement
 
+    def setup_ioloop(self):
+        """Create the IOLoop for the process. When ``event_loop`` is set to
+        ``asyncio`` in the consumer configuration, the IOLoop runs on an
+        :mod:`asyncio` event loop, using :mod:`uvloop` if it is installed,
+        allowing consumers to use asyncio libraries in ``async def``
+        methods.
+
+        :rtype: tornado.ioloop.IOLoop
+
+        """
+        event_loop = self.consumer_config.get('event_loop', 'tornado')
+        if event_loop == 'asyncio':
+            if not tornado_asyncio:
+                LOGGER.warning('asyncio is not available, using the Tornado '
+                               'IOLoop')
+                return ioloop.IOLoop.current()
+            if uvloop:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            tornado_asyncio.AsyncIOMainLoop().install()
+            LOGGER.info('Running on the asyncio event loop%s',
+                        ' with uvloop' if uvloop else '')
+        elif event_loop != 'tornado':
+            LOGGER.warning('Unsupported event_loop %r, using the Tornado '
+                           'IOLoop', event_loop)
+        return ioloop.IOLoop.current()
+
     def setup_instrumentation(self):
         """Configure instrumentation for submission per message measurements
         to statsd and/or InfluxDB.
@@ -694,6 +1264,13 @@ class Process(multiprocessing.Process, state.State):
                                                          cfg.get('sentry_dsn'))
         if not raven or not sentry_dsn:
             return
+        try:
+            breadcrumbs = raven.breadcrumbs
+            sentry_client = raven.contrib.tornado.AsyncSentryClient
+        except ImportError as error:
+            LOGGER.warning('Sentry is disabled, raven could not be '
+                           'imported: %s', error)
+            return
         consumer = cfg['Consumers'][consumer_name]['consumer'].split('.')[0]
         kwargs = {
             'exclude_paths': [],
@@ -716,7 +1293,7 @@ class Process(multiprocessing.Process, state.State):
                        'rejected.process', 'rejected.state'}:
             breadcrumbs.ignore_logger(logger)
 
-        return AsyncSentryClient(sentry_dsn, **kwargs)
+        return sentry_client(sentry_dsn, **kwargs)
 
     def setup_sighandlers(self):
         """Setup the stats and stop signal handlers."""
@@ -734,10 +1311,28 @@ class Process(multiprocessing.Process, state.State):
         """This method closes the connections to RabbitMQ."""
         if not self.is_shutting_down:
             self.set_state(self.STATE_SHUTTING_DOWN)
+        if self.batch_timer:
+            self.ioloop.remove_timeout(self.batch_timer)
+            self.batch_timer = None
         for name in self.connections:
             if self.connections[name].is_running:
                 self.connections[name].shutdown()
 
+    def spill(self, message):
+        """Move the body of a large message to a memory-mapped temporary
+        file, keeping it on the heap if the file can not be written.
+
+        :param rejected.data.Message message: The message to spill
+
+        """
+        try:
+            message.spill(self.consumer_config.get('spill_directory'))
+        except (IOError, OSError) as error:
+            LOGGER.warning('Could not spill the body of message %s: %s',
+                           message.delivery_tag, error)
+            return
+        self.counters[self.SPILLED] += 1
+
     def stop(self, signum=None, _unused=None):
         """Stop the consumer from consuming by calling BasicCancel and setting
         our state.
@@ -779,43 +1374,51 @@ class Process(multiprocessing.Process, state.State):
         except AttributeError:
             LOGGER.debug('Consumer does not have a shutdown method')
 
-    def submit_influxdb_measurement(self):
-        """Submit a measurement for a message to InfluxDB"""
-        measurement = influxdb.Measurement(*self.influxdb)
-        measurement.set_timestamp(time.time())
-        for key, value in self.measurement.counters.items():
-            measurement.set_field(key, value)
-        for key, value in self.measurement.tags.items():
-            measurement.set_tag(key, value)
-        for key, value in self.measurement.values.items():
-            measurement.set_field(key, value)
-
-        for key, values in self.measurement.durations.items():
+    def submit_influxdb_measurement(self, measurement):
+        """Submit a measurement for a message to InfluxDB
+
+        :param rejected.data.Measurement measurement: The measurement to submit
+
+        """
+        point = influxdb.Measurement(*self.influxdb)
+        point.set_timestamp(time.time())
+        for key, value in measurement.counters.items():
+            point.set_field(key, value)
+        for key, value in measurement.tags.items():
+            point.set_tag(key, value)
+        for key, value in measurement.values.items():
+            point.set_field(key, value)
+
+        for key, values in measurement.durations.items():
             if len(values) == 1:
-                measurement.set_field(key, values[0])
+                point.set_field(key, values[0])
             elif len(values) > 1:
-                measurement.set_field('{}-average'.format(key),
-                                      sum(values) / len(values))
-                measurement.set_field('{}-max'.format(key), max(values))
-                measurement.set_field('{}-min'.format(key), min(values))
-                measurement.set_field('{}-median'.format(key),
-                                      utils.percentile(values, 50))
-                measurement.set_field('{}-95th'.format(key),
-                                      utils.percentile(values, 95))
-
-        influxdb.add_measurement(measurement)
-        LOGGER.debug('InfluxDB Measurement: %r', measurement.marshall())
-
-    def submit_statsd_measurements(self):
-        """Submit a measurement for a message to statsd as individual items."""
-        for key, value in self.measurement.counters.items():
+                point.set_field('{}-average'.format(key),
+                                sum(values) / len(values))
+                point.set_field('{}-max'.format(key), max(values))
+                point.set_field('{}-min'.format(key), min(values))
+                point.set_field('{}-median'.format(key),
+                                utils.percentile(values, 50))
+                point.set_field('{}-95th'.format(key),
+                                utils.percentile(values, 95))
+
+        influxdb.add_measurement(point)
+        LOGGER.debug('InfluxDB Measurement: %r', point.marshall())
+
+    def submit_statsd_measurements(self, measurement):
+        """Submit a measurement for a message to statsd as individual items.
+
+        :param rejected.data.Measurement measurement: The measurement to submit
+
+        """
+        for key, value in measurement.counters.items():
             self.statsd.incr(key, value)
-        for key, values in self.measurement.durations.items():
+        for key, values in measurement.durations.items():
             for value in values:
                 self.statsd.add_timing(key, value)
-        for key, value in self.measurement.values.items():
+        for key, value in measurement.values.items():
             self.statsd.set_gauge(key, value)
-        for key, value in self.measurement.tags.items():
+        for key, value in measurement.tags.items():
             if isinstance(value, bool):
                 if value:
                     self.statsd.incr(key)
@@ -828,6 +1431,28 @@ class Process(multiprocessing.Process, state.State):
                 LOGGER.warning('The %s value type of %s is unsupported',
                                key, type(value))
 
+    @property
+    def ack_batch_size(self):
+        """Return the maximum number of message acknowledgements to defer
+        before sending them to RabbitMQ.
+
+        :rtype: int
+
+        """
+        return max(1, int(self.consumer_config.get(
+            'ack_batch_size', self.ACK_BATCH_SIZE)))
+
+    @property
+    def ack_batch_timeout(self):
+        """Return the maximum duration in milliseconds to defer message
+        acknowledgements for.
+
+        :rtype: int
+
+        """
+        return int(self.consumer_config.get(
+            'ack_batch_timeout', self.ACK_BATCH_TIMEOUT))
+
     @property
     def active_consumers(self):
         return len([c for c in self.connections.values()
@@ -853,6 +1478,16 @@ class Process(multiprocessing.Process, state.State):
     def logging_config(self):
         return self._kwargs['logging_config']
 
+    @property
+    def spill_size(self):
+        """Return the size in bytes at which delivered message bodies are
+        moved to memory-mapped temporary files, or ``0`` if they are not.
+
+        :rtype: int
+
+        """
+        return int(self.consumer_config.get('spill_size') or 0)
+
     @property
     def max_error_count(self):
         return int(self.consumer_config.get('max_errors',
@@ -862,6 +1497,18 @@ class Process(multiprocessing.Process, state.State):
     def no_ack(self):
         return not self.consumer_config.get('ack', True)
 
+    @property
+    def prefetch_count(self):
+        """Return the current QoS prefetch value, which is adjusted at
+        runtime if adaptive QoS is enabled.
+
+        :rtype: int
+
+        """
+        if self.qos_controller:
+            return self.qos_controller.prefetch_count
+        return self.qos_prefetch
+
     @property
     def profile_file(self):
         """Return the full path to write the cProfile data
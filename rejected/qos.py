@@ -0,0 +1,143 @@
+"""
+Adaptive QoS
+============
+Controller that sizes the QoS prefetch count of a consumer process at runtime
+based upon the observed message processing behavior.
+
+"""
+import logging
+import math
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Controller(object):
+    """Calculates the QoS prefetch count for a consumer process using
+    Little's law: to keep ``concurrency`` messages processing, the number of
+    unacknowledged messages needs to cover the processing time ``W`` and the
+    round trip ``R`` it takes for RabbitMQ to deliver the next message after
+    one is acknowledged, giving a prefetch count of
+    ``concurrency * (1 + R / W)``.
+
+    The round trip is estimated from the time the process spends idle,
+    waiting on a message to be delivered, ignoring waits that are long
+    enough to be attributed to the queue being empty. The prefetch count is
+    reduced proportionally to the rate of redelivered messages, which
+    indicates messages are being held by processes that did not get to
+    process them, and is only lowered when the pending message buffer shows
+    the process is not waiting on messages. The result is kept between the
+    configured ``min`` and ``max`` values.
+
+    :param int prefetch_count: The initial prefetch count
+    :param int concurrency: The maximum number of messages processed at a
+        time
+    :param dict config: The ``adaptive_qos`` consumer configuration
+
+    """
+    INTERVAL = 5
+    MAXIMUM = 1000
+    MAX_ROUND_TRIP = 1.0
+    SMOOTHING = 0.2
+
+    def __init__(self, prefetch_count, concurrency, config):
+        self.concurrency = concurrency
+        self.interval = float(config.get('interval', self.INTERVAL))
+        self.maximum = int(config.get('max', self.MAXIMUM))
+        self.minimum = max(1, int(config.get('min', concurrency)))
+        self.prefetch_count = self._clamp(prefetch_count)
+        self.processing_time = None
+        self.round_trip = None
+        self._reset()
+
+    def on_idle_wait(self, duration):
+        """Record the amount of time the process waited for a message to be
+        delivered while idle. Waits longer than
+        :const:`~rejected.qos.Controller.MAX_ROUND_TRIP` are attributed to
+        the queue being empty and are ignored.
+
+        :param float duration: The time spent waiting in seconds
+
+        """
+        if duration > self.MAX_ROUND_TRIP:
+            return
+        self.waits += 1
+        self.round_trip = self._smooth(self.round_trip, duration)
+
+    def on_processed(self, duration, messages=1, redelivered=0, pending=0):
+        """Record the processing of one or more messages.
+
+        :param float duration: The time it took to process the messages
+        :param int messages: The number of messages processed
+        :param int redelivered: The number of redelivered messages
+        :param int pending: The depth of the pending message buffer
+
+        """
+        self.processed += messages
+        self.redelivered += redelivered
+        self.pending_depth += pending
+        self.samples += 1
+        self.processing_time = self._smooth(
+            self.processing_time, duration / float(messages))
+
+    def update(self):
+        """Calculate the prefetch count from the measurements collected since
+        the last update, returning the new value if it has changed.
+
+        :rtype: int or None
+
+        """
+        if not self.processed or not self.processing_time:
+            return None
+
+        target = self.concurrency * (
+            1 + (self.round_trip or 0) / self.processing_time)
+        target *= 1 - (self.redelivered / float(self.processed))
+        target = self._clamp(int(math.ceil(target)))
+
+        # Only shrink when the process did not wait on RabbitMQ and has a
+        # backlog of messages, stepping halfway to dampen oscillation
+        if target < self.prefetch_count:
+            pending = self.pending_depth / float(self.samples)
+            if self.waits or pending < self.concurrency:
+                target = self.prefetch_count
+            else:
+                target = self._clamp(int(math.ceil(
+                    (target + self.prefetch_count) / 2.0)))
+
+        self._reset()
+        if target == self.prefetch_count:
+            return None
+        LOGGER.debug('Adjusting QoS prefetch count from %i to %i '
+                     '(W=%.4f R=%.4f)', self.prefetch_count, target,
+                     self.processing_time, self.round_trip or 0)
+        self.prefetch_count = target
+        return target
+
+    def _clamp(self, value):
+        """Return the value constrained to the minimum and maximum.
+
+        :param int value: The value to constrain
+        :rtype: int
+
+        """
+        return max(self.minimum, min(self.maximum, value))
+
+    def _reset(self):
+        """Reset the per-interval measurements."""
+        self.pending_depth = 0
+        self.processed = 0
+        self.redelivered = 0
+        self.samples = 0
+        self.waits = 0
+
+    def _smooth(self, average, value):
+        """Return the exponentially weighted moving average for the value.
+
+        :param float average: The current average
+        :param float value: The new value
+        :rtype: float
+
+        """
+        if average is None:
+            return value
+        return average + self.SMOOTHING * (value - average)
@@ -0,0 +1,315 @@
+"""
+Schemas
+=======
+Compiled schemas that validate deserialized message bodies and convert them
+into typed objects in a single pass. :class:`~rejected.consumer.SmartConsumer`
+uses the schema registered for the AMQP ``type`` message property of a message
+to decode its body, raising a :exc:`~rejected.consumer.MessageException` when
+the body is not valid.
+
+Schemas are declared with fields, or loaded from a JSON Schema document that
+describes an object. Each schema is compiled once into a class that uses
+``__slots__`` for its fields and a decoder that validates and converts each
+field:
+
+.. code-block:: python
+
+    from rejected import schema
+
+    Address = schema.Schema('Address', {
+        'street': str,
+        'postal_code': schema.Field(str, required=False)})
+
+    User = schema.Schema('User', {
+        'id': int,
+        'name': str,
+        'addresses': [Address],
+        'status': schema.Field(str, choices=['active', 'disabled'])})
+
+    user = User.decode({'id': 1, 'name': 'Jane', 'addresses': [],
+                        'status': 'active'})
+
+Only the ``type``, ``properties``, ``required``, ``items``, ``enum`` and
+``default`` keywords of JSON Schema documents are compiled.
+
+"""
+import json
+
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    STRING_TYPES = (str,)
+
+JSON_SCHEMA_TYPES = {
+    'array': list,
+    'boolean': bool,
+    'integer': int,
+    'number': float,
+    'object': dict,
+    'string': str
+}
+
+_CACHE = {}
+
+
+class ValidationError(ValueError):
+    """Raised when a value does not match its schema"""
+    pass
+
+
+class Field(object):
+    """Describes a schema field. The type may be :class:`str`, :class:`int`,
+    :class:`float`, :class:`bool`, :class:`dict`, :class:`list`, a
+    :class:`Schema` or a list with a single type or :class:`Schema` for
+    lists of values of that type.
+
+    :param type_: The type of the field value
+    :param bool required: The field must be present in the message body
+    :param mixed default: The value of a field that is not present
+    :param list choices: The values that are valid for the field
+
+    """
+    __slots__ = ['choices', 'default', 'required', 'type']
+
+    def __init__(self, type_=None, required=True, default=None,
+                 choices=None):
+        self.choices = choices
+        self.default = default
+        self.required = required
+        self.type = type_
+
+
+class Record(object):
+    """Base class of the typed objects created by :class:`Schema` objects."""
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, kwargs.get(name))
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                all(getattr(self, name) == getattr(other, name)
+                    for name in self.__slots__))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name))
+            for name in self.__slots__))
+
+    def as_dict(self):
+        """Return the field values as a dict, converting nested objects.
+
+        :rtype: dict
+
+        """
+        return dict((name, _as_value(getattr(self, name)))
+                    for name in self.__slots__)
+
+
+class Schema(object):
+    """A compiled schema that validates a deserialized message body and
+    converts it into an instance of the class it creates for the fields.
+
+    :param str name: The name of the class created for the schema
+    :param dict fields: The fields by name, with a :class:`Field` or a type
+        as the value
+
+    """
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = dict((key, value if isinstance(value, Field)
+                            else Field(value))
+                           for key, value in fields.items())
+        self.cls = type(str(name), (Record,),
+                        {'__slots__': tuple(sorted(self.fields))})
+        self._decoders = tuple(
+            (key, _compile(field.type, '{}.{}'.format(name, key),
+                           field.choices),
+             field.required, field.default)
+            for key, field in sorted(self.fields.items()))
+
+    def __repr__(self):
+        return '<Schema {}>'.format(self.name)
+
+    def decode(self, value, path=None):
+        """Validate the value, returning it as an instance of the
+        schema's class.
+
+        :param dict value: The deserialized value to decode
+        :param str path: The path of the value used in error messages
+        :rtype: rejected.schema.Record
+        :raises: rejected.schema.ValidationError
+
+        """
+        if not isinstance(value, dict):
+            raise ValidationError('{} must be an object'.format(
+                path or self.name))
+        instance = self.cls.__new__(self.cls)
+        for name, decoder, required, default in self._decoders:
+            if name in value:
+                setattr(instance, name, decoder(value[name]))
+            elif required:
+                raise ValidationError('{}.{} is required'.format(
+                    path or self.name, name))
+            else:
+                setattr(instance, name, default)
+        return instance
+
+    @classmethod
+    def from_json_schema(cls, document, name=None):
+        """Compile a JSON Schema document that describes an object.
+
+        :param dict document: The JSON Schema document
+        :param str name: The name of the class created for the schema,
+            defaulting to the ``title`` of the document
+        :rtype: rejected.schema.Schema
+        :raises: ValueError
+
+        """
+        name = name or document.get('title') or 'Message'
+        if document.get('type', 'object') != 'object':
+            raise ValueError('{} must describe an object'.format(name))
+        required = set(document.get('required', []))
+        return cls(name, dict(
+            (key, _json_schema_field(
+                value, '{}_{}'.format(name, key), key in required))
+            for key, value in document.get('properties', {}).items()))
+
+
+def load(path):
+    """Load and compile the JSON Schema document in the file, caching the
+    compiled schema by path.
+
+    :param str path: The path to the JSON Schema file
+    :rtype: rejected.schema.Schema
+    :raises: IOError
+    :raises: ValueError
+
+    """
+    if path not in _CACHE:
+        with open(path) as handle:
+            _CACHE[path] = Schema.from_json_schema(json.load(handle))
+    return _CACHE[path]
+
+
+def _as_value(value):
+    """Return a field value with nested objects converted to dicts.
+
+    :param mixed value: The value to convert
+    :rtype: mixed
+
+    """
+    if isinstance(value, Record):
+        return value.as_dict()
+    elif isinstance(value, list):
+        return [_as_value(item) for item in value]
+    return value
+
+
+def _compile(type_, path, choices=None):
+    """Return the function that validates and converts a field value.
+
+    :param type_: The type of the field value
+    :param str path: The path of the field used in error messages
+    :param list choices: The values that are valid for the field
+    :rtype: callable
+
+    """
+    decoder = _compile_type(type_, path)
+    if not choices:
+        return decoder
+    try:
+        choices = frozenset(choices)
+    except TypeError:
+        pass
+
+    def decode(value):
+        value = decoder(value)
+        if value not in choices:
+            raise ValidationError('{} must be one of {}'.format(
+                path, ', '.join(sorted(repr(c) for c in choices))))
+        return value
+
+    return decode
+
+
+def _compile_type(type_, path):
+    """Return the function that validates a value of the type.
+
+    :param type_: The type of the value
+    :param str path: The path of the value used in error messages
+    :rtype: callable
+
+    """
+    if type_ is None:
+        return lambda value: value
+    elif isinstance(type_, Schema):
+        return lambda value: type_.decode(value, path)
+    elif isinstance(type_, list):
+        item = _compile_type(type_[0] if type_ else None, path + '[]')
+
+        def decode_list(value):
+            if not isinstance(value, list):
+                raise ValidationError('{} must be a list'.format(path))
+            return [item(entry) for entry in value]
+
+        return decode_list
+    elif type_ is float:
+
+        def decode_float(value):
+            if isinstance(value, bool) or \
+                    not isinstance(value, (int, float)):
+                raise ValidationError('{} must be a number'.format(path))
+            return float(value)
+
+        return decode_float
+
+    expected = STRING_TYPES if type_ is str else type_
+
+    def decode(value):
+        if not isinstance(value, expected) or \
+                (isinstance(value, bool) and type_ is not bool):
+            raise ValidationError('{} must be of type {}'.format(
+                path, type_.__name__))
+        return value
+
+    return decode
+
+
+def _json_schema_field(document, name, required):
+    """Return the :class:`Field` for a JSON Schema property.
+
+    :param dict document: The JSON Schema of the property
+    :param str name: The class name used for nested objects
+    :param bool required: The property is required
+    :rtype: rejected.schema.Field
+
+    """
+    return Field(_json_schema_type(document, name), required,
+                 document.get('default'), document.get('enum'))
+
+
+def _json_schema_type(document, name):
+    """Return the field type for a JSON Schema property.
+
+    :param dict document: The JSON Schema of the property
+    :param str name: The class name used for nested objects
+    :rtype: mixed
+    :raises: ValueError
+
+    """
+    value = document.get('type')
+    if value is None:
+        return None
+    elif (not isinstance(value, STRING_TYPES) or
+          value not in JSON_SCHEMA_TYPES):
+        raise ValueError('Unsupported JSON Schema type: {}'.format(value))
+    elif value == 'object' and 'properties' in document:
+        return Schema.from_json_schema(document, name)
+    elif value == 'array' and 'items' in document:
+        return [_json_schema_type(document['items'], name)]
+    return JSON_SCHEMA_TYPES[value]
@@ -0,0 +1,133 @@
+"""
+Reports the time spent importing the modules that a consumer process imports
+when it starts, so that slow imports can be found and deferred. The modules
+are imported in a new interpreter by ``rejected --startup-profile``, which
+runs this file as a script so that none of them, including the rejected
+package, have been imported beforehand.
+
+"""
+import argparse
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:  # pragma: nocover
+    import __builtin__ as builtins
+
+DEFAULT_LIMIT = 30
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def profile(modules):
+    """Import the modules, returning the time in seconds spent importing
+    each module that was not already imported as a list of
+    ``(module, cumulative, self)`` tuples, slowest first. The cumulative time
+    includes the time spent importing the modules it imports.
+
+    :param list modules: The names of the modules to import
+    :rtype: list(tuple(str, float, float))
+    :raises: ImportError
+
+    """
+    timings, stack = {}, []
+    original = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        key = _absolute_name(name, globals, level)
+        if key in sys.modules or key in timings:
+            return original(name, globals, locals, fromlist, level)
+        stack.append(0.0)
+        start = timer()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            duration = timer() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += duration
+            if key in sys.modules:
+                timings[key] = duration, duration - nested
+
+    builtins.__import__ = timed_import
+    try:
+        for name in modules:
+            __import__(name)
+    finally:
+        builtins.__import__ = original
+    return sorted(((name, cumulative, own)
+                   for name, (cumulative, own) in timings.items()),
+                  key=lambda row: row[1], reverse=True)
+
+
+def report(timings, limit=DEFAULT_LIMIT):
+    """Return the import times as a table of the slowest modules.
+
+    :param list timings: The ``(module, cumulative, self)`` import times
+    :param int limit: The maximum number of modules to include
+    :rtype: str
+
+    """
+    lines = ['{:>14} {:>10}  {}'.format('cumulative ms', 'self ms', 'module')]
+    for name, cumulative, own in timings[:limit]:
+        lines.append('{:>14.1f} {:>10.1f}  {}'.format(
+            cumulative * 1000, own * 1000, name))
+    lines.append('{} modules imported in {:.1f} ms'.format(
+        len(timings), sum(own for _name, _cumulative, own in timings) * 1000))
+    return '\n'.join(lines) + '\n'
+
+
+def _absolute_name(name, globals, level):
+    """Return the absolute name of a module being imported.
+
+    :param str name: The name passed to ``__import__``
+    :param dict globals: The globals of the importing module
+    :param int level: The number of parent packages for relative imports
+    :rtype: str
+
+    """
+    if not level or not globals:
+        return name
+    package = globals.get('__package__') or globals.get('__name__', '')
+    if level > 1:
+        package = package.rsplit('.', level - 1)[0]
+    return '{}.{}'.format(package, name) if name else package
+
+
+def main(args=None):
+    """Invoked by ``rejected --startup-profile`` in a new interpreter to
+    import the modules and write the report to stdout.
+
+    :param list args: The command line arguments, defaulting to sys.argv
+    :rtype: int
+
+    """
+    parser = argparse.ArgumentParser(
+        description='Report the time spent importing modules')
+    parser.add_argument('-n', '--limit',
+                        action='store',
+                        type=int,
+                        default=DEFAULT_LIMIT,
+                        dest='limit',
+                        help='The number of modules to report '
+                             '(default: {})'.format(DEFAULT_LIMIT))
+    parser.add_argument('modules',
+                        nargs='+',
+                        metavar='MODULE',
+                        help='The modules to import')
+    args = parser.parse_args(args)
+    try:
+        timings = profile(args.modules)
+    except ImportError as error:
+        sys.stderr.write('Error importing modules: {}\n'.format(error))
+        return 1
+    sys.stdout.write(report(timings, args.limit))
+    return 0
+
+
+if __name__ == '__main__':
+    # Remove the package directory added when run as a script so its modules
+    # do not shadow top-level modules
+    del sys.path[0]
+    sys.exit(main())
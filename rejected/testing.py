@@ -64,6 +64,7 @@ class AsyncTestCase(testing.AsyncTestCase):
     """
     _consumer = None
     PUBLISHER_CONFIRMATIONS = False
+    PUBLISH_WINDOW = 0
 
     def __init__(self, *args, **kwargs):
         super(AsyncTestCase, self).__init__(*args, **kwargs)
@@ -185,6 +186,48 @@ class AsyncTestCase(testing.AsyncTestCase):
         """
         return self.consumer.measurement
 
+    @gen.coroutine
+    def process_batch(self,
+                      message_bodies,
+                      content_type='application/json',
+                      message_type=None,
+                      properties=None,
+                      exchange='rejected',
+                      routing_key='routing-key'):
+        """Process a batch of messages with a
+        :class:`~rejected.consumer.BatchConsumer` as if they were being
+        delivered by RabbitMQ. A message is created for each value in
+        ``message_bodies`` using the same properties.
+
+        A list with the result for each message in the batch is returned,
+        in the same order as ``message_bodies``.
+
+        .. note:: This method is a co-routine and must be yielded to ensure
+                  that your tests are functioning properly.
+
+        :param list message_bodies: the bodies of the messages to create
+        :param str content_type: The mime type
+        :param str message_type: identifies the type of message to create
+        :param dict properties: AMQP message properties
+        :param str exchange: The exchange the messages should appear to be
+            from
+        :param str routing_key: The messages' routing key
+        :rtype: list
+
+        """
+        properties = properties or {}
+        properties.setdefault('content_type', content_type)
+        properties.setdefault('correlation_id', self.correlation_id)
+        properties.setdefault('timestamp', int(time.time()))
+        properties.setdefault('type', message_type)
+
+        results = yield self.consumer.execute_batch(
+            [self.create_message(body, dict(properties), exchange,
+                                 routing_key)
+             for body in message_bodies], data.Measurement())
+        self.logger.info('execute_batch returned %r', results)
+        raise gen.Return(results)
+
     @gen.coroutine
     def process_message(self,
                         message_body=None,
@@ -298,13 +341,15 @@ class AsyncTestCase(testing.AsyncTestCase):
             connect.return_value = conn
             obj = connection.Connection(name, {}, 'test-consumer', True,
                                         self.PUBLISHER_CONFIRMATIONS,
-                                        self.io_loop, callbacks)
+                                        self.io_loop, callbacks,
+                                        publish_window=self.PUBLISH_WINDOW)
             obj.set_state(obj.STATE_ACTIVE)
             obj.channel = mock.Mock(spec=channel.Channel)
             obj.channel._state = obj.channel.OPEN
             obj.channel.is_closed = False
             obj.channel.is_closing = False
             obj.channel.is_open = True
+            obj.publisher.channel = obj.channel
             return obj
 
     def _create_consumer(self):
@@ -333,7 +378,8 @@ class AsyncTestCase(testing.AsyncTestCase):
         obj.sentry_client = mock.Mock(spec=raven.Client) if raven else None
         return obj
 
-    def _on_publish(self, exchange, routing_key, properties, body, mandatory):
+    def _on_publish(self, exchange, routing_key, body, properties=None,
+                    mandatory=False):
         LOGGER.debug('on_publish to %s using %s (pc: %s)',
                      exchange, routing_key, self.PUBLISHER_CONFIRMATIONS)
         msg = PublishedMessage(exchange, routing_key, properties, body)
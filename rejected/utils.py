@@ -1,6 +1,30 @@
 import importlib
 import math
-import pkg_resources
+import sys
+
+
+class LazyModule(object):
+    """A module that is imported the first time one of its attributes is
+    accessed, deferring the cost of importing optional dependencies until
+    they are used. Like the ``import`` statement, dotted names import the
+    submodule and bind the top-level package.
+
+    :param str names: The names of the modules to import
+
+    """
+    def __init__(self, *names):
+        self.__dict__['_names'] = names
+        self.__dict__['_module'] = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            for value in self._names:
+                module = __import__(value)
+            self.__dict__['_module'] = module
+        return getattr(self._module, name)
+
+    def __repr__(self):
+        return '<LazyModule {}>'.format(', '.join(self._names))
 
 
 def get_package_version(module_obj, value):
@@ -16,12 +40,63 @@ def get_package_version(module_obj, value):
             return getattr(module_obj, key)
     parts = value.split('.')
     for index, part in enumerate(parts):
+        version = distribution_version('.'.join(parts[0:index + 1]))
+        if version:
+            return version
+
+
+def distribution_version(name):
+    """Return the version of an installed distribution, using
+    :mod:`importlib.metadata` if available. :mod:`pkg_resources`, which
+    scans every installed distribution when imported, is only used on
+    Python versions without :mod:`importlib.metadata` or its backport.
+
+    :param str name: The distribution name
+    :rtype: str or None
+
+    """
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            metadata = None
+    if metadata is not None:
         try:
-            return pkg_resources.get_distribution(
-                '.'.join(parts[0:index + 1])).version
-        except (pkg_resources.DistributionNotFound,
-                pkg_resources.RequirementParseError):
-            continue
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            return None
+
+    import pkg_resources
+    try:
+        return pkg_resources.get_distribution(name).version
+    except (pkg_resources.DistributionNotFound,
+            pkg_resources.RequirementParseError):
+        return None
+
+
+def is_installed(name):
+    """Return :data:`True` if the module can be imported, without importing
+    it. For dotted names, only the top-level package is checked.
+
+    :param str name: The module name
+    :rtype: bool
+
+    """
+    name = name.split('.')[0]
+    if name in sys.modules:
+        return True
+    try:
+        from importlib import util
+    except ImportError:  # pragma: nocover
+        import imp
+        try:
+            imp.find_module(name)
+        except ImportError:
+            return False
+        return True
+    return util.find_spec(name) is not None
 
 
 def import_consumer(value):
@@ -38,6 +113,24 @@ def import_consumer(value):
             get_package_version(module_obj, value))
 
 
+def lazy_import(*names):
+    """Return a :class:`LazyModule` for the modules, or :data:`None` if
+    their top-level package is not installed, for optional dependencies
+    that are imported on first use:
+
+    .. code-block:: python
+
+        zstandard = utils.lazy_import('zstandard')
+
+    :param str names: The names of the modules to import
+    :rtype: rejected.utils.LazyModule or None
+
+    """
+    if not is_installed(names[0]):
+        return None
+    return LazyModule(*names)
+
+
 def message_info(exchange, routing_key, properties):
     """Return info about a message using the same conditional constructs
 
@@ -47,9 +47,16 @@ setuptools.setup(
     extras_require={
         'html': ['beautifulsoup4'],
         'influxdb': ['sprockets-influxdb'],
+        'json': ['orjson'],
+        'lz4': ['lz4'],
         'msgpack': ['u-msgpack-python'],
-        'sentry': ['raven']
+        'numpy': ['numpy'],
+        'sentry': ['raven'],
+        'uvloop': ['uvloop'],
+        'zstd': ['zstandard']
     },
     tests_require=read_requirements('testing.txt'),
-    entry_points=dict(console_scripts=['rejected=rejected.controller:main']),
+    entry_points=dict(console_scripts=[
+        'rejected=rejected.controller:main',
+        'rejected-zstd-dictionary=rejected.dictionary:main']),
     zip_safe=True)
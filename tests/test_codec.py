@@ -0,0 +1,488 @@
+"""Tests for rejected.codec"""
+import json
+import os
+import tempfile
+import unittest
+
+import mock
+
+from pika import spec
+
+from rejected import codec, consumer, data
+
+from . import mocks
+
+
+class RegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self._obj = codec.Registry()
+        self._obj.register('application/json', codec.load_json,
+                           codec.dump_json)
+
+    def test_get(self):
+        self.assertEqual(self._obj.get('application/json'),
+                         codec.Codec(codec.load_json, codec.dump_json))
+
+    def test_get_ignores_parameters(self):
+        self.assertEqual(
+            self._obj.get('application/json; charset=utf-8').decode,
+            codec.load_json)
+
+    def test_get_unknown(self):
+        self.assertIsNone(self._obj.get('application/unknown'))
+        self.assertIsNone(self._obj.get(None))
+
+    def test_contains(self):
+        self.assertIn('application/json', self._obj)
+        self.assertNotIn('text/plain', self._obj)
+
+    def test_register_multiple_names(self):
+        self._obj.register(('text/yaml', 'text/x-yaml'), codec.load_yaml,
+                           codec.dump_yaml)
+        self.assertIs(self._obj.get('text/yaml'),
+                      self._obj.get('text/x-yaml'))
+
+    def test_unregister(self):
+        self._obj.unregister('application/json')
+        self.assertNotIn('application/json', self._obj)
+
+
+class CodecTests(unittest.TestCase):
+
+    VALUE = {'foo': 'bar', 'baz': [1, 2, 3]}
+
+    def roundtrip(self, registry, name, value):
+        entry = registry.get(name)
+        return entry.decode(entry.encode(value))
+
+    def test_json(self):
+        self.assertDictEqual(
+            self.roundtrip(codec.CONTENT_TYPES, 'application/json',
+                           self.VALUE), self.VALUE)
+
+    def test_json_from_stdlib(self):
+        with mock.patch.multiple('rejected.codec', orjson=None, ujson=None):
+            self.assertEqual(codec.dump_json(self.VALUE),
+                             b'{"foo": "bar", "baz": [1, 2, 3]}')
+            self.assertDictEqual(codec.load_json(b'{"foo": "bar"}'),
+                                 {'foo': 'bar'})
+
+    def test_json_decode_error(self):
+        with self.assertRaises(ValueError):
+            codec.load_json(b'{"foo":')
+
+    def test_msgpack(self):
+        self.assertDictEqual(
+            self.roundtrip(codec.CONTENT_TYPES, 'application/msgpack',
+                           self.VALUE), self.VALUE)
+
+    def test_pickle(self):
+        self.assertDictEqual(
+            self.roundtrip(codec.CONTENT_TYPES, 'application/x-pickle',
+                           self.VALUE), self.VALUE)
+
+    def test_yaml(self):
+        self.assertDictEqual(
+            self.roundtrip(codec.CONTENT_TYPES, 'text/yaml', self.VALUE),
+            self.VALUE)
+
+    def test_bzip2(self):
+        self.assertEqual(
+            self.roundtrip(codec.CONTENT_ENCODINGS, 'bzip2', b'value'),
+            b'value')
+
+    def test_gzip(self):
+        self.assertEqual(
+            self.roundtrip(codec.CONTENT_ENCODINGS, 'gzip', u'value'),
+            b'value')
+
+    def test_gzip_level(self):
+        self.assertEqual(codec.decode_gzip(codec.encode_gzip(b'value', 1)),
+                         b'value')
+
+    @unittest.skipIf(codec.lz4 is None, 'lz4 not installed')
+    def test_lz4(self):
+        self.assertEqual(
+            self.roundtrip(codec.CONTENT_ENCODINGS, 'lz4', u'value'),
+            b'value')
+
+    @unittest.skipIf(codec.lz4 is None, 'lz4 not installed')
+    def test_lz4_level(self):
+        self.assertEqual(codec.decode_lz4(codec.encode_lz4(b'value', 9)),
+                         b'value')
+
+    @unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+    def test_zstd(self):
+        self.assertEqual(
+            self.roundtrip(codec.CONTENT_ENCODINGS, 'zstd', u'value'),
+            b'value')
+
+    @unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+    def test_zstd_compressor_reused_per_level(self):
+        self.assertIs(codec._zstd_compressor(3), codec._zstd_compressor(3))
+        self.assertIsNot(codec._zstd_compressor(3),
+                         codec._zstd_compressor(9))
+
+    @unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+    def test_zstd_level(self):
+        self.assertEqual(codec.decode_zstd(codec.encode_zstd(b'value', 19)),
+                         b'value')
+
+    def test_corrupt_values_raise_value_error(self):
+        for name in ('bzip2', 'gzip', 'lz4', 'zstd'):
+            entry = codec.CONTENT_ENCODINGS.get(name)
+            if entry is None:
+                continue
+            with self.assertRaises(ValueError):
+                entry.decode(b'corrupt value')
+            with self.assertRaises(ValueError):
+                entry.decode(entry.encode(b'value' * 100)[:-8])
+
+
+class IterDecodeTests(unittest.TestCase):
+
+    VALUE = os.urandom(1024) * 40
+
+    def assertIterDecodes(self, content_encoding):
+        value = codec.CONTENT_ENCODINGS.get(content_encoding).encode(
+            self.VALUE)
+        chunks = list(codec.iter_decode(content_encoding, value,
+                                        chunk_size=16384))
+        self.assertTrue(all(len(chunk) <= 16384 for chunk in chunks))
+        self.assertEqual(b''.join(chunks), self.VALUE)
+        with self.assertRaises(ValueError):
+            list(codec.iter_decode(content_encoding, value[:len(value) // 2]))
+        with self.assertRaises(ValueError):
+            list(codec.iter_decode(content_encoding, b'corrupt value'))
+        with self.assertRaises(ValueError):
+            list(codec.iter_decode(content_encoding, value,
+                                   max_size=len(self.VALUE) - 1))
+
+    def test_bzip2(self):
+        self.assertIterDecodes('bzip2')
+
+    def test_gzip(self):
+        self.assertIterDecodes('gzip')
+
+    @unittest.skipIf(codec.lz4 is None, 'lz4 not installed')
+    def test_lz4(self):
+        self.assertIterDecodes('lz4')
+
+    @unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+    def test_zstd(self):
+        self.assertIterDecodes('zstd')
+
+    def test_without_iter_decode(self):
+        codec.register_content_encoding(
+            'x-reversed', lambda value: value[::-1],
+            lambda value: value[::-1])
+        self.addCleanup(codec.CONTENT_ENCODINGS.unregister, 'x-reversed')
+        self.assertListEqual(
+            list(codec.iter_decode('x-reversed', b'abcde', chunk_size=2)),
+            [b'ed', b'cb', b'a'])
+
+    def test_unsupported_encoding_is_not_limited(self):
+        self.assertListEqual(
+            list(codec.iter_decode(None, memoryview(b'abcde'), 1, 3)),
+            [b'abc', b'de'])
+
+
+@unittest.skipIf(codec.numpy is None, 'numpy not installed')
+class ToColumnsTests(unittest.TestCase):
+
+    VALUES = [{'temperature': 20.5, 'sensor': {'id': 1}},
+              {'temperature': 'invalid', 'sensor': {'id': 2}},
+              {'sensor': None},
+              None]
+
+    def test_columns(self):
+        columns = codec.to_columns(
+            self.VALUES, {'temperature': 'float32', 'sensor.id': 'int64'})
+        self.assertEqual(columns['temperature'].values.dtype, 'float32')
+        self.assertListEqual(columns['temperature'].values.tolist(),
+                             [20.5, 0, 0, 0])
+        self.assertListEqual(columns['temperature'].valid.tolist(),
+                             [True, False, False, False])
+        self.assertEqual(columns['sensor.id'].values.dtype, 'int64')
+        self.assertListEqual(columns['sensor.id'].values.tolist(),
+                             [1, 2, 0, 0])
+        self.assertListEqual(columns['sensor.id'].valid.tolist(),
+                             [True, True, False, False])
+
+    def test_values_iterator(self):
+        columns = codec.to_columns(iter(self.VALUES), ['sensor.id'])
+        self.assertListEqual(columns['sensor.id'].values.tolist(),
+                             [1, 2, 0, 0])
+
+    def test_field_names_default_to_float64(self):
+        columns = codec.to_columns(self.VALUES, ['temperature'])
+        self.assertEqual(columns['temperature'].values.dtype, 'float64')
+
+    def test_typed_objects(self):
+        value = mock.Mock(spec=['temperature'], temperature=3)
+        columns = codec.to_columns([value], ['temperature'])
+        self.assertListEqual(columns['temperature'].values.tolist(), [3.0])
+
+    def test_booleans_are_not_valid(self):
+        columns = codec.to_columns([{'value': True}, {'value': 1}],
+                                   {'value': 'int64'})
+        self.assertListEqual(columns['value'].values.tolist(), [0, 1])
+        self.assertListEqual(columns['value'].valid.tolist(), [False, True])
+
+    def test_out_of_range_values_are_not_valid(self):
+        columns = codec.to_columns(
+            [{'value': 2 ** 31}, {'value': -2 ** 31}, {'value': 2.5},
+             {'value': 3.0}, {'value': float('nan')}],
+            {'value': 'int32'})
+        self.assertListEqual(columns['value'].values.tolist(),
+                             [0, -2 ** 31, 0, 3, 0])
+        self.assertListEqual(columns['value'].valid.tolist(),
+                             [False, True, False, True, False])
+
+    def test_values_too_large_for_floats_are_not_valid(self):
+        columns = codec.to_columns(
+            [{'value': 1e39}, {'value': 10 ** 400}, {'value': 1.5}],
+            {'value': 'float32'})
+        self.assertListEqual(columns['value'].values.tolist(), [0, 0, 1.5])
+        self.assertListEqual(columns['value'].valid.tolist(),
+                             [False, False, True])
+
+
+class SmartConsumerCodecTests(unittest.TestCase):
+
+    def setUp(self):
+        codec.register_content_type(
+            'text/x-reversed', lambda value: value[::-1],
+            lambda value: ''.join(reversed(value)).encode('utf-8'))
+        self.addCleanup(codec.CONTENT_TYPES.unregister, 'text/x-reversed')
+        self._obj = consumer.SmartConsumer(settings={}, process=None)
+
+    def test_registered_content_type_is_decoded(self):
+        self._obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_type='text/x-reversed'), b'olleh')
+        self.assertEqual(self._obj.body, b'hello')
+
+    def test_registered_content_type_is_encoded(self):
+        self.assertEqual(
+            self._obj._prepare_body(
+                {'content_type': 'text/x-reversed'}, ['a', 'b'], False,
+                False)[1],
+            b'ba')
+
+    def test_body_stream(self):
+        value = b'value' * 1000
+        self._obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_encoding='gzip'),
+            codec.encode_gzip(value))
+        self.assertEqual(b''.join(self._obj.body_stream), value)
+
+    def test_body_stream_max_decompressed_size(self):
+        self._obj._max_decompressed_size = 1024
+        self._obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_encoding='gzip'),
+            codec.encode_gzip(b'value' * 1000))
+        with self.assertRaises(consumer.MessageException):
+            list(self._obj.body_stream)
+
+    def test_body_max_decompressed_size(self):
+        obj = consumer.SmartConsumer(settings={}, process=None,
+                                     max_decompressed_size=1024)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_encoding='bzip2'),
+            codec.encode_bz2(b'value' * 1000))
+        with self.assertRaises(consumer.MessageException):
+            obj.body
+
+    @unittest.skipIf(codec.numpy is None, 'numpy not installed')
+    def test_decode_columns(self):
+        bodies = [(b'{"value": 1}', None),
+                  (codec.encode_gzip(b'{"value": 2.5}'), 'gzip'),
+                  (b'{"value"', None)]
+        messages = [
+            data.Message('mock', mocks.CHANNEL, mocks.METHOD,
+                         spec.BasicProperties(
+                             content_type='application/json',
+                             content_encoding=content_encoding), body)
+            for body, content_encoding in bodies]
+        column = self._obj.decode_columns(messages, ['value'])['value']
+        self.assertListEqual(column.values.tolist(), [1.0, 2.5, 0.0])
+        self.assertListEqual(column.valid.tolist(), [True, True, False])
+
+    @unittest.skipIf(codec.numpy is None, 'numpy not installed')
+    def test_decode_columns_is_one_pass(self):
+        events = []
+        messages = [
+            data.Message('mock', mocks.CHANNEL, mocks.METHOD,
+                         spec.BasicProperties(
+                             content_type='application/json'), body)
+            for body in (b'{"value": 1}', b'{"value": 2}')]
+        decode_body = self._obj._decode_body
+        field_value = codec._field_value
+
+        def on_decode(message):
+            events.append('decode')
+            return decode_body(message)
+
+        def on_field_value(value, path):
+            events.append('copy')
+            return field_value(value, path)
+
+        with mock.patch.object(self._obj, '_decode_body', on_decode):
+            with mock.patch('rejected.codec._field_value', on_field_value):
+                self._obj.decode_columns(messages, ['value'])
+        self.assertListEqual(events, ['decode', 'copy', 'decode', 'copy'])
+
+    def test_decode_columns_requires_numpy(self):
+        with mock.patch('rejected.codec.numpy', None):
+            with self.assertRaises(consumer.ConfigurationException):
+                self._obj.decode_columns([], ['value'])
+
+    def test_corrupt_body_raises_message_exception(self):
+        for max_decompressed_size in (0, 1024):
+            self._obj._max_decompressed_size = max_decompressed_size
+            self._obj._message = data.Message(
+                'mock', mocks.CHANNEL, mocks.METHOD,
+                spec.BasicProperties(content_encoding='gzip'),
+                b'corrupt value')
+            with self.assertRaises(consumer.MessageException):
+                self._obj.body
+
+    def test_invalid_json_raises_message_exception(self):
+        self._obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_type='application/json'), b'{"a"')
+        with self.assertRaises(consumer.MessageException):
+            self._obj.body
+
+
+class SmartConsumerCompressionTests(unittest.TestCase):
+
+    BODY = b'x' * 2048
+
+    def setUp(self):
+        self._obj = consumer.SmartConsumer(
+            settings={}, process=None,
+            compression={'encoding': 'gzip', 'level': 1, 'min_size': 1024})
+
+    def test_defaults(self):
+        obj = consumer.SmartConsumer(settings={}, process=None)
+        self.assertIsNone(obj._compression_encoding)
+        self.assertIsNone(obj._compression_level)
+        self.assertEqual(obj._compression_min_size,
+                         consumer.SmartConsumer.COMPRESSION_MIN_SIZE)
+
+    def test_unsupported_encoding_raises(self):
+        with self.assertRaises(consumer.ConfigurationException):
+            consumer.SmartConsumer(settings={}, process=None,
+                                   compression={'encoding': 'invalid'})
+
+    def test_body_above_min_size_is_compressed(self):
+        properties = {'content_type': 'text/plain'}
+        result, body = self._obj._prepare_body(
+            properties, self.BODY, False, False)
+        self.assertEqual(result['content_encoding'], 'gzip')
+        self.assertEqual(codec.decode_gzip(body), self.BODY)
+        self.assertNotIn('content_encoding', properties)
+
+    def test_body_below_min_size_is_not_compressed(self):
+        self.assertEqual(
+            self._obj._prepare_body({}, b'value', False, False),
+            ({}, b'value'))
+
+    def test_explicit_content_encoding_is_used(self):
+        result, body = self._obj._prepare_body(
+            {'content_encoding': 'bzip2'}, self.BODY, False, False)
+        self.assertEqual(result['content_encoding'], 'bzip2')
+        self.assertEqual(codec.decode_bz2(body), self.BODY)
+
+    def test_no_encoding_is_not_compressed(self):
+        self.assertEqual(
+            self._obj._prepare_body({}, self.BODY, False, True),
+            ({}, self.BODY))
+
+    def test_serialized_body_is_compressed(self):
+        value = {'key': 'x' * 2048}
+        result, body = self._obj._prepare_body(
+            {'content_type': 'application/json'}, value, False, False)
+        self.assertEqual(result['content_encoding'], 'gzip')
+        self.assertDictEqual(codec.load_json(codec.decode_gzip(body)), value)
+
+
+def zstd_samples():
+    return [json.dumps({'id': index, 'name': 'user{}'.format(index),
+                        'email': 'user{}@example.com'.format(index),
+                        'active': bool(index % 2)}).encode('utf-8')
+            for index in range(300)]
+
+
+@unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+class ZstdDictionaryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.samples = zstd_samples()
+        dictionary = codec.zstandard.train_dictionary(4096, self.samples)
+        handle, self.path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, self.path)
+        os.write(handle, dictionary.as_bytes())
+        os.close(handle)
+        self.addCleanup(codec.ZSTD_DICTIONARIES.clear)
+        self.dict_id = codec.load_zstd_dictionary(self.path)
+
+    def test_load_returns_dict_id(self):
+        self.assertIn(self.dict_id, codec.ZSTD_DICTIONARIES)
+
+    def test_load_raises_for_raw_content(self):
+        with open(self.path, 'wb') as handle:
+            handle.write(b'raw content')
+        with self.assertRaises(ValueError):
+            codec.load_zstd_dictionary(self.path)
+
+    def test_roundtrip(self):
+        value = codec.encode_zstd(self.samples[0], dictionary=self.dict_id)
+        self.assertEqual(
+            codec.zstandard.get_frame_parameters(value).dict_id,
+            self.dict_id)
+        self.assertEqual(codec.decode_zstd(value), self.samples[0])
+
+    def test_dictionary_improves_compression(self):
+        self.assertLess(
+            len(codec.encode_zstd(self.samples[0], dictionary=self.dict_id)),
+            len(codec.encode_zstd(self.samples[0])))
+
+    def test_decode_unknown_dictionary_raises(self):
+        value = codec.encode_zstd(self.samples[0], dictionary=self.dict_id)
+        codec.ZSTD_DICTIONARIES.clear()
+        with self.assertRaises(ValueError):
+            codec.decode_zstd(value)
+
+    def test_smart_consumer_compresses_with_dictionary(self):
+        obj = consumer.SmartConsumer(
+            settings={}, process=None,
+            compression={'encoding': 'zstd', 'min_size': 0,
+                         'dictionary': self.path})
+        properties, body = obj._prepare_body(
+            {'content_type': 'application/json'}, {'id': 1}, False, False)
+        self.assertEqual(properties['content_encoding'], 'zstd')
+        self.assertEqual(
+            codec.zstandard.get_frame_parameters(body).dict_id, self.dict_id)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(**properties), body)
+        self.assertDictEqual(obj.body, {'id': 1})
+
+    def test_smart_consumer_dictionary_requires_zstd(self):
+        with self.assertRaises(consumer.ConfigurationException):
+            consumer.SmartConsumer(
+                settings={}, process=None,
+                compression={'encoding': 'gzip', 'dictionary': self.path})
+
+    def test_smart_consumer_missing_dictionary_raises(self):
+        with self.assertRaises(consumer.ConfigurationException):
+            consumer.SmartConsumer(
+                settings={}, process=None,
+                compression={'dictionaries': [self.path + '.missing']})
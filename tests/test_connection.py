@@ -0,0 +1,478 @@
+"""Tests for rejected.connection"""
+import mock
+import unittest
+
+from pika import channel, frame, spec
+from tornado import concurrent, gen, testing
+
+from rejected import connection, errors
+
+
+class AckBatchingTests(unittest.TestCase):
+
+    def setUp(self):
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, False, mock.Mock(),
+                callbacks, 5, 100)
+        self._obj.set_state(self._obj.STATE_ACTIVE)
+        self._obj.channel = mock.Mock(spec=channel.Channel)
+        self._obj.channel.is_closed = False
+
+    def deliver(self, *delivery_tags):
+        for delivery_tag in delivery_tags:
+            self._obj.on_delivery(
+                self._obj.channel,
+                spec.Basic.Deliver('ctag0', delivery_tag, False, 'ex', 'rk'),
+                spec.BasicProperties(), b'')
+
+    def test_ack_without_batching(self):
+        self._obj.ack_batch_size = 1
+        self.deliver(1)
+        self._obj.ack(1)
+        self._obj.channel.basic_ack.assert_called_once_with(delivery_tag=1)
+
+    def test_ack_is_deferred(self):
+        self.deliver(1, 2)
+        self._obj.ack(1)
+        self._obj.channel.basic_ack.assert_not_called()
+        self._obj.io_loop.call_later.assert_called_once_with(
+            0.1, self._obj.flush_acks)
+
+    def test_contiguous_acks_coalesced(self):
+        self.deliver(1, 2, 3, 4, 5)
+        for delivery_tag in range(1, 6):
+            self._obj.ack(delivery_tag)
+        self._obj.channel.basic_ack.assert_called_once_with(
+            delivery_tag=5, multiple=True)
+        self.assertEqual(len(self._obj.unsettled), 0)
+
+    def test_mixed_results_coalesced_by_run(self):
+        self.deliver(1, 2, 3, 4)
+        self._obj.ack(1)
+        self._obj.ack(2)
+        self._obj.nack(3, False)
+        self._obj.nack(4, False)
+        self._obj.flush_acks()
+        self._obj.channel.basic_ack.assert_called_once_with(
+            delivery_tag=2, multiple=True)
+        self._obj.channel.basic_nack.assert_called_once_with(
+            delivery_tag=4, multiple=True, requeue=False)
+
+    def test_interleaved_results_sent_per_tag(self):
+        self.deliver(1, 2, 3, 4)
+        self._obj.ack(1)
+        self._obj.ack(3)
+        self._obj.nack(4)
+        self._obj.flush_acks()
+        self._obj.channel.basic_ack.assert_has_calls([
+            mock.call(delivery_tag=1, multiple=False),
+            mock.call(delivery_tag=3, multiple=False)])
+        self._obj.channel.basic_nack.assert_called_once_with(
+            delivery_tag=4, multiple=False, requeue=True)
+        self.assertListEqual(list(self._obj.unsettled.keys()), [2])
+
+    def test_shutdown_flushes_acks(self):
+        self.deliver(1, 2)
+        self._obj.ack(1)
+        self._obj.ack(2)
+        self._obj.shutdown()
+        self._obj.channel.basic_ack.assert_called_once_with(
+            delivery_tag=2, multiple=True)
+        self._obj.channel.close.assert_called_once()
+
+    def test_channel_closed_discards_acks(self):
+        self.deliver(1, 2)
+        self._obj.ack(1)
+        self._obj.on_channel_closed(self._obj.channel, 320, 'CLOSED')
+        self.assertEqual(self._obj.pending_acks, 0)
+        self.assertEqual(len(self._obj.unsettled), 0)
+        self._obj.channel.basic_ack.assert_not_called()
+
+
+class QoSTests(unittest.TestCase):
+
+    def setUp(self):
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, False, mock.Mock(),
+                callbacks)
+        self._obj.set_state(self._obj.STATE_CONNECTED)
+        self._obj.channel = mock.Mock(spec=channel.Channel)
+        self._obj.channel.is_closed = False
+
+    def test_consume_sets_per_consumer_qos(self):
+        self._obj.consume('queue', False, 10)
+        self._obj.channel.basic_qos.assert_called_once_with(
+            self._obj.on_qos_set, 0, 10, False)
+
+    def test_consume_sets_global_qos(self):
+        self._obj.consume('queue', False, 10, True)
+        self._obj.channel.basic_qos.assert_called_once_with(
+            self._obj.on_qos_set, 0, 10, True)
+
+    def test_set_qos_applies_to_channel(self):
+        self._obj.set_qos(20)
+        self._obj.channel.basic_qos.assert_called_once_with(
+            self._obj.on_qos_set, 0, 20, True)
+
+
+class PauseTests(unittest.TestCase):
+
+    def setUp(self):
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, False, mock.Mock(),
+                callbacks)
+        self._obj.set_state(self._obj.STATE_CONNECTED)
+        self._obj.channel = mock.Mock(spec=channel.Channel)
+        self._obj.channel.is_closed = False
+        self._obj.consume('queue', False, 10)
+        self._obj.channel.basic_consume.reset_mock()
+
+    def test_pause_cancels_consumer(self):
+        self._obj.pause()
+        self._obj.channel.basic_cancel.assert_called_once_with(
+            self._obj.on_paused, self._obj.consumer_tag)
+        self.assertTrue(self._obj.paused)
+        self.assertFalse(self._obj.is_active)
+
+    def test_pause_when_paused_is_noop(self):
+        self._obj.pause()
+        self._obj.pause()
+        self._obj.channel.basic_cancel.assert_called_once()
+
+    def test_resume_after_cancel_ok(self):
+        self._obj.pause()
+        self._obj.on_paused(mock.Mock())
+        self._obj.resume()
+        self._obj.channel.basic_consume.assert_called_once_with(
+            consumer_callback=self._obj.on_delivery, queue='queue',
+            no_ack=False, consumer_tag=self._obj.consumer_tag)
+        self.assertTrue(self._obj.is_active)
+
+    def test_resume_before_cancel_ok_waits(self):
+        self._obj.pause()
+        self._obj.resume()
+        self._obj.channel.basic_consume.assert_not_called()
+        self._obj.on_paused(mock.Mock())
+        self._obj.channel.basic_consume.assert_called_once()
+
+    def test_pause_again_before_cancel_ok(self):
+        self._obj.pause()
+        self._obj.resume()
+        self._obj.pause()
+        self._obj.on_paused(mock.Mock())
+        self._obj.channel.basic_consume.assert_not_called()
+        self._obj.channel.basic_cancel.assert_called_once()
+
+    def test_resume_when_not_paused_is_noop(self):
+        self._obj.resume()
+        self._obj.channel.basic_consume.assert_not_called()
+
+
+class PublishedMessagesTests(unittest.TestCase):
+
+    def setUp(self):
+        self._obj = connection.PublishedMessages()
+
+    def add(self, delivery_tag, message_id=None, exchange='ex',
+            routing_key='rk'):
+        message = connection.Published(
+            delivery_tag, message_id, exchange, routing_key,
+            concurrent.Future())
+        self._obj.add(message)
+        return message
+
+    def test_confirm_single(self):
+        messages = [self.add(tag) for tag in range(1, 4)]
+        self.assertListEqual(self._obj.confirm(2), [messages[1]])
+        self.assertListEqual(self._obj.pending(),
+                             [messages[0], messages[2]])
+
+    def test_confirm_multiple(self):
+        messages = [self.add(tag) for tag in range(1, 6)]
+        self.assertListEqual(self._obj.confirm(3, True), messages[:3])
+        self.assertEqual(len(self._obj), 2)
+
+    def test_confirm_unknown_delivery_tag(self):
+        self.add(1)
+        self.assertListEqual(self._obj.confirm(2), [])
+        self.assertEqual(len(self._obj), 1)
+
+    def test_confirm_removes_indexes(self):
+        self.add(1, 'message-1')
+        self._obj.confirm(1)
+        self.assertDictEqual(self._obj._by_message_id, {})
+        self.assertDictEqual(self._obj._by_route, {})
+
+    def test_match_by_message_id(self):
+        self.add(1, 'message-1')
+        message = self.add(2, 'message-2')
+        self.assertIs(self._obj.match('message-2', 'ex', 'rk'), message)
+
+    def test_match_by_route(self):
+        self.add(1, exchange='other')
+        message = self.add(2)
+        self.add(3)
+        self.assertIs(self._obj.match(None, 'ex', 'rk'), message)
+
+    def test_match_skips_returned_messages(self):
+        self.add(1).future.set_result(False)
+        message = self.add(2)
+        self.assertIs(self._obj.match(None, 'ex', 'rk'), message)
+
+    def test_match_falls_back_to_oldest(self):
+        message = self.add(1)
+        self.add(2)
+        self.assertIs(self._obj.match('unknown', 'other', 'other'), message)
+
+    def test_clear(self):
+        self.add(1, 'message-1')
+        self._obj.clear()
+        self.assertEqual(len(self._obj), 0)
+        self.assertIsNone(self._obj.oldest())
+
+
+class BatchConfirmationTests(unittest.TestCase):
+
+    def test_empty_batch_is_resolved(self):
+        self.assertListEqual(connection.BatchConfirmation(0).future.result(),
+                             [])
+
+    def test_future_resolves_once_all_entries_are_set(self):
+        batch = connection.BatchConfirmation(2)
+        entries = [batch.entry(0), batch.entry(1)]
+        entries[1].set_result(False)
+        self.assertTrue(entries[1].done())
+        self.assertFalse(entries[0].done())
+        self.assertFalse(batch.future.done())
+        entries[0].set_result(True)
+        self.assertListEqual(batch.future.result(), [True, False])
+
+    def test_exception_resolves_all_entries(self):
+        batch = connection.BatchConfirmation(2)
+        entries = [batch.entry(0), batch.entry(1)]
+        entries[0].set_exception(ValueError())
+        self.assertTrue(entries[1].done())
+        self.assertIsInstance(batch.future.exception(), ValueError)
+
+
+class PublisherConfirmationTests(unittest.TestCase):
+
+    def setUp(self):
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, True, mock.Mock(),
+                callbacks)
+        self.futures = [concurrent.Future() for _ in range(5)]
+        for future in self.futures:
+            self._obj.add_confirmation_future(
+                'ex', 'rk', spec.BasicProperties(), future)
+
+    def test_multiple_ack_resolves_prior_futures(self):
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Ack(3, True)))
+        self.assertListEqual([f.result() for f in self.futures[:3]],
+                             [True, True, True])
+        self.assertFalse(any(f.done() for f in self.futures[3:]))
+        self.assertEqual(len(self._obj.published_messages), 2)
+
+    def test_nack_resolves_undelivered(self):
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Nack(2, False)))
+        self.assertFalse(self.futures[1].result())
+        self.assertFalse(self.futures[0].done())
+
+    def test_returned_message_is_undelivered(self):
+        self._obj.on_return(
+            self._obj.channel, spec.Basic.Return(312, 'NO_ROUTE', 'ex', 'rk'),
+            spec.BasicProperties(), b'')
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Ack(1, False)))
+        self.assertFalse(self.futures[0].result())
+        self.assertEqual(len(self._obj.published_messages), 4)
+
+    def test_batch_resolved_by_multiple_ack(self):
+        future = self._obj.add_confirmation_batch(
+            [('ex', 'rk', spec.BasicProperties()) for _ in range(3)])
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Ack(7, True)))
+        self.assertFalse(future.done())
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Nack(8, False)))
+        self.assertListEqual(future.result(), [True, True, False])
+
+    def test_channel_closed_fails_pending_confirmations(self):
+        self._obj.handle = mock.Mock()
+        self._obj.on_channel_closed(self._obj.channel, 404, 'NOT_FOUND')
+        for future in self.futures:
+            self.assertIsInstance(future.exception(),
+                                  errors.RabbitMQException)
+        self.assertEqual(len(self._obj.published_messages), 0)
+        self.assertEqual(self._obj.publisher.delivery_tag, 0)
+
+    def test_channel_error_fails_pending_confirmations(self):
+        self._obj.on_channel_closed(self._obj.channel, 320, 'CLOSED')
+        for future in self.futures:
+            self.assertIsInstance(future.exception(),
+                                  errors.RabbitMQException)
+        self.assertEqual(len(self._obj.published_messages), 0)
+
+    def test_connection_closed_fails_pending_confirmations(self):
+        self._obj.on_closed(self._obj.handle, 320, 'CONNECTION_FORCED')
+        for future in self.futures:
+            self.assertIsInstance(future.exception(),
+                                  errors.RabbitMQException)
+        self.assertEqual(len(self._obj.published_messages), 0)
+
+
+class PublishWindowTests(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(PublishWindowTests, self).setUp()
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, True, self.io_loop,
+                callbacks, publish_window=2)
+
+    def publish(self):
+        self._obj.add_confirmation_future(
+            'ex', 'rk', spec.BasicProperties(), concurrent.Future())
+
+    def test_window_not_full(self):
+        self.publish()
+        self.assertFalse(self._obj.is_publish_window_full)
+
+    def test_window_full(self):
+        self.publish()
+        self.publish()
+        self.assertTrue(self._obj.is_publish_window_full)
+
+    def test_window_disabled(self):
+        self._obj.publish_window = 0
+        for _ in range(5):
+            self.publish()
+        self.assertFalse(self._obj.is_publish_window_full)
+
+    @testing.gen_test
+    def test_wait_returns_when_window_not_full(self):
+        self.publish()
+        yield self._obj.wait_for_publish_window()
+
+    @testing.gen_test
+    def test_wait_resumes_on_confirmation(self):
+        self.publish()
+        self.publish()
+        future = self._obj.wait_for_publish_window()
+        yield gen.moment
+        self.assertFalse(future.done())
+        self._obj.on_confirmation(frame.Method(1, spec.Basic.Ack(1, False)))
+        yield future
+        self.assertFalse(self._obj.is_publish_window_full)
+
+    @testing.gen_test
+    def test_wait_resumes_when_channel_closed(self):
+        self._obj.handle = mock.Mock()
+        self.publish()
+        self.publish()
+        future = self._obj.wait_for_publish_window()
+        self._obj.on_channel_closed(self._obj.channel, 404, 'NOT_FOUND')
+        yield future
+        self.assertEqual(len(self._obj.published_messages), 0)
+
+
+class PublishingChannelTests(unittest.TestCase):
+
+    def setUp(self):
+        callbacks = connection.Callbacks(*[mock.Mock() for _ in range(7)])
+        with mock.patch('rejected.connection.Connection.connect'):
+            self._obj = connection.Connection(
+                'mock', {}, 'test-consumer', True, True, mock.Mock(),
+                callbacks, publish_window=4, publishing_channels=2)
+        self._obj.handle = mock.Mock()
+        self._obj.on_channel_open(mock.Mock(spec=channel.Channel))
+        for publisher in self._obj.publishers:
+            publisher.on_channel_open(mock.Mock(spec=channel.Channel))
+
+    def test_on_open_opens_publishing_channels(self):
+        self._obj.handle.reset_mock()
+        self._obj.on_open(self._obj.handle)
+        self._obj.handle.channel.assert_has_calls([
+            mock.call(self._obj.on_channel_open),
+            mock.call(self._obj.publishers[0].on_channel_open),
+            mock.call(self._obj.publishers[1].on_channel_open)])
+
+    def test_confirmations_enabled_on_publishing_channels(self):
+        for publisher in self._obj.publishers:
+            publisher.channel.confirm_delivery.assert_called_once_with(
+                publisher.on_confirmation)
+            publisher.channel.add_on_return_callback.assert_called_once_with(
+                publisher.on_return)
+
+    def test_next_publisher_rotates(self):
+        self.assertListEqual(
+            [self._obj.next_publisher() for _ in range(3)],
+            [self._obj.publishers[0], self._obj.publishers[1],
+             self._obj.publishers[0]])
+
+    def test_next_publisher_skips_closed_channels(self):
+        self._obj.publishers[0].channel.is_open = False
+        self.assertIs(self._obj.next_publisher(), self._obj.publishers[1])
+        self.assertIs(self._obj.next_publisher(), self._obj.publishers[1])
+
+    def test_next_publisher_falls_back_to_consuming_channel(self):
+        for publisher in self._obj.publishers:
+            publisher.channel.is_open = False
+        self.assertIs(self._obj.next_publisher(), self._obj.publisher)
+
+    def test_publish_tracks_confirmation(self):
+        properties = spec.BasicProperties(message_id='abc')
+        future = self._obj.publish('ex', 'rk', properties, b'body')
+        publisher = self._obj.publishers[0]
+        publisher.channel.basic_publish.assert_called_once_with(
+            exchange='ex', routing_key='rk', body=b'body',
+            properties=properties, mandatory=True)
+        self.assertEqual(publisher.delivery_tag, 1)
+        publisher.on_confirmation(frame.Method(1, spec.Basic.Ack(1, False)))
+        self.assertTrue(future.result())
+
+    def test_publish_without_confirmations(self):
+        self._obj.publisher_confirmations = False
+        self.assertIsNone(
+            self._obj.publish('ex', 'rk', spec.BasicProperties(), b'body'))
+        self.assertEqual(self._obj.publishers[0].delivery_tag, 0)
+
+    def test_confirmations_tracked_per_channel(self):
+        futures = [concurrent.Future() for _ in range(2)]
+        for publisher, future in zip(self._obj.publishers, futures):
+            publisher.add_confirmation_future(
+                'ex', 'rk', spec.BasicProperties(), future)
+        self._obj.publishers[1].on_confirmation(
+            frame.Method(1, spec.Basic.Ack(1, False)))
+        self.assertFalse(futures[0].done())
+        self.assertTrue(futures[1].result())
+
+    def test_publish_window_spans_channels(self):
+        for publisher in self._obj._publishers + [self._obj.publishers[0]]:
+            publisher.add_confirmation_future(
+                'ex', 'rk', spec.BasicProperties(), concurrent.Future())
+        self.assertTrue(self._obj.is_publish_window_full)
+
+    def test_closed_publishing_channel_is_reopened(self):
+        publisher = self._obj.publishers[0]
+        future = concurrent.Future()
+        publisher.add_confirmation_future(
+            'ex', 'rk', spec.BasicProperties(), future)
+        publisher.on_channel_closed(publisher.channel, 406, 'PRECONDITION')
+        self.assertIsInstance(future.exception(), errors.RabbitMQException)
+        self.assertIsNone(publisher.channel)
+        self.assertEqual(publisher.delivery_tag, 0)
+        self._obj.handle.channel.assert_called_once_with(
+            publisher.on_channel_open)
+
+    def test_closed_publishing_channel_not_reopened_on_shutdown(self):
+        self._obj.set_state(self._obj.STATE_SHUTTING_DOWN)
+        publisher = self._obj.publishers[0]
+        publisher.on_channel_closed(publisher.channel, 200, 'OK')
+        self._obj.handle.channel.assert_not_called()
@@ -1,13 +1,19 @@
 # coding=utf-8
 """Tests for rejected.consumer"""
+import json
 import logging
+import os
+import threading
 import unittest
 import uuid
+import zlib
 
+from pika import spec
 from tornado import gen
 import mock
 
-from rejected import consumer, connection, process, testing
+from rejected import (consumer, connection, data, envelope, process,
+                      testing)
 
 from . import mocks
 
@@ -35,6 +41,48 @@ class ConsumerInitializationTests(unittest.TestCase):
             init.assert_called_once_with()
 
 
+class SmartConsumerBodyTests(unittest.TestCase):
+
+    def test_memoryview_body_is_deserialized(self):
+        obj = consumer.SmartConsumer(settings={}, process=None)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_type='application/json'),
+            memoryview(b'{"foo": "bar"}'))
+        self.assertDictEqual(obj.body, {'foo': 'bar'})
+
+    def test_spilled_body_is_deserialized(self):
+        obj = consumer.SmartConsumer(settings={}, process=None)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_type='application/json'),
+            b'{"foo": "bar"}')
+        obj._message.spill()
+        self.assertDictEqual(obj.body, {'foo': 'bar'})
+
+    def test_body_file(self):
+        obj = consumer.Consumer(settings={}, process=None)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES,
+            b'{"foo": "bar"}')
+        obj._message.spill()
+        self.assertEqual(obj.body_file.read(), b'{"foo": "bar"}')
+
+    def test_spilled_body_is_bytes(self):
+        obj = consumer.Consumer(settings={}, process=None)
+        obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES,
+            b'{"foo": "bar"}')
+        obj._message.spill()
+        self.assertEqual(obj.body, b'{"foo": "bar"}')
+        self.assertIs(obj.body, obj.body)
+        self.assertIsInstance(obj._message.body, memoryview)
+
+    def test_body_file_without_message(self):
+        obj = consumer.Consumer(settings={}, process=None)
+        self.assertIsNone(obj.body_file)
+
+
 class ConsumerDefaultProcessTests(testing.AsyncTestCase):
 
     def get_consumer(self):
@@ -61,6 +109,29 @@ class ConsumerSetConnectionTests(unittest.TestCase):
         self.assertEqual(obj._connections['mock'], conn)
 
 
+class ConsumerRepublishErrorTests(unittest.TestCase):
+
+    def test_republish_error_publishes_on_connection(self):
+        obj = consumer.Consumer(settings={}, process=None,
+                                error_exchange='errors')
+        conn = mock.Mock(spec=connection.Connection)
+        conn.name = 'mock'
+        obj.set_connection(conn)
+        message = data.Message(
+            'mock', mock.Mock(), mocks.METHOD,
+            spec.BasicProperties(message_id='abc'), b'body')
+        obj.republish_error(message, 'failed')
+        exchange, routing_key, properties, body = conn.publish.call_args[0]
+        self.assertEqual(exchange, 'errors')
+        self.assertEqual(routing_key, mocks.METHOD.routing_key)
+        self.assertEqual(body, b'body')
+        self.assertEqual(
+            properties.headers['X-Processing-Exception'], 'failed')
+        self.assertEqual(
+            properties.headers['X-Processing-Exceptions'], 1)
+        message.channel.basic_publish.assert_not_called()
+
+
 class TestConsumer(consumer.Consumer):
 
     def __init__(self, *args, **kwargs):
@@ -304,3 +375,551 @@ class ConfirmingPublishingTests(testing.AsyncTestCase):
         self.assertListEqual(
             self.consumer.confirmations,
             [True, True, True, False, False, False, True, True, True])
+
+
+class TestBulkPublisher(consumer.SmartConsumer):
+
+    def initialize(self):
+        self.confirmations = []
+
+    @gen.coroutine
+    def process(self):
+        properties = {'content_type': 'application/json'}
+        confirmations = yield self.publish_messages(
+            (self.settings['exchange'], str(index), properties,
+             {'index': index}) for index in range(3))
+        self.confirmations.append(confirmations)
+
+
+class BulkPublishingTests(testing.AsyncTestCase):
+
+    def get_settings(self):
+        return {'exchange': str(uuid.uuid4())}
+
+    def get_consumer(self):
+        return TestBulkPublisher
+
+    @testing.gen_test
+    def test_messages_are_published(self):
+        yield self.process_message()
+        self.assertListEqual(
+            [(msg.exchange, msg.routing_key, json.loads(msg.body))
+             for msg in self.published_messages],
+            [(self.consumer.settings['exchange'], str(index),
+              {'index': index}) for index in range(3)])
+        self.assertListEqual(self.consumer.confirmations, [None])
+
+    @testing.gen_test
+    def test_properties_are_converted_once(self):
+        with mock.patch.object(self.consumer, '_get_pika_properties',
+                               wraps=self.consumer._get_pika_properties) \
+                as get_pika_properties:
+            yield self.process_message()
+        get_pika_properties.assert_called_once_with(
+            {'content_type': 'application/json'})
+
+
+class ConfirmingBulkPublishingTests(BulkPublishingTests):
+
+    PUBLISHER_CONFIRMATIONS = True
+
+    @testing.gen_test
+    def test_messages_are_published(self):
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 3)
+        self.assertListEqual(self.consumer.confirmations,
+                             [[True, True, True]])
+
+    @testing.gen_test
+    def test_undelivered_messages(self):
+        def raise_undelivered(
+                _exchange, routing_key, _properties, _body, _mandatory):
+            if routing_key == '1':
+                raise testing.UndeliveredMessage()
+
+        with self.publishing_side_effect(raise_undelivered):
+            yield self.process_message()
+        self.assertListEqual(self.consumer.confirmations,
+                             [[True, False, True]])
+
+
+class TestEnvelopePublisher(consumer.SmartConsumer):
+
+    ENVELOPE_MAX_MESSAGES = 3
+
+    def initialize(self):
+        self.confirmations = []
+
+    @gen.coroutine
+    def process(self):
+        futures = [
+            self.publish_message(
+                self.settings['exchange'], 'routing-key',
+                {'content_type': 'application/json'}, {'index': index},
+                envelope=True)
+            for index in range(self.settings['count'])]
+        if self.settings.get('wait', True):
+            self.confirmations.extend((yield futures))
+
+
+class EnvelopePublishingTests(testing.AsyncTestCase):
+
+    def get_settings(self):
+        return {'exchange': str(uuid.uuid4()), 'count': 3}
+
+    def get_consumer(self):
+        return TestEnvelopePublisher
+
+    def unpack(self, published):
+        return [(m.properties.content_type, json.loads(m.body))
+                for m in envelope.unpack(data.Message(
+                    'mock', self.channel, mocks.METHOD,
+                    published.properties, published.body))]
+
+    @testing.gen_test
+    def test_messages_are_published_in_an_envelope(self):
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 1)
+        published = self.published_messages[0]
+        self.assertEqual(published.exchange,
+                         self.consumer.settings['exchange'])
+        self.assertEqual(published.routing_key, 'routing-key')
+        self.assertEqual(published.properties.content_type,
+                         envelope.CONTENT_TYPE)
+        self.assertListEqual(
+            self.unpack(published),
+            [('application/json', {'index': index}) for index in range(3)])
+        self.assertListEqual(self.consumer.confirmations,
+                             [None, None, None])
+
+    @testing.gen_test
+    def test_envelope_is_published_when_full(self):
+        self.consumer.settings['count'] = 5
+        yield self.process_message()
+        self.assertListEqual(
+            [len(self.unpack(m)) for m in self.published_messages], [3, 2])
+
+    @testing.gen_test
+    def test_envelope_is_published_after_max_delay(self):
+        self.consumer.settings['count'] = 2
+        self.consumer._envelope_max_delay = 10
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 1)
+        self.assertEqual(len(self.unpack(self.published_messages[0])), 2)
+
+    @testing.gen_test
+    def test_envelopes_are_published_on_shutdown(self):
+        self.consumer.settings.update({'count': 2, 'wait': False})
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 0)
+        self.consumer.shutdown()
+        self.assertEqual(len(self.published_messages), 1)
+        self.assertDictEqual(self.consumer._envelopes, {})
+
+
+class ConfirmingEnvelopePublishingTests(testing.AsyncTestCase):
+
+    PUBLISHER_CONFIRMATIONS = True
+
+    def get_settings(self):
+        return {'exchange': str(uuid.uuid4()), 'count': 3}
+
+    def get_consumer(self):
+        return TestEnvelopePublisher
+
+    @testing.gen_test
+    def test_envelope_is_confirmed(self):
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 1)
+        self.assertListEqual(self.consumer.confirmations,
+                             [True, True, True])
+
+
+class TestWindowedPublisher(consumer.Consumer):
+
+    def initialize(self):
+        self.confirmations = []
+        self.in_flight = []
+
+    @gen.coroutine
+    def process(self):
+        conn = self._publish_connection()
+        for index in range(5):
+            yield self.publish_windowed(
+                self.settings['exchange'], str(index), {}, str(index))
+            self.in_flight.append(len(conn.published_messages))
+        confirmations = yield self.wait_for_confirmations()
+        self.confirmations.append(confirmations)
+
+
+class WindowedPublishingTests(testing.AsyncTestCase):
+
+    PUBLISHER_CONFIRMATIONS = True
+    PUBLISH_WINDOW = 2
+
+    def get_settings(self):
+        return {'exchange': str(uuid.uuid4())}
+
+    def get_consumer(self):
+        return TestWindowedPublisher
+
+    @testing.gen_test
+    def test_publish_window_applies_backpressure(self):
+        yield self.process_message()
+        self.assertEqual(len(self.published_messages), 5)
+        self.assertEqual(max(self.consumer.in_flight), 2)
+        self.assertListEqual(self.consumer.confirmations,
+                             [[True, True, True, True, True]])
+
+    @testing.gen_test
+    def test_undelivered_messages(self):
+        def raise_undelivered(
+                _exchange, routing_key, _properties, _body, _mandatory):
+            if routing_key == '3':
+                raise testing.UndeliveredMessage()
+
+        with self.publishing_side_effect(raise_undelivered):
+            yield self.process_message()
+        self.assertListEqual(self.consumer.confirmations,
+                             [[True, True, True, False, True]])
+
+
+class TestConcurrentConsumer(consumer.Consumer):
+
+    def initialize(self):
+        self.observed = []
+
+    @gen.coroutine
+    def process(self):
+        body, measurement = self.body, self.measurement
+        yield gen.sleep(0.01 if body == 'first' else 0.001)
+        self.observed.append(
+            (body, self.body, measurement is self.measurement))
+
+
+class ConcurrentProcessingTests(testing.AsyncTestCase):
+
+    def get_consumer(self):
+        return TestConcurrentConsumer
+
+    @testing.gen_test
+    def test_per_message_context(self):
+        yield [self.process_message('first', 'text/plain'),
+               self.process_message('second', 'text/plain')]
+        self.assertListEqual(self.consumer.observed,
+                             [('second', 'second', True),
+                              ('first', 'first', True)])
+
+
+class TestConcurrentConfirmingPublisher(consumer.Consumer):
+
+    def initialize(self):
+        self.confirmations = []
+
+    @gen.coroutine
+    def process(self):
+        confirmation = yield self.publish_message(
+            'exchange', 'routing-key', {}, self.body)
+        self.confirmations.append((self.body, confirmation))
+
+
+class ConcurrentConfirmingPublishingTests(testing.AsyncTestCase):
+
+    PUBLISHER_CONFIRMATIONS = True
+
+    def get_consumer(self):
+        return TestConcurrentConfirmingPublisher
+
+    @testing.gen_test
+    def test_confirmations_are_tracked_per_message(self):
+        conn = self.process.connections['mock']
+        confirm, held = conn.on_confirmation, []
+
+        def hold_first_confirmation(value):
+            if value.method.delivery_tag == 1:
+                return held.append(value)
+            confirm(value)
+
+        with mock.patch.object(conn, 'on_confirmation',
+                               hold_first_confirmation):
+            first = self.process_message('first', 'text/plain')
+            yield self.process_message('second', 'text/plain')
+        self.assertEqual(len(conn.published_messages), 1)
+        confirm(held[0])
+        yield first
+        self.assertListEqual(self.consumer.confirmations,
+                             [('second', True), ('first', True)])
+        self.assertEqual(len(conn.published_messages), 0)
+
+
+class TestThreadPoolConsumer(consumer.ThreadPoolConsumer):
+
+    def initialize(self):
+        self.barrier = None
+        self.observed = []
+
+    def process(self):
+        if self.barrier:
+            self.barrier.wait(5)
+        if self.body == 'error':
+            raise consumer.ProcessingException
+        elif self.body == 'publish':
+            self.publish_message('exchange', 'routing-key', {}, 'published')
+        self.stats_incr('processed')
+        self.observed.append((self.body, threading.current_thread().name))
+
+
+class ThreadPoolProcessingTests(testing.AsyncTestCase):
+
+    def tearDown(self):
+        super(ThreadPoolProcessingTests, self).tearDown()
+        self.consumer.shutdown()
+
+    def get_consumer(self):
+        return TestThreadPoolConsumer
+
+    @testing.gen_test
+    def test_process_runs_in_worker_thread(self):
+        measurement = yield self.process_message('first', 'text/plain')
+        self.assertEqual(self.consumer.observed[0][0], 'first')
+        self.assertNotEqual(self.consumer.observed[0][1],
+                            threading.current_thread().name)
+        self.assertEqual(measurement.counters['processed'], 1)
+        self.assertEqual(measurement.values['thread_pool_size'],
+                         consumer.ThreadPoolConsumer.MAX_WORKERS)
+        self.assertEqual(len(measurement.durations['thread_pool_wait']), 1)
+
+    @testing.gen_test
+    def test_messages_processed_concurrently(self):
+        self.consumer.barrier = threading.Barrier(2)
+        yield [self.process_message('first', 'text/plain'),
+               self.process_message('second', 'text/plain')]
+        self.assertListEqual(sorted(b for b, _ in self.consumer.observed),
+                             ['first', 'second'])
+
+    @testing.gen_test
+    def test_publish_from_worker_thread(self):
+        yield self.process_message('publish', 'text/plain')
+        self.assertEqual(self.published_messages[0].exchange, 'exchange')
+        self.assertEqual(self.published_messages[0].body, 'published')
+
+    @testing.gen_test
+    def test_exception_in_worker_thread(self):
+        with self.assertRaises(consumer.ProcessingException):
+            yield self.process_message('error', 'text/plain')
+
+    def test_max_workers_setting(self):
+        obj = TestThreadPoolConsumer(settings={}, process=None, max_workers=2)
+        self.assertEqual(obj.max_workers, 2)
+        obj.shutdown()
+
+
+class TestOffloadingConsumer(consumer.SmartConsumer):
+
+    OFFLOAD_MIN_SIZE = 64
+
+    def initialize(self):
+        self.decoded_in = None
+        self.observed = []
+
+    def _decode_body(self, message):
+        self.decoded_in = threading.current_thread().name
+        return super(TestOffloadingConsumer, self)._decode_body(message)
+
+    @gen.coroutine
+    def process(self):
+        body = yield self.get_body()
+        self.observed.append((body, self.body))
+
+
+class OffloadedDecodingTests(testing.AsyncTestCase):
+
+    VALUE = {'key': ''.join(str(uuid.uuid4()) for _ in range(4))}
+
+    def tearDown(self):
+        super(OffloadedDecodingTests, self).tearDown()
+        self.consumer.shutdown()
+
+    def get_consumer(self):
+        return TestOffloadingConsumer
+
+    @testing.gen_test
+    def test_large_body_decoded_in_thread(self):
+        measurement = yield self.process_message(
+            zlib.compress(json.dumps(self.VALUE).encode('utf-8')),
+            properties={'content_encoding': 'gzip'})
+        self.assertListEqual(self.consumer.observed,
+                             [(self.VALUE, self.VALUE)])
+        self.assertNotEqual(self.consumer.decoded_in,
+                            threading.current_thread().name)
+        self.assertEqual(len(measurement.durations['offload_wait']), 1)
+
+    @testing.gen_test
+    def test_small_body_decoded_on_ioloop(self):
+        yield self.process_message({'key': 'value'})
+        self.assertListEqual(self.consumer.observed,
+                             [({'key': 'value'}, {'key': 'value'})])
+        self.assertEqual(self.consumer.decoded_in,
+                         threading.current_thread().name)
+
+    @testing.gen_test
+    def test_decode_error_in_thread(self):
+        with self.assertRaises(consumer.MessageException):
+            yield self.process_message(b'{"key": ' + b'1' * 128)
+
+    def test_offload_setting(self):
+        obj = consumer.SmartConsumer(
+            settings={}, process=None,
+            offload={'min_size': 1024, 'max_workers': 4})
+        self.assertEqual(obj._offload_min_size, 1024)
+        self.assertEqual(obj._offload_pool._max_workers, 4)
+        obj.shutdown()
+
+
+class Awaitable(object):
+
+    def __init__(self, consumer_):
+        self.consumer = consumer_
+
+    def __await__(self):
+        self.consumer.awaited = True
+        return iter([])
+
+
+class TestAwaitableConsumer(consumer.Consumer):
+
+    def initialize(self):
+        self.awaited = False
+
+    def process(self):
+        return Awaitable(self)
+
+
+class AwaitableProcessingTests(testing.AsyncTestCase):
+
+    def get_consumer(self):
+        return TestAwaitableConsumer
+
+    @testing.gen_test
+    def test_awaitable_is_awaited(self):
+        yield self.process_message('first', 'text/plain')
+        self.assertTrue(self.consumer.awaited)
+
+
+def reverse_in_worker(value):
+    if value == 'error':
+        raise consumer.ProcessingException
+    return os.getpid(), value[::-1]
+
+
+class TestProcessPoolConsumer(consumer.ProcessPoolConsumer):
+
+    MAX_WORKERS = 1
+
+    def initialize(self):
+        self.observed = []
+
+    @gen.coroutine
+    def process(self):
+        result = yield self.run_in_worker(reverse_in_worker, self.body)
+        self.observed.append(result)
+
+
+class ProcessPoolProcessingTests(testing.AsyncTestCase):
+
+    def tearDown(self):
+        super(ProcessPoolProcessingTests, self).tearDown()
+        self.consumer.shutdown()
+
+    def get_consumer(self):
+        return TestProcessPoolConsumer
+
+    @testing.gen_test(timeout=10)
+    def test_run_in_worker(self):
+        measurement = yield self.process_message('first', 'text/plain')
+        pid, value = self.consumer.observed[0]
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(value, 'tsrif')
+        self.assertEqual(measurement.values['process_pool_size'], 1)
+        self.assertEqual(len(measurement.durations['process_pool_wait']), 1)
+
+    @testing.gen_test(timeout=10)
+    def test_run_in_worker_with_spilled_body(self):
+        message = self.create_message(b'spilled', {})
+        message.spill()
+        result = yield self.consumer.execute(message, data.Measurement())
+        self.assertEqual(result, data.MESSAGE_ACK)
+        self.assertEqual(self.consumer.observed[0][1], b'dellips')
+
+    @testing.gen_test(timeout=10)
+    def test_exception_in_worker(self):
+        with self.assertRaises(consumer.ProcessingException):
+            yield self.process_message('error', 'text/plain')
+
+    def test_max_workers_setting(self):
+        self.assertEqual(self.consumer.max_workers, 1)
+
+
+class TestBatchConsumer(consumer.BatchConsumer):
+
+    MESSAGE_TYPE = 'valid'
+
+    def initialize(self):
+        self.batches = []
+
+    @gen.coroutine
+    def process_batch(self, messages):
+        self.batches.append([m.body for m in messages])
+        yield gen.moment
+        if messages[0].body == 'fail':
+            raise consumer.ProcessingException('batch failed')
+        raise gen.Return(dict((m, data.PROCESSING_EXCEPTION)
+                              for m in messages if m.body == 'error'))
+
+
+class BatchProcessingTests(testing.AsyncTestCase):
+
+    def get_consumer(self):
+        return TestBatchConsumer
+
+    @testing.gen_test
+    def test_batch_results(self):
+        results = yield self.process_batch(
+            ['first', 'error', 'second'], 'text/plain', 'valid')
+        self.assertListEqual(self.consumer.batches,
+                             [['first', 'error', 'second']])
+        self.assertListEqual(
+            results,
+            [data.MESSAGE_ACK, data.PROCESSING_EXCEPTION, data.MESSAGE_ACK])
+        self.assertEqual(len(self.published_messages), 1)
+        self.assertEqual(self.published_messages[0].exchange, 'errors')
+        self.assertEqual(self.published_messages[0].body, 'error')
+
+    @testing.gen_test
+    def test_invalid_messages_excluded_from_batch(self):
+        messages = [self.create_message('first', {'type': 'valid'}),
+                    self.create_message('second', {'type': 'invalid'})]
+        results = yield self.consumer.execute_batch(
+            messages, data.Measurement())
+        self.assertListEqual(self.consumer.batches, [['first']])
+        self.assertListEqual(
+            results, [data.MESSAGE_ACK, data.MESSAGE_EXCEPTION])
+
+    @testing.gen_test
+    def test_exception_applies_to_batch(self):
+        results = yield self.process_batch(
+            ['fail', 'other'], 'text/plain', 'valid')
+        self.assertListEqual(results, [data.PROCESSING_EXCEPTION] * 2)
+        self.assertEqual(len(self.published_messages), 2)
+
+    def test_batch_settings(self):
+        obj = TestBatchConsumer(settings={}, process=None,
+                                batch_size=10, batch_timeout='250')
+        self.assertEqual(obj.batch_size, 10)
+        self.assertEqual(obj.batch_timeout, 250)
+
+    def test_batch_setting_defaults(self):
+        obj = TestBatchConsumer(settings={}, process=None)
+        self.assertEqual(obj.batch_size, consumer.BatchConsumer.BATCH_SIZE)
+        self.assertEqual(obj.batch_timeout,
+                         consumer.BatchConsumer.BATCH_TIMEOUT)
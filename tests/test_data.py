@@ -4,6 +4,8 @@ import time
 import unittest
 import uuid
 
+import mock
+
 from rejected import data
 
 from . import mocks
@@ -184,6 +186,97 @@ class TestMessage(unittest.TestCase):
                          mocks.PROPERTIES.user_id)
 
 
+class TestSpilledMessage(unittest.TestCase):
+
+    BODY = b'\n'.join(uuid.uuid4().hex.encode('ascii') for _ in range(100))
+
+    def setUp(self):
+        self.message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES, self.BODY)
+        self.message.spill()
+
+    def test_spilled(self):
+        self.assertTrue(self.message.spilled)
+
+    def test_body_is_memoryview(self):
+        self.assertIsInstance(self.message.body, memoryview)
+        self.assertEqual(self.message.body.tobytes(), self.BODY)
+
+    def test_body_is_read_only(self):
+        self.assertTrue(self.message.body.readonly)
+
+    def test_spill_is_idempotent(self):
+        body = self.message.body
+        self.message.spill()
+        self.assertIs(self.message.body, body)
+
+    def test_body_file(self):
+        self.assertEqual(self.message.body_file.read(), self.BODY)
+
+    def test_body_file_readline(self):
+        self.assertEqual(self.message.body_file.readline(),
+                         self.BODY.split(b'\n')[0] + b'\n')
+
+    def test_body_file_seek(self):
+        handle = self.message.body_file
+        handle.seek(-10, 2)
+        self.assertEqual(handle.read(), self.BODY[-10:])
+
+    def test_empty_body_is_not_spilled(self):
+        message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES, b'')
+        message.spill()
+        self.assertFalse(message.spilled)
+        self.assertEqual(message.body_file.read(), b'')
+
+
+class TestLazyMessage(unittest.TestCase):
+
+    def test_body_is_not_copied(self):
+        body = bytearray(b'{"foo": "bar"}')
+        message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES, body)
+        self.assertIs(message.body, body)
+
+    def test_memoryview_body(self):
+        body = memoryview(b'0123456789')
+        message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES, body)
+        self.assertIs(message.body, body)
+        self.assertEqual(len(message.body), 10)
+
+    def test_dict(self):
+        message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES, mocks.BODY)
+        self.assertListEqual(sorted(dict(message).keys()),
+                             sorted(data.Message.__slots__))
+        self.assertDictEqual(
+            dict(message.properties),
+            dict((key, getattr(mocks.PROPERTIES, key))
+                 for key in data.Properties.__slots__
+                 if not key.startswith('_')))
+
+    def test_properties_read_on_access(self):
+        properties = mock.Mock()
+        properties.content_type = 'application/json'
+        message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, properties, mocks.BODY)
+        self.assertEqual(message.properties.content_type, 'application/json')
+        properties.content_type = 'text/plain'
+        self.assertEqual(message.properties.content_type, 'application/json')
+
+    def test_keyword_properties_used_when_unset(self):
+        properties = data.Properties(
+            mocks.PROPERTIES, app_id='baz', priority=None, user_id='qux')
+        self.assertEqual(properties.app_id, mocks.PROPERTIES.app_id)
+        self.assertEqual(properties.priority, mocks.PROPERTIES.priority)
+        self.assertEqual(properties.user_id, mocks.PROPERTIES.user_id)
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            getattr(data.Properties(mocks.PROPERTIES), 'foo')
+
+
 class TestMeasurement(unittest.TestCase):
 
     def setUp(self):
@@ -237,3 +330,56 @@ class TestMeasurement(unittest.TestCase):
             time.sleep(0.02)
         self.assertGreaterEqual(self.measurement.durations[key][0], 0.01)
         self.assertGreaterEqual(self.measurement.durations[key][1], 0.02)
+
+    def test_reset(self):
+        counters = self.measurement.counters
+        self.measurement.incr('foo')
+        self.measurement.add_duration('bar', 1.0)
+        self.measurement.set_tag('baz', True)
+        self.measurement.set_value('qux', 1)
+        self.measurement.reset()
+        self.assertIs(self.measurement.counters, counters)
+        for _key, value in self.measurement:
+            self.assertDictEqual(dict(value), {})
+
+
+class TestNullMeasurement(unittest.TestCase):
+
+    def setUp(self):
+        self.measurement = data.NullMeasurement()
+
+    def test_values_are_discarded(self):
+        self.measurement.incr('foo')
+        self.measurement.decr('foo')
+        self.measurement.add_duration('bar', 1.0)
+        self.measurement.set_tag('baz', True)
+        self.measurement.set_value('qux', 1)
+        with self.measurement.track_duration('quux'):
+            pass
+        for _key, value in self.measurement:
+            self.assertDictEqual(dict(value), {})
+
+
+class TestMeasurementPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = data.MeasurementPool(2)
+
+    def test_get_creates_measurement(self):
+        self.assertIsInstance(self.pool.get(), data.Measurement)
+
+    def test_put_resets_and_reuses_measurement(self):
+        measurement = self.pool.get()
+        measurement.incr('foo')
+        self.pool.put(measurement)
+        self.assertIs(self.pool.get(), measurement)
+        self.assertDictEqual(dict(measurement.counters), {})
+
+    def test_put_discards_when_full(self):
+        for _ in range(3):
+            self.pool.put(data.Measurement())
+        self.assertEqual(len(self.pool.measurements), 2)
+
+    def test_put_discards_null_measurement(self):
+        self.pool.put(data.NullMeasurement())
+        self.assertEqual(len(self.pool.measurements), 0)
@@ -0,0 +1,66 @@
+"""Tests for rejected.dictionary"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from rejected import codec, dictionary
+
+from . import test_codec
+
+
+@unittest.skipIf(codec.zstandard is None, 'zstandard not installed')
+class DictionaryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.samples = test_codec.zstd_samples()
+        os.mkdir(os.path.join(self.path, 'samples'))
+        for index, sample in enumerate(self.samples):
+            with open(os.path.join(self.path, 'samples',
+                                   '{:04d}.json'.format(index)), 'wb') as fh:
+                fh.write(sample)
+        self.output = os.path.join(self.path, 'messages.dict')
+        self.addCleanup(codec.ZSTD_DICTIONARIES.clear)
+
+    def test_read_samples_from_directory(self):
+        self.assertListEqual(
+            dictionary.read_samples([os.path.join(self.path, 'samples')]),
+            self.samples)
+
+    def test_read_samples_from_file(self):
+        self.assertListEqual(
+            dictionary.read_samples(
+                [os.path.join(self.path, 'samples', '0001.json')]),
+            [self.samples[1]])
+
+    def test_train_with_dict_id(self):
+        self.assertEqual(
+            dictionary.train(self.samples, 4096, dict_id=1234).dict_id(),
+            1234)
+
+    def test_main_writes_loadable_dictionary(self):
+        with mock.patch('sys.stdout'):
+            result = dictionary.main(
+                ['-o', self.output, '-s', '4096', '-i', '4321',
+                 os.path.join(self.path, 'samples')])
+        self.assertEqual(result, 0)
+        self.assertEqual(codec.load_zstd_dictionary(self.output), 4321)
+
+    def test_main_training_error(self):
+        with mock.patch('sys.stderr'):
+            result = dictionary.main(
+                ['-o', self.output,
+                 os.path.join(self.path, 'samples', '0001.json')])
+        self.assertEqual(result, 1)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_main_without_samples(self):
+        os.mkdir(os.path.join(self.path, 'empty'))
+        with mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                dictionary.main(
+                    ['-o', self.output, os.path.join(self.path, 'empty')])
@@ -0,0 +1,85 @@
+"""Tests for rejected.envelope"""
+import unittest
+
+from pika import spec
+from tornado import concurrent
+
+from rejected import codec, data, envelope
+
+from . import mocks
+
+MESSAGES = [
+    ({'content_type': 'application/json', 'message_id': 'a',
+      'headers': {'foo': 'bar'}}, b'{"index": 0}'),
+    ({'content_type': 'text/plain', 'type': 'example'}, b'plain'),
+    (data.Properties(message_id='c', priority=5), b'')
+]
+
+
+def new_envelope(body):
+    return data.Message(
+        'mock', mocks.CHANNEL, mocks.METHOD,
+        spec.BasicProperties(content_type=envelope.CONTENT_TYPE), body)
+
+
+class EnvelopeTests(unittest.TestCase):
+
+    def test_is_envelope(self):
+        self.assertTrue(envelope.is_envelope(new_envelope(b'')))
+
+    def test_is_not_envelope(self):
+        self.assertFalse(envelope.is_envelope(data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD, mocks.PROPERTIES,
+            mocks.BODY)))
+
+    def test_unpack_returns_messages(self):
+        messages = envelope.unpack(new_envelope(envelope.pack(MESSAGES)))
+        self.assertListEqual([m.body for m in messages],
+                             [body for _props, body in MESSAGES])
+        self.assertEqual(messages[0].properties.headers, {'foo': 'bar'})
+        self.assertEqual(messages[1].properties.type, 'example')
+        self.assertEqual(messages[2].properties.priority, 5)
+        self.assertIsNone(messages[2].properties.content_type)
+
+    def test_unpack_shares_the_delivery(self):
+        for message in envelope.unpack(
+                new_envelope(envelope.pack(MESSAGES))):
+            self.assertEqual(message.connection, 'mock')
+            self.assertIs(message.channel, mocks.CHANNEL)
+            self.assertEqual(message.delivery_tag, mocks.METHOD.delivery_tag)
+
+    def test_unpack_memoryview(self):
+        messages = envelope.unpack(
+            new_envelope(memoryview(envelope.pack(MESSAGES))))
+        self.assertEqual(len(messages), len(MESSAGES))
+
+    def test_pack_encodes_text_bodies(self):
+        messages = envelope.unpack(new_envelope(envelope.pack(
+            [({}, u'text')])))
+        self.assertEqual(messages[0].body, b'text')
+
+    def test_unpack_invalid_body_raises(self):
+        with self.assertRaises(ValueError):
+            envelope.unpack(new_envelope(b'\xc1'))
+
+    def test_unpack_invalid_properties_raises(self):
+        with self.assertRaises(ValueError):
+            envelope.unpack(new_envelope(codec.dump_msgpack(
+                [[{'invalid': True}, b'']])))
+
+    def test_unpack_invalid_structure_raises(self):
+        with self.assertRaises(ValueError):
+            envelope.unpack(new_envelope(codec.dump_msgpack({'a': 1})))
+
+
+class BufferTests(unittest.TestCase):
+
+    def test_append(self):
+        buffer = envelope.Buffer(
+            'mock', 'exchange', 'routing-key', concurrent.Future())
+        buffer.append({}, b'12345')
+        buffer.append({}, u'123')
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.size, 8)
+        self.assertListEqual(buffer.messages,
+                             [({}, b'12345'), ({}, b'123')])
@@ -0,0 +1,68 @@
+"""Tests for rejected.qos"""
+import unittest
+
+from rejected import qos
+
+
+class ControllerTests(unittest.TestCase):
+
+    def setUp(self):
+        self._obj = qos.Controller(10, 2, {'min': 2, 'max': 100})
+
+    def test_defaults(self):
+        obj = qos.Controller(10, 2, {})
+        self.assertEqual(obj.interval, qos.Controller.INTERVAL)
+        self.assertEqual(obj.maximum, qos.Controller.MAXIMUM)
+        self.assertEqual(obj.minimum, 2)
+
+    def test_initial_prefetch_count_clamped(self):
+        self.assertEqual(qos.Controller(500, 2, {'max': 50}).prefetch_count,
+                         50)
+
+    def test_update_without_measurements(self):
+        self.assertIsNone(self._obj.update())
+
+    def test_update_grows_with_round_trip(self):
+        self._obj.on_idle_wait(0.1)
+        self._obj.on_processed(0.01)
+        self.assertEqual(self._obj.update(), 22)
+        self.assertEqual(self._obj.prefetch_count, 22)
+
+    def test_update_clamped_to_maximum(self):
+        self._obj.on_idle_wait(0.5)
+        self._obj.on_processed(0.001)
+        self.assertEqual(self._obj.update(), 100)
+
+    def test_long_idle_wait_ignored(self):
+        self._obj.on_idle_wait(30)
+        self.assertEqual(self._obj.waits, 0)
+        self.assertIsNone(self._obj.round_trip)
+
+    def test_update_does_not_shrink_while_waiting(self):
+        self._obj.on_idle_wait(0.001)
+        self._obj.on_processed(0.1, pending=5)
+        self.assertIsNone(self._obj.update())
+
+    def test_update_does_not_shrink_without_backlog(self):
+        self._obj.on_processed(0.1, pending=0)
+        self.assertIsNone(self._obj.update())
+
+    def test_update_shrinks_halfway_with_backlog(self):
+        self._obj.on_processed(0.1, pending=5)
+        self.assertEqual(self._obj.update(), 6)
+
+    def test_update_reduced_by_redelivery_rate(self):
+        self._obj.prefetch_count = 2
+        self._obj.on_idle_wait(0.1)
+        self._obj.on_processed(0.1, messages=2, redelivered=1)
+        self._obj.on_processed(0.1, messages=2, redelivered=1)
+        self.assertEqual(self._obj.update(), 3)
+
+    def test_update_resets_measurements(self):
+        self._obj.on_idle_wait(0.1)
+        self._obj.on_processed(0.01, redelivered=1, pending=3)
+        self._obj.update()
+        self.assertEqual(self._obj.processed, 0)
+        self.assertEqual(self._obj.redelivered, 0)
+        self.assertEqual(self._obj.pending_depth, 0)
+        self.assertEqual(self._obj.waits, 0)
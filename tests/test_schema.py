@@ -0,0 +1,159 @@
+"""Tests for rejected.schema"""
+import json
+import os
+import tempfile
+import unittest
+
+from pika import spec
+
+from rejected import consumer, data, schema
+
+from . import mocks
+
+ADDRESS = schema.Schema('Address', {
+    'street': str,
+    'postal_code': schema.Field(str, required=False, default='00000')})
+
+USER = schema.Schema('User', {
+    'id': int,
+    'name': str,
+    'score': float,
+    'active': bool,
+    'addresses': [ADDRESS],
+    'status': schema.Field(str, choices=['active', 'disabled'])})
+
+USER_DOCUMENT = {
+    'title': 'User',
+    'type': 'object',
+    'required': ['id', 'name'],
+    'properties': {
+        'id': {'type': 'integer'},
+        'name': {'type': 'string'},
+        'status': {'type': 'string', 'enum': ['active', 'disabled'],
+                   'default': 'active'},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'address': {'type': 'object', 'required': ['street'],
+                    'properties': {'street': {'type': 'string'}}}}}
+
+VALUE = {'id': 1, 'name': 'Jane', 'score': 2, 'active': True,
+         'addresses': [{'street': 'Main St'}], 'status': 'active',
+         'extra': 'ignored'}
+
+
+class SchemaTests(unittest.TestCase):
+
+    def test_decode(self):
+        user = USER.decode(VALUE)
+        self.assertIsInstance(user, USER.cls)
+        self.assertEqual(user.id, 1)
+        self.assertEqual(user.score, 2.0)
+        self.assertIsInstance(user.score, float)
+        self.assertEqual(user.addresses[0],
+                         ADDRESS.cls(street='Main St', postal_code='00000'))
+
+    def test_decoded_object_is_slotted(self):
+        user = USER.decode(VALUE)
+        self.assertFalse(hasattr(user, '__dict__'))
+        with self.assertRaises(AttributeError):
+            user.extra = True
+
+    def test_as_dict(self):
+        expectation = dict(VALUE)
+        del expectation['extra']
+        expectation['addresses'] = [{'street': 'Main St',
+                                     'postal_code': '00000'}]
+        self.assertDictEqual(USER.decode(VALUE).as_dict(), expectation)
+
+    def test_missing_required_field(self):
+        value = dict(VALUE)
+        del value['name']
+        with self.assertRaises(schema.ValidationError):
+            USER.decode(value)
+
+    def test_invalid_field_type(self):
+        with self.assertRaises(schema.ValidationError):
+            USER.decode(dict(VALUE, id='1'))
+
+    def test_bool_is_not_an_int(self):
+        with self.assertRaises(schema.ValidationError):
+            USER.decode(dict(VALUE, id=True))
+
+    def test_invalid_choice(self):
+        with self.assertRaises(schema.ValidationError):
+            USER.decode(dict(VALUE, status='deleted'))
+
+    def test_invalid_nested_value(self):
+        with self.assertRaises(schema.ValidationError):
+            USER.decode(dict(VALUE, addresses=[{'street': 1}]))
+
+    def test_value_must_be_an_object(self):
+        with self.assertRaises(schema.ValidationError):
+            USER.decode([VALUE])
+
+
+class JSONSchemaTests(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = schema.Schema.from_json_schema(USER_DOCUMENT)
+
+    def test_name_from_title(self):
+        self.assertEqual(self.schema.cls.__name__, 'User')
+
+    def test_decode(self):
+        user = self.schema.decode({'id': 1, 'name': 'Jane', 'tags': ['a'],
+                                   'address': {'street': 'Main St'}})
+        self.assertEqual(user.status, 'active')
+        self.assertListEqual(user.tags, ['a'])
+        self.assertEqual(user.address.street, 'Main St')
+
+    def test_invalid_nested_value(self):
+        with self.assertRaises(schema.ValidationError):
+            self.schema.decode({'id': 1, 'name': 'Jane', 'address': {}})
+
+    def test_invalid_enum_value(self):
+        with self.assertRaises(schema.ValidationError):
+            self.schema.decode({'id': 1, 'name': 'Jane', 'status': 'x'})
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            schema.Schema.from_json_schema(
+                {'properties': {'id': {'type': ['integer', 'null']}}})
+
+    def test_load_is_cached(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.unlink, path)
+        os.write(handle, json.dumps(USER_DOCUMENT).encode('utf-8'))
+        os.close(handle)
+        self.assertIs(schema.load(path), schema.load(path))
+
+
+class SmartConsumerSchemaTests(unittest.TestCase):
+
+    def setUp(self):
+        self._obj = consumer.SmartConsumer(
+            settings={}, process=None, schemas={'user': USER})
+
+    def set_message(self, value, message_type='user'):
+        self._obj._message = data.Message(
+            'mock', mocks.CHANNEL, mocks.METHOD,
+            spec.BasicProperties(content_type='application/json',
+                                 type=message_type),
+            json.dumps(value).encode('utf-8'))
+
+    def test_body_is_typed_object(self):
+        self.set_message(VALUE)
+        self.assertEqual(self._obj.body, USER.decode(VALUE))
+
+    def test_other_message_types_are_not_decoded(self):
+        self.set_message(VALUE, 'other')
+        self.assertDictEqual(self._obj.body, VALUE)
+
+    def test_invalid_body_raises_message_exception(self):
+        self.set_message(dict(VALUE, id='1'))
+        with self.assertRaises(consumer.MessageException):
+            self._obj.body
+
+    def test_missing_schema_file_raises(self):
+        with self.assertRaises(consumer.ConfigurationException):
+            consumer.SmartConsumer(settings={}, process=None,
+                                   schemas={'user': '/nonexistent.json'})
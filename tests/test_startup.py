@@ -0,0 +1,90 @@
+"""Tests for rejected.startup"""
+import sys
+import unittest
+
+import mock
+
+from rejected import startup
+
+
+class ProfileTests(unittest.TestCase):
+
+    MODULES = ('xml.dom.minidom', 'xml.dom.minicompat')
+
+    def setUp(self):
+        self.modules = dict((name, sys.modules.pop(name))
+                            for name in self.MODULES if name in sys.modules)
+
+    def tearDown(self):
+        for name in self.MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(self.modules)
+
+    def test_profile_reports_imported_modules(self):
+        timings = dict((name, (cumulative, own)) for name, cumulative, own
+                       in startup.profile(['xml.dom.minidom']))
+        self.assertIn('xml.dom.minidom', timings)
+        cumulative, own = timings['xml.dom.minidom']
+        self.assertGreaterEqual(cumulative, own)
+
+    def test_profile_skips_imported_modules(self):
+        self.assertIn('unittest', sys.modules)
+        self.assertListEqual(startup.profile(['unittest']), [])
+
+    def test_profile_is_sorted_slowest_first(self):
+        timings = startup.profile(['xml.dom.minidom'])
+        self.assertListEqual(
+            timings, sorted(timings, key=lambda row: row[1], reverse=True))
+
+    def test_profile_restores_import(self):
+        original = __import__
+        startup.profile(['xml.dom.minidom'])
+        self.assertIs(__import__, original)
+
+    def test_profile_raises_import_error(self):
+        with self.assertRaises(ImportError):
+            startup.profile(['rejected_missing_module'])
+
+
+class ReportTests(unittest.TestCase):
+
+    TIMINGS = [('a', 0.5, 0.25), ('b', 0.25, 0.25), ('c', 0.001, 0.001)]
+
+    def test_report(self):
+        lines = startup.report(self.TIMINGS).splitlines()
+        self.assertEqual(lines[1].split(), ['500.0', '250.0', 'a'])
+        self.assertEqual(lines[-1], '3 modules imported in 501.0 ms')
+
+    def test_report_limit(self):
+        self.assertEqual(len(startup.report(self.TIMINGS, 1).splitlines()),
+                         3)
+
+
+class AbsoluteNameTests(unittest.TestCase):
+
+    def test_absolute_import(self):
+        self.assertEqual(startup._absolute_name('json', {}, 0), 'json')
+
+    def test_relative_import(self):
+        self.assertEqual(
+            startup._absolute_name('data', {'__package__': 'rejected'}, 1),
+            'rejected.data')
+
+    def test_relative_parent_import(self):
+        self.assertEqual(
+            startup._absolute_name('', {'__package__': 'a.b.c'}, 2), 'a.b')
+
+
+class MainTests(unittest.TestCase):
+
+    def test_main_writes_report(self):
+        with mock.patch('rejected.startup.profile',
+                        return_value=[('a', 0.5, 0.5)]):
+            with mock.patch('sys.stdout') as stdout:
+                self.assertEqual(startup.main(['a']), 0)
+        stdout.write.assert_called_once_with(
+            startup.report([('a', 0.5, 0.5)]))
+
+    def test_main_import_error(self):
+        with mock.patch('sys.stderr'):
+            self.assertEqual(startup.main(['rejected_missing_module']), 1)
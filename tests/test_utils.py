@@ -25,3 +25,41 @@ class TestImportNamspacedClass(unittest.TestCase):
     def test_import_consumer_failure(self):
         self.assertRaises(ImportError, utils.import_consumer,
                           'rejected.fake_module.Classname')
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_missing_module_returns_none(self):
+        self.assertIsNone(utils.lazy_import('rejected_missing_module'))
+
+    def test_module_is_imported_on_first_access(self):
+        module = utils.lazy_import('json')
+        self.assertIsInstance(module, utils.LazyModule)
+        self.assertIsNone(module._module)
+        self.assertEqual(module.loads('[1]'), [1])
+        self.assertIsNotNone(module._module)
+
+    def test_dotted_name_binds_top_level_package(self):
+        import xml.dom.minidom
+        module = utils.lazy_import('xml.dom.minidom')
+        self.assertIs(module.dom.minidom, xml.dom.minidom)
+
+    def test_missing_attribute_raises(self):
+        with self.assertRaises(AttributeError):
+            utils.lazy_import('json').missing_attribute
+
+    def test_is_installed(self):
+        self.assertTrue(utils.is_installed('json'))
+        self.assertFalse(utils.is_installed('rejected_missing_module'))
+
+
+class TestDistributionVersion(unittest.TestCase):
+
+    def test_installed_distribution(self):
+        import tornado
+        self.assertEqual(utils.distribution_version('tornado'),
+                         tornado.version)
+
+    def test_missing_distribution(self):
+        self.assertIsNone(
+            utils.distribution_version('rejected-missing-distribution'))